@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+# aio_show.py
+"""
+asyncio runtime for the choreography.
+
+The same primitives as the blocking modules, as coroutines:
+
+    await takeoff(hl, 1.3, 0.26)
+    await goto(hl, (0.0, 1.3), 1.3, 5.0)
+    await circle(hl, radius=1.2, total_time=20.0)
+    await hover(hl, 2.0)
+
+They fly the blocking modules' step generators (circle.circle_steps(),
+show.ShowExecutor.steps(), ...) with run_steps(), so commands, waypoints and
+slots are computed in one place and only the waits differ.
+
+run_flight() flies a compiled show with everything on one event loop:
+
+- show task:      dispatches the show's commands (AsyncShowExecutor)
+- telemetry task: log samples are handed over from cflib's receive thread
+                  (call_soon_threadsafe) and forwarded to UDP / the recorder
+- UDP poll task:  in UDP_MODE "poll", sends the latest pose at UDP_HZ
+- input:          stdin (and the ABORT_UDP_PORT socket) are loop readers;
+                  a key press or abort datagram cancels the show task
+
+Cancelling the show task raises CancelledError inside whichever primitive is
+awaiting, right away, and run_flight() hands over to the landing routine.
+Waits are on the show clock; under a VirtualClock (simulate.py --asyncio)
+one driver advances simulated time from waiter to waiter in deadline order.
+
+    python3 aio_show.py [--show shows/incomplete.json] [--venue ...]
+"""
+import os, sys, time, heapq, asyncio, argparse
+
+import show_clock
+import safe_sleep
+from cfutils import get_hl_calls, reset_estimator_steps
+from timeline import end_show, use_music_clock
+from music_clock import make_clock, WallClock
+from waypoints import waypoint_steps
+from trajectory import TrajectoryRunner
+from takeoff import takeoff_steps
+from land import land_steps
+from hover import hover_steps
+from goto import goto_steps
+from circle import circle_steps
+from diagonal_orbit import diagonal_orbit_steps
+from show import load_show, ShowExecutor
+from arrival import ArrivalDetector, VEL_NAMES
+from input_watcher import InputWatcher, open_abort_socket
+from pose_udp import PoseSender, FLAG_EMERGENCY
+from pose_forward import PoseForwarder
+from flight_recorder import FlightRecorder
+from preflight import Preflight
+from link_stats import LinkStats
+from telemetry import Telemetry, POSE_NAMES
+
+# ---------- show-clock waits ----------
+VIRTUAL_STEP = 0.1   # longest single VirtualClock advance between loop turns (s)
+UNTIL_POLL_S = 0.01  # how often sleep_until() checks its `until` predicate (s)
+
+class _VirtualTimers:
+    """Wakes sleep_until() waiters in deadline order while advancing the VirtualClock."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.heap = []
+        self.seq = 0
+        self.driver = None
+
+    def wait(self, deadline):
+        fut = self.loop.create_future()
+        heapq.heappush(self.heap, (deadline, self.seq, fut))
+        self.seq += 1
+        if self.driver is None or self.driver.done():
+            self.driver = self.loop.create_task(self._drive())
+        return fut
+
+    async def _drive(self):
+        while self.heap:
+            await asyncio.sleep(0)   # let woken tasks register their next wait first
+            deadline, _, fut = self.heap[0]
+            if fut.done():           # waiter was cancelled
+                heapq.heappop(self.heap)
+                continue
+            remaining = deadline - show_clock.now()
+            if remaining > 0:
+                # Short steps, so log samples the sim delivers get drained in between
+                show_clock.sleep(min(VIRTUAL_STEP, remaining))
+                continue
+            heapq.heappop(self.heap)
+            fut.set_result(None)
+
+_timers = None
+
+async def sleep_until(deadline, until=None):
+    """
+    Wait until the absolute show-clock time `deadline`. `until` is an
+    optional predicate that ends the wait early; it is checked every
+    UNTIL_POLL_S (e.g. arrival.ArrivalDetector.arrived).
+    """
+    global _timers
+    while True:
+        if until is not None and until():
+            return
+        remaining = deadline - show_clock.now()
+        if remaining <= 0:
+            return
+        step = remaining if until is None else min(remaining, UNTIL_POLL_S)
+        if show_clock.is_virtual():
+            loop = asyncio.get_running_loop()
+            if _timers is None or _timers.loop is not loop:
+                _timers = _VirtualTimers(loop)
+            await _timers.wait(show_clock.now() + step)
+        else:
+            await asyncio.sleep(step)
+
+async def run_steps(steps):
+    """
+    safe_sleep.run_steps() on the loop: each (deadline, until) the step
+    generator yields is a sleep_until(), and each blocking call (an upload
+    waiting on memory-write acks) runs in the default executor, off the loop.
+    """
+    loop = asyncio.get_running_loop()
+    result = None
+    try:
+        while True:
+            try:
+                item = steps.send(result)
+            except StopIteration as stop:
+                return stop.value
+            if callable(item):
+                result = await loop.run_in_executor(None, item)
+            else:
+                result = None
+                await sleep_until(*item)
+    finally:
+        steps.close()
+
+# ---------- primitives ----------
+# The blocking modules' step generators, flown by run_steps(): same commands,
+# waypoints and slots, only the waits differ
+
+async def reset_estimator(cf, *, threshold=1e-3, window_s=0.3, timeout_s=5.0):
+    """Async cfutils.reset_estimator(): returns once the Kalman variances have settled."""
+    return await run_steps(reset_estimator_steps(cf, threshold=threshold, window_s=window_s,
+                                                 timeout_s=timeout_s))
+
+async def takeoff(hl, height_m=1.5, ascent_vel=0.6):
+    await run_steps(takeoff_steps(hl, height_m, ascent_vel))
+
+async def land(hl, from_height_m=1.5, descent_vel=0.125, arrival=None):
+    await run_steps(land_steps(hl, from_height_m, descent_vel, arrival))
+
+async def hover(_hl, duration_s=2.0):
+    await run_steps(hover_steps(_hl, duration_s))
+
+async def goto(hl, xy, z, dur, face_performer=True, world_yaw_offset_deg=0.0, arrival=None):
+    await run_steps(goto_steps(hl, xy, z, dur, face_performer, world_yaw_offset_deg, arrival))
+
+async def fly_waypoints(hl, wp, t_start, slot_s, move_s=None, arrival=None, label=""):
+    """Async waypoints.fly_waypoints()."""
+    await run_steps(waypoint_steps(hl, wp, t_start, slot_s, move_s, arrival, label))
+
+async def circle(hl, **orbit):
+    """Async circle.circle(); same arguments, waypoints and timing."""
+    await run_steps(circle_steps(hl, **orbit))
+
+async def diagonal_orbit(hl, **orbit):
+    """Async diagonal_orbit.diagonal_orbit(); same arguments, waypoints and timing."""
+    await run_steps(diagonal_orbit_steps(hl, **orbit))
+
+# ---------- show ----------
+class AsyncShowExecutor(ShowExecutor):
+    """show.ShowExecutor as a coroutine; current_height is kept for the emergency landing."""
+
+    async def run(self):
+        await run_steps(self.steps())
+
+# ---------- cooperating tasks ----------
+class TelemetryPump:
+    """
+    Moves log samples from cflib's receive thread onto the event loop.
+    on_log() is the LogConfig callback; run() calls every consumer with
+    (timestamp, data, logconf) on the loop. Samples are dropped (and
+    counted) if the queue is full rather than blocking the radio thread.
+    on_log() also stamps when the sample arrived, (show-clock time, wall
+    time); `stamped` consumers get it as a fourth argument, so a sample
+    isn't timed by when the loop got round to draining it.
+    """
+
+    def __init__(self, loop, consumers, maxsize=64, stamped=()):
+        self.loop = loop
+        self.consumers = list(consumers)
+        self.stamped = list(stamped)
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def _put(self, sample):
+        try:
+            self.queue.put_nowait(sample)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def on_log(self, timestamp, data, logconf):
+        received = (show_clock.now(), time.time())
+        self.loop.call_soon_threadsafe(self._put, (timestamp, data, logconf, received))
+
+    async def run(self):
+        while True:
+            timestamp, data, logconf, received = await self.queue.get()
+            for fn in self.consumers:
+                try:
+                    fn(timestamp, data, logconf)
+                except Exception as e:
+                    print(f"[TELEMETRY] {getattr(fn, '__qualname__', fn)} failed: {e}")
+            for fn in self.stamped:
+                try:
+                    fn(timestamp, data, logconf, received)
+                except Exception as e:
+                    print(f"[TELEMETRY] {getattr(fn, '__qualname__', fn)} failed: {e}")
+
+async def udp_poll(sender, latest_fn, hz):
+    """Send the latest pose at `hz` on the show clock (UDP_MODE "poll")."""
+    dt = 1.0 / hz
+    t_next = show_clock.now()
+    while True:
+        x, y, z, yaw_deg, ts = latest_fn()
+        try:
+            sender.send(x, y, z, yaw_deg, ts, FLAG_EMERGENCY if safe_sleep.get_emergency_flag() else 0)
+        except Exception as e:
+            print(f"[UDP] Error sending: {e}")
+        t_next += dt
+        await sleep_until(t_next)
+
+def watch_input(loop, on_input, keyboard=True, abort_port=None):
+    """
+    Call on_input(source) on the loop when a key is pressed or, with
+    abort_port, a datagram arrives on the abort socket (the same one
+    input_watcher.InputWatcher listens on). Unix: stdin and the socket are
+    loop readers, so either is handled as soon as the loop sees it. Windows
+    has no reader support for the console; a task polls msvcrt every 10 ms.
+    Returns a function that stops watching.
+    """
+    stops = []
+    if abort_port is not None:
+        sock = open_abort_socket(abort_port)
+        sock.setblocking(False)
+        def datagram():
+            try:
+                _, addr = sock.recvfrom(256)
+            except OSError:
+                return
+            loop.remove_reader(sock)
+            on_input(f"UDP abort from {addr[0]}")
+        loop.add_reader(sock, datagram)
+        stops.append(lambda: (loop.remove_reader(sock), sock.close()))
+
+    if keyboard and sys.platform == 'win32':
+        async def poll():
+            import msvcrt
+            while not msvcrt.kbhit():
+                await asyncio.sleep(0.01)
+            msvcrt.getwch()
+            on_input("keyboard")
+        stops.append(loop.create_task(poll()).cancel)
+    elif keyboard:
+        fd = sys.stdin.fileno()
+        def readable():
+            loop.remove_reader(fd)
+            try:
+                sys.stdin.readline()
+            except Exception:
+                pass
+            on_input("keyboard")
+        loop.add_reader(fd, readable)
+        stops.append(lambda: loop.remove_reader(fd))
+
+    def stop():
+        for fn in stops:
+            fn()
+    return stop
+
+# ---------- flight ----------
+async def run_flight(cf, show, *, runner=None, sender=None, udp_mode="poll", udp_hz=30.0,
+                     udp_max_hz=0.0, recorder=None, log_setup=None, estimator=None,
+                     ready_at=None, blend=False, link=None, telemetry=None, arrival=None,
+                     abort_port=None):
+    """
+    Fly `show` on `cf` with all tasks on the running loop. log_setup(cf, callback)
+    starts the pose LogConfig and returns it (main.setup_pose_logging).
+    estimator: reset_estimator() keyword args; ready_at: earliest show-clock
+    time for takeoff (arming settle); link: link_stats.LinkStats to watch the
+    log blocks. With `telemetry` (telemetry.Telemetry) its blocks are started
+    instead and consumers read the pose block's ring rows. arrival: an
+    arrival.ArrivalDetector fed from the pose (and motion) block, for goto
+    steps and the landing; abort_port: UDP abort socket, read on the loop
+    like stdin. Returns the executor.
+    """
+    loop = asyncio.get_running_loop()
+    hl = cf.high_level_commander
+    executor = AsyncShowExecutor(hl, show, runner, arrival, blend)
+
+    started = False   # like main.py: no landing for an emergency before the show starts
+
+    async def fly():
+        nonlocal started
+        await reset_estimator(cf, **(estimator or {}))
+        await sleep_until(ready_at or 0.0)
+        started = True
+        await executor.run()
+    show_task = loop.create_task(fly(), name="show")
+
+    # Telemetry: the forwarder keeps the latest pose (and sends it itself in event mode)
+    pose_block = telemetry.block_of(POSE_NAMES[0]) if telemetry else None
+    forwarder = PoseForwarder(sender if udp_mode == "event" else _NullSender(),
+                              max_hz=udp_max_hz,
+                              flags_fn=lambda: FLAG_EMERGENCY if safe_sleep.get_emergency_flag() else 0,
+                              names=pose_block.columns(POSE_NAMES) if pose_block else POSE_NAMES)
+    pump = TelemetryPump(loop, [forwarder.on_log], stamped=[recorder.on_log] if recorder else [])
+    tasks = [loop.create_task(pump.run(), name="telemetry")]
+    if sender is not None and udp_mode != "event":
+        tasks.append(loop.create_task(udp_poll(sender, forwarder.latest, udp_hz), name="udp"))
+    log_conf = None
+    try:
+        if telemetry:
+            def start_log(conf):
+                cf.log.add_config(conf)
+                conf.start()
+                if link:
+                    link.watch_log(conf)
+            # One block at a time: a failing extra block is dropped, not the pose stream
+            telemetry.start(cf, start_log, required=[pose_block])
+            # Rows stay valid in the ring for its history, well past the pump queue
+            pose_block.logconf.data_received_cb.add_callback(pump.on_log)
+            if recorder:
+                recorder.add_telemetry(telemetry)   # the blocks that did start
+            if arrival:
+                # Fed on the receive thread, like main.py: the show steps poll arrived()
+                arrival.names = pose_block.columns(POSE_NAMES)[:3]
+                pose_block.logconf.data_received_cb.add_callback(arrival.on_log)
+                if all(telemetry.has(v) for v in VEL_NAMES):
+                    motion = telemetry.block_of(VEL_NAMES[0])
+                    arrival.vel_names = motion.columns(VEL_NAMES)
+                    motion.logconf.data_received_cb.add_callback(arrival.on_velocity)
+        elif log_setup:
+            log_conf = log_setup(cf, pump.on_log)
+            if link:
+                link.watch_log(log_conf)
+            if arrival:
+                log_conf.data_received_cb.add_callback(arrival.on_log)
+    except Exception as e:
+        print(f"[UDP] Failed to start logging: {e}")
+
+    def emergency(source):
+        safe_sleep.trigger_emergency(source)
+        show_task.cancel()
+    stop_watching = watch_input(loop, emergency, keyboard=safe_sleep.monitor_keyboard,
+                                abort_port=abort_port)
+
+    try:
+        await asyncio.wait({show_task})
+        if show_task.cancelled() and not started:
+            print(f"\n[EMERGENCY] {safe_sleep.emergency_source} before takeoff — not flying.")
+        elif show_task.cancelled():
+            print(f"\n[EMERGENCY] {safe_sleep.emergency_source} — initiating smooth emergency landing...")
+            timeline = end_show()
+            if timeline:
+                print(timeline.report())
+            try:
+                hl.stop()
+                print(f"[EMERGENCY] Trigger -> stop() latency: {1e3 * safe_sleep.emergency_latency():.2f} ms")
+                emergency_height = executor.current_height or show.params.get('H_STD', 1.3)
+                print(f"[EMERGENCY] Landing from approximately {emergency_height:.2f}m...")
+                await land(hl, from_height_m=emergency_height,
+                           descent_vel=show.params.get('DESCENT_VEL', 0.125), arrival=arrival)
+                print("[EMERGENCY] Emergency landing completed.")
+            except Exception as e:
+                print(f"[ERROR] Error during emergency landing: {e}")
+                try:
+                    hl.stop()
+                except Exception:
+                    pass
+        else:
+            show_task.result()   # re-raise a failure in the show
+            print("[DONE] Landed.")
+    finally:
+        stop_watching()
+        if not show_task.done():
+            show_task.cancel()
+        if telemetry:
+            telemetry.stop()
+            print(telemetry.summary())
+        elif log_conf:
+            try:
+                log_conf.stop()
+            except Exception:
+                pass
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if sender is not None and udp_mode == "event":
+            print(forwarder.report())
+        if pump.dropped:
+            print(f"[TELEMETRY] {pump.dropped} log samples dropped (queue full)")
+        if arrival:
+            print(arrival.report())
+        if executor.blender:
+            print(executor.blender.report())
+        if executor.timeline and executor.timeline.segments:
+            print(executor.timeline.table())
+    return executor
+
+class _NullSender:
+    def send(self, *pose):
+        pass
+
+def main(show_file=None, venue_file=None, connect=None):
+    """main.main() on the asyncio runtime; same config globals (main.py)."""
+    import main as routine
+    show_file = show_file or routine.SHOW_FILE
+    venue_file = venue_file if venue_file is not None else routine.VENUE_FILE
+    connect = connect or routine.connect_radio
+    show = load_show(show_file, venue_file)
+    print(f"[SHOW] {show.name}: {len(show.segments)} segments, {show.duration:.1f}s")
+    if show.density:
+        print(show.density_report())
+    if not routine.preflight_check(show):
+        return
+
+    sender = None
+    if routine.UDP_ENABLED:
+        try:
+            sender = PoseSender(routine.UDP_DESTINATIONS, routine.UDP_FORMAT, default_port=routine.UDP_PORT,
+                                multicast_ttl=routine.UDP_MULTICAST_TTL)
+            print(f"[UDP] Initialized - sending {routine.UDP_FORMAT} to "
+                  f"{sender.describe()} ({routine.UDP_MODE})")
+        except Exception as e:
+            print(f"[UDP] Failed to initialize: {e}")
+
+    try:
+        music = make_clock(routine.MUSIC_SOURCE, audio_file=routine.MUSIC_FILE,
+                           udp_port=routine.MUSIC_UDP_PORT)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"[MUSIC] {routine.MUSIC_SOURCE} clock unavailable ({e}); following the local clock")
+        music = WallClock()
+    use_music_clock(music)
+
+    with connect() as scf:
+        cf = scf.cf
+        recorder = None
+        link = LinkStats().attach(cf) if routine.LINK_STATS else None
+        telemetry = Telemetry(routine.TELEMETRY_GROUPS) if routine.MULTI_RATE_TELEMETRY else None
+        arrival = (ArrivalDetector(routine.ARRIVAL_POS_TOL, routine.ARRIVAL_VEL_TOL)
+                   if routine.ARRIVAL_DETECT else None)
+        pf = Preflight(cf, timeout_s=routine.PREFLIGHT_TIMEOUT_S)
+        pf.param('commander.enHighLevel', '1')
+        pf.param('motorPowerSet.enable', '0', optional=True)
+        pf.action('arm', lambda: cf.platform.send_arming_request(True))
+        t_armed = show_clock.now()
+        print("[INFO] Press any key at any time to initiate emergency smooth landing...")
+        try:
+            # Until the loop runs, the abort socket is watched by a thread (the
+            # key press is polled by the waits themselves)
+            watcher = None
+            if routine.ABORT_UDP_PORT is not None:
+                try:
+                    watcher = InputWatcher(keyboard=False, abort_port=routine.ABORT_UDP_PORT).start()
+                except OSError as e:
+                    print(f"[ABORT] Abort socket failed to open ({e})")
+            try:
+                pf.wait()   # an emergency ends the ack waits at once
+            except KeyboardInterrupt:
+                safe_sleep.trigger_emergency("keyboard")   # no-op if the abort socket triggered it
+                print(f"\n[EMERGENCY] {safe_sleep.emergency_source} before takeoff — not flying.")
+                return
+            finally:
+                if watcher:
+                    watcher.stop()
+            print(pf.report())
+            print("[ARM] Armed.")
+            if link and routine.LINK_STATS_PRINT_S:
+                link.start(routine.LINK_STATS_PRINT_S)
+            if routine.RECORD_FLIGHT:
+                pose = telemetry.block_of(POSE_NAMES[0]) if telemetry else None
+                recorder = FlightRecorder(routine.RECORD_DIR,
+                                          names=pose.columns(POSE_NAMES) if pose else POSE_NAMES,
+                                          hl=cf.high_level_commander)
+                print(f"[REC] Recording to {recorder.path}")
+            runner = TrajectoryRunner(cf) if routine.USE_TRAJECTORIES or routine.BLEND_SPLINES else None
+            executor = asyncio.run(run_flight(cf, show, runner=runner, sender=sender,
+                                   udp_mode=routine.UDP_MODE, udp_hz=routine.UDP_HZ,
+                                   udp_max_hz=routine.UDP_MAX_HZ, recorder=recorder,
+                                   log_setup=routine.setup_pose_logging,
+                                   estimator=dict(threshold=routine.EST_VAR_THRESHOLD,
+                                                  window_s=routine.EST_WINDOW_S,
+                                                  timeout_s=routine.EST_TIMEOUT_S),
+                                   ready_at=t_armed + routine.ARM_SETTLE_S,
+                                   blend=routine.BLEND_SPLINES, link=link, telemetry=telemetry,
+                                   arrival=arrival, abort_port=routine.ABORT_UDP_PORT))
+            csv_path = os.path.join(recorder.path, 'timeline.csv') if recorder else routine.TIMELINE_CSV
+            if csv_path and executor.timeline and executor.timeline.segments:
+                print(f"[TIMELINE] Trace written to {executor.timeline.export_csv(csv_path)}")
+        finally:
+            music.stop()
+            print(music.report())
+            if recorder:
+                recorder.close()
+            if link:
+                link.close()
+                print(link.report())
+            if sender:
+                print(sender.report())
+                sender.close()
+            try:
+                cf.commander.send_stop_setpoint()
+            except Exception:
+                pass
+            try:
+                cf.platform.send_arming_request(False)
+            except Exception:
+                pass
+            print("[DISARM] Disarmed.")
+            timing = get_hl_calls(cf.high_level_commander).summary()
+            if timing:
+                print("[HL] Command send timing:\n" + timing)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fly a show on the asyncio runtime.")
+    ap.add_argument('--show', help="show JSON file (default: main.SHOW_FILE)")
+    ap.add_argument('--venue', help="venue overlay JSON file")
+    args = ap.parse_args()
+    main(args.show, args.venue)
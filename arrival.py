@@ -0,0 +1,125 @@
+# arrival.py
+"""
+Pose-feedback segment completion.
+
+ArrivalDetector is fed by the pose log stream (on_log) and decides when the
+drone has reached the target of the current segment: within pos_tol of it
+and slower than vel_tol. goto()/land()/fly_waypoints() take an optional
+detector and end their wait at arrival instead of at the fixed deadline,
+which stays as the upper bound.
+
+Inside a running show the next segment still starts on its planned slot
+(the music doesn't move), so there the detector mainly reports how late
+the drone reaches each target. Outside a show (and for the final landing,
+which runs after the show clock stops) the next command goes out on arrival.
+
+Every completion records how late it was against the commanded move's end
+(negative = early; None = not reached by the deadline) and the position
+error at completion.
+
+Speed comes from the estimator's velocity when a velocity block feeds
+on_velocity (the telemetry motion group). Without one it is estimated by
+differencing positions, which is noisy at 100 Hz with 1 ms timestamps.
+"""
+import math
+
+import show_clock
+import safe_sleep
+
+POSE_NAMES = ('stateEstimate.x', 'stateEstimate.y', 'stateEstimate.z')
+VEL_NAMES = ('stateEstimate.vx', 'stateEstimate.vy', 'stateEstimate.vz')
+
+class ArrivalDetector:
+    def __init__(self, pos_tol=0.05, vel_tol=0.10, names=POSE_NAMES, vel_names=VEL_NAMES):
+        """
+        names: keys of x, y, z in a pose sample; vel_names: keys of vx, vy, vz
+        in a velocity sample (variable names, or telemetry columns).
+        """
+        self.pos_tol = pos_tol
+        self.vel_tol = vel_tol
+        self.names = names
+        self.vel_names = vel_names
+        self._measured_vel = False   # speed comes from on_velocity
+        self.pose = None          # (x, y, z)
+        self.speed = 0.0
+        self._last = None         # (t_log_s, x, y, z)
+        self._target = None       # (x, y, z); None axes are ignored
+        self._arrived_at = None
+        self.results = []         # [label, late_s or None, err_m]
+
+    # ---------- producer (log thread) ----------
+    def on_log(self, timestamp, data, logconf):
+        nx, ny, nz = self.names
+        x, y, z = data[nx], data[ny], data[nz]
+        if not self._measured_vel:
+            t = timestamp / 1000.0
+            if self._last is not None and t > self._last[0]:
+                lt, lx, ly, lz = self._last
+                self.speed = math.sqrt((x - lx) ** 2 + (y - ly) ** 2 + (z - lz) ** 2) / (t - lt)
+            self._last = (t, x, y, z)
+        self.pose = (x, y, z)
+        self._check()
+
+    def on_velocity(self, timestamp, data, logconf):
+        nvx, nvy, nvz = self.vel_names
+        self._measured_vel = True
+        self.speed = math.sqrt(data[nvx] ** 2 + data[nvy] ** 2 + data[nvz] ** 2)
+        self._check()
+
+    def _check(self):
+        if (self._target is not None and self._arrived_at is None
+                and self.error() <= self.pos_tol and self.speed <= self.vel_tol):
+            self._arrived_at = show_clock.now()
+            safe_sleep.wake()
+
+    # ---------- consumer (primitive) ----------
+    def error(self):
+        """Distance from the current pose to the target over the target's axes (inf without a pose)."""
+        if self.pose is None or self._target is None:
+            return float('inf')
+        return math.sqrt(sum((p - t) ** 2 for p, t in zip(self.pose, self._target) if t is not None))
+
+    def expect(self, x, y, z):
+        """New target (None = don't care about that axis)."""
+        self._arrived_at = None
+        self._target = (x, y, z)
+
+    def arrived(self):
+        return self._arrived_at is not None
+
+    def wait(self, deadline, move_end, label="", interruptible=True):
+        """
+        Wait until arrival or `deadline` (absolute show-clock times). move_end
+        is when the commanded move itself ends, for the lateness figure.
+        Returns True if the drone arrived.
+        """
+        safe_sleep.safe_sleep_until(deadline, interruptible, until=self.arrived)
+        return self.finish(move_end, label)
+
+    def finish(self, move_end, label=""):
+        """
+        Record the current target's result and drop it; returns True if the
+        drone arrived. wait() calls it; step generators (safe_sleep.run_steps())
+        yield (deadline, detector.arrived) and call it after the wait.
+        """
+        arrived = self.arrived()
+        late = self._arrived_at - move_end if arrived else None
+        self.results.append([label, late, self.error()])
+        self._target = None
+        return arrived
+
+    def report(self):
+        if not self.results:
+            return "[ARRIVAL] No segments."
+        reached = [r for r in self.results if r[1] is not None]
+        errs = [r[2] for r in self.results if r[2] != float('inf')]
+        line = (f"[ARRIVAL] {len(reached)}/{len(self.results)} targets reached within "
+                f"{100 * self.pos_tol:.0f} cm / {100 * self.vel_tol:.0f} cm/s")
+        if reached:
+            lates = [r[1] for r in reached]
+            worst = max(reached, key=lambda r: r[1])
+            line += (f" | arrival vs move end: mean {1e3 * sum(lates) / len(lates):+.0f} ms, "
+                     f"max {1e3 * worst[1]:+.0f} ms ({worst[0] or 'unnamed'})")
+        if errs:
+            line += f" | error at completion: mean {100 * sum(errs) / len(errs):.1f} cm, max {100 * max(errs):.1f} cm"
+        return line
@@ -1,10 +1,126 @@
-import time, math, logging, inspect
+import time, math, logging, inspect, weakref, threading
+import show_clock
+from safe_sleep import safe_sleep_until, wake, run_steps
 logging.basicConfig(level=logging.INFO)
 
+# ---------- estimator readiness ----------
+KALMAN_VARS = ('kalman.varPX', 'kalman.varPY', 'kalman.varPZ')
+
+class EstimatorSettle:
+    """
+    Watches the Kalman position variances (log block) and sets `event` once
+    all three have stayed below `threshold` (m^2) for `window_s`. Samples
+    logged before arm() (i.e. before the reset pulse ended) are ignored.
+    """
+
+    def __init__(self, cf, threshold=1e-3, window_s=0.3, period_ms=20):
+        self.cf = cf
+        self.threshold = threshold
+        self.window_s = window_s
+        self.period_ms = period_ms
+        self.event = threading.Event()
+        self.t_armed = None
+        self.settle_s = None
+        self.last_var = None
+        self._below_since = None
+        self._conf = None
+
+    def make_config(self):
+        """The variance LogConfig, not yet added (preflight.py starts it with the others)."""
+        from cflib.crazyflie.log import LogConfig
+        conf = LogConfig(name='EstVar', period_in_ms=self.period_ms)
+        for name in KALMAN_VARS:
+            conf.add_variable(name, 'float')
+        conf.data_received_cb.add_callback(self._on_log)
+        self._conf = conf
+        return conf
+
+    def start(self):
+        conf = self.make_config()
+        self.cf.log.add_config(conf)
+        conf.start()
+
+    def arm(self):
+        self._below_since = None
+        self.t_armed = show_clock.now()
+
+    def _on_log(self, timestamp, data, logconf):
+        if self.t_armed is None or self.event.is_set():
+            return
+        now = show_clock.now()
+        self.last_var = max(data[v] for v in KALMAN_VARS)
+        if self.last_var >= self.threshold:
+            self._below_since = None
+        elif self._below_since is None:
+            self._below_since = now
+        elif now - self._below_since >= self.window_s:
+            self.settle_s = now - self.t_armed
+            self.event.set()
+            wake()
+
+    def stop(self):
+        if self._conf is not None:
+            try:
+                self._conf.stop()
+                self._conf.delete()
+            except Exception:
+                pass
+            self._conf = None
+
+    def finish(self, timeout_s):
+        """Stop logging and report; returns the settle time (timeout_s if it never settled)."""
+        self.stop()
+        if not self.event.is_set():
+            print(f"[EST] Estimator did not settle within {timeout_s:.1f} s "
+                  f"(last max variance {self.last_var})")
+            return timeout_s
+        print(f"[EST] Estimator settled in {self.settle_s:.2f} s")
+        return self.settle_s
+
+def reset_estimator(cf, *, threshold=1e-3, window_s=0.3, timeout_s=5.0, settle=None):
+    """
+    Pulse kalman.resetEstimation and wait until the position variances have
+    settled (see EstimatorSettle) instead of a fixed 1 s. Returns the settle
+    time after the reset in seconds (timeout_s if it never settled).
+    Falls back to the fixed wait if the variances can't be logged.
+    settle: an already started EstimatorSettle (its own threshold/window apply).
+    """
+    return run_steps(reset_estimator_steps(cf, threshold=threshold, window_s=window_s,
+                                           timeout_s=timeout_s, settle=settle))
+
+def reset_estimator_steps(cf, *, threshold=1e-3, window_s=0.3, timeout_s=5.0, settle=None):
+    """reset_estimator() as a step generator (see safe_sleep.run_steps())."""
+    if settle is None:
+        settle = EstimatorSettle(cf, threshold, window_s)
+        try:
+            settle.start()
+        except Exception as e:
+            print(f"[EST] Can't log Kalman variances ({e}); using a fixed 1.0 s settle")
+            settle = None
+    cf.param.set_value('kalman.resetEstimation', '1')
+    yield show_clock.now() + 0.1, None
+    cf.param.set_value('kalman.resetEstimation', '0')
+    if settle is None:
+        yield show_clock.now() + 1.0, None
+        return 1.0
+    settle.arm()
+    try:
+        yield settle.t_armed + timeout_s, settle.event.is_set
+    finally:
+        settle.stop()
+    return settle.finish(timeout_s)
+
 # ---------- generic helpers ----------
-def reset_estimator(cf):
-    cf.param.set_value('kalman.resetEstimation','1'); time.sleep(0.1)
-    cf.param.set_value('kalman.resetEstimation','0'); time.sleep(1.0)
+def wait_event(event, timeout_s, interruptible=True):
+    """
+    Wait on a threading.Event for up to timeout_s of show-clock time; returns
+    event.is_set(). This is a safe_sleep_until() wait, so an emergency ends it
+    at once (KeyboardInterrupt unless interruptible is False). Whoever sets
+    the event calls safe_sleep.wake() so the wait sees it right away.
+    """
+    safe_sleep_until(show_clock.now() + timeout_s, interruptible, until=event.is_set)
+    return event.is_set()
+
 
 def call_with_keywords(func, kwargs_ordered):
     sig = inspect.signature(func)
@@ -18,69 +134,217 @@ def call_with_keywords(func, kwargs_ordered):
         raise TypeError(f"{func.__name__} requires {missing} (available keys: {names})")
     return func(**call_kwargs)
 
-# ---------- HL compat: takeoff / land ----------
-def hl_takeoff_compat(hl, height_m, ascent_vel=0.6):
-    try:
-        return call_with_keywords(hl.takeoff, [
-            ('height', height_m),
-            ('velocity', ascent_vel),
-            ('duration_s', max(1.0, height_m / max(0.1, ascent_vel))),
-        ])
-    except Exception:
+# ---------- HL call-shape cache ----------
+# Each compat command lists the call forms it may need, in the same order the
+# old try/except chains used. The first form that succeeds on a given
+# HighLevelCommander is cached (per instance, per "which args are None"
+# pattern) so later calls go straight to it without inspect.signature.
+
+def _keyword_form(func_name, keys):
+    """Keyword call built from the signature once; None-valued args are dropped per call."""
+    def build(hl):
+        func = getattr(hl, func_name)
         try:
-            return hl.takeoff(height_m, ascent_vel)
-        except Exception:
+            params = inspect.signature(func).parameters
+        except ValueError as e:   # no introspectable signature: not this form
+            raise TypeError(f"{func_name}: {e}") from e
+        picks = [(i, k) for i, k in enumerate(keys) if k in params]
+        def call(*args):
+            return func(**{k: args[i] for (i, k) in picks if args[i] is not None})
+        return call
+    return build
+
+def _positional_form(func_name, pick):
+    """Positional call; `pick` maps the normalized args to the positional tuple."""
+    def build(hl):
+        func = getattr(hl, func_name)
+        return lambda *args: func(*pick(*args))
+    return build
+
+# go_to args: (x, y, z, yaw_rad, yaw_deg, duration_s, relative)
+_GO_TO_FORMS = (
+    _keyword_form('go_to', ('x', 'y', 'z', 'yaw', 'yaw_deg', 'duration_s', 'relative')),
+    _positional_form('go_to', lambda x, y, z, yr, yd, d, rel:
+                     (x, y, z, yr, d) if d is not None else (x, y, z, yr)),
+    _keyword_form('go_to', ('x', 'y', 'z', None, None, 'duration_s', None)),
+)
+
+# takeoff args: (height, velocity, duration_s)
+_TAKEOFF_FORMS = (
+    _keyword_form('takeoff', ('height', 'velocity', 'duration_s')),
+    _positional_form('takeoff', lambda h, v, d: (h, v)),
+    _positional_form('takeoff', lambda h, v, d: (h, d)),
+    _positional_form('takeoff', lambda h, v, d: (h,)),
+)
+
+# land args: (velocity, height, duration_s)
+_LAND_FORMS = (
+    _keyword_form('land', ('velocity', 'height', 'duration_s')),
+    _positional_form('land', lambda v, h, d: (v, d)),
+    _positional_form('land', lambda v, h, d: (0.0, d)),
+    _positional_form('land', lambda v, h, d: (d,)),
+    _keyword_form('land', (None, 'height', None)),
+)
+
+# move_distance args: (x, y, z, duration_s, velocity)
+_MOVE_DISTANCE_FORMS = (
+    _keyword_form('move_distance', ('x', 'y', 'z', 'duration_s', 'velocity')),
+    _positional_form('move_distance', lambda x, y, z, d, v:
+                     (x, y, z, d) if d is not None else (x, y, z)),
+    _keyword_form('move_distance', ('x', 'y', 'z', None, 'velocity')),
+)
+
+class HLCalls:
+    """Resolved call forms + per-command timing for one HighLevelCommander."""
+
+    def __init__(self, hl):
+        self.hl = hl
+        self._resolved = {}
+        self.stats = {}   # command -> [count, total_s, max_s, last_s]
+        self.setpoint_listeners = []   # see add_setpoint_listener()
+
+    def call(self, command, forms, *args):
+        fast = self._resolved.get((command, tuple(a is None for a in args)))
+        if fast is not None:
+            return fast(*args)
+        return self._probe(command, forms, args)
+
+    def fast_path(self, command, *args):
+        """
+        Prebound callable for `command` taking the normalized args (see the
+        *_FORMS tables), or None if no call with this pattern has resolved yet.
+        """
+        return self._resolved.get((command, tuple(a is None for a in args)))
+
+    def _probe(self, command, forms, args):
+        # Only a TypeError means "this cflib takes another signature"; anything
+        # else (radio down, bad value) is a real failure of the command and is
+        # raised as is, with nothing cached for the next call to reuse
+        last_exc = None
+        for build in forms:
             try:
-                return hl.takeoff(height_m, max(1.0, height_m / max(0.1, ascent_vel)))
-            except Exception:
-                return hl.takeoff(height_m)
+                call = build(self.hl)
+                t0 = time.perf_counter()
+                result = call(*args)
+            except TypeError as e:
+                last_exc = e
+                continue
+            self._record(command, time.perf_counter() - t0)
+            self._resolved[(command, tuple(a is None for a in args))] = self._timed(command, call)
+            return result
+        raise last_exc if last_exc else RuntimeError(f"{command} not supported")
+
+    def _timed(self, command, call):
+        record = self._record
+        perf = time.perf_counter
+        def fast(*args):
+            t0 = perf()
+            try:
+                return call(*args)
+            finally:
+                record(command, perf() - t0)
+        return fast
+
+    def _record(self, command, dt):
+        if _send_listeners:
+            note_send(command, dt)
+        s = self.stats.get(command)
+        if s is None:
+            self.stats[command] = [1, dt, dt, dt]
+        else:
+            s[0] += 1; s[1] += dt; s[3] = dt
+            if dt > s[2]:
+                s[2] = dt
+
+    def summary(self):
+        lines = []
+        for command, (n, total, worst, last) in sorted(self.stats.items()):
+            lines.append(f"{command:14s} n={n:4d}  mean={1e3 * total / n:7.3f} ms  "
+                         f"max={1e3 * worst:7.3f} ms  last={1e3 * last:7.3f} ms")
+        return "\n".join(lines)
+
+_hl_calls = weakref.WeakKeyDictionary()
+
+def get_hl_calls(hl):
+    """The HLCalls cache for this commander (created on first use)."""
+    try:
+        calls = _hl_calls.get(hl)
+        if calls is None:
+            calls = _hl_calls[hl] = HLCalls(hl)
+    except TypeError:   # not weak-referenceable (e.g. some mocks)
+        calls = HLCalls(hl)
+    return calls
+
+# ---------- send / upload listeners ----------
+_send_listeners = []   # fn(command, send_s) after every HL command send (timeline trace)
+_upload_listeners = []   # fn(n_bytes, n_packets) after every trajectory memory write
+
+def add_send_listener(fn):
+    _send_listeners.append(fn)
+
+def remove_send_listener(fn):
+    if fn in _send_listeners:
+        _send_listeners.remove(fn)
+
+def note_send(command, dt):
+    """Report a command send that didn't go through HLCalls (e.g. start_trajectory)."""
+    for fn in _send_listeners:
+        fn(command, dt)
+
+def add_upload_listener(fn):
+    _upload_listeners.append(fn)
+
+def remove_upload_listener(fn):
+    if fn in _upload_listeners:
+        _upload_listeners.remove(fn)
+
+def note_upload(n_bytes, n_packets):
+    """Report a trajectory memory write of n_bytes in n_packets memory-write packets."""
+    for fn in _upload_listeners:
+        fn(n_bytes, n_packets)
+
+# ---------- commanded-setpoint listeners ----------
+# Per HighLevelCommander (kept on its HLCalls): listener.on_setpoint(x, y, z,
+# yaw_deg) for every absolute go_to and land, listener.on_trajectory(traj,
+# t0, time_scale) when an uploaded trajectory starts at show-clock time t0.
+# The flight recorder uses them to log what was commanded next to what was flown.
+def add_setpoint_listener(hl, listener):
+    get_hl_calls(hl).setpoint_listeners.append(listener)
+
+def remove_setpoint_listener(hl, listener):
+    listeners = get_hl_calls(hl).setpoint_listeners
+    if listener in listeners:
+        listeners.remove(listener)
+
+def note_trajectory(hl, traj, t0, time_scale=1.0):
+    """Report that `traj` (a trajectory.Trajectory) started on `hl` at show-clock time t0."""
+    for listener in get_hl_calls(hl).setpoint_listeners:
+        listener.on_trajectory(traj, t0, time_scale)
+
+# ---------- HL compat: takeoff / land ----------
+def hl_takeoff_compat(hl, height_m, ascent_vel=0.6):
+    return get_hl_calls(hl).call('takeoff', _TAKEOFF_FORMS,
+                                 height_m, ascent_vel,
+                                 max(1.0, height_m / max(0.1, ascent_vel)))
 
 def hl_land_compat(hl, from_height_m, descent_vel=0.4):
     duration = max(1.5, from_height_m / max(0.1, descent_vel))
-    try:
-        return call_with_keywords(hl.land, [
-            ('velocity', descent_vel),
-            ('height', 0.0),
-            ('duration_s', duration),
-        ])
-    except Exception:
-        for attempt in (
-            lambda: hl.land(descent_vel, duration),
-            lambda: hl.land(0.0,       duration),
-            lambda: hl.land(duration),
-        ):
-            try:
-                return attempt()
-            except Exception:
-                pass
-        return call_with_keywords(hl.land, [('height', 0.0)])
+    calls = get_hl_calls(hl)
+    for listener in calls.setpoint_listeners:
+        listener.on_setpoint(math.nan, math.nan, 0.0, None)
+    return calls.call('land', _LAND_FORMS, descent_vel, 0.0, duration)
 
 # ---------- HL compat: absolute go_to ----------
 def hl_go_to_compat(hl, x, y, z, *, yaw_deg=None, duration_s=None, relative=False):
     """
     Preferred for ABSOLUTE setpoints.
     """
-    try:
-        return call_with_keywords(hl.go_to, [
-            ('x', x), ('y', y), ('z', z),
-            ('yaw', math.radians((yaw_deg or 0.0))),
-            ('yaw_deg', yaw_deg),
-            ('duration_s', duration_s),
-            ('relative', relative),
-        ])
-    except Exception:
-        try:
-            yaw_rad = math.radians(yaw_deg) if yaw_deg is not None else 0.0
-            if duration_s is not None:
-                return hl.go_to(x, y, z, yaw_rad, duration_s)
-            return hl.go_to(x, y, z, yaw_rad)
-        except Exception:
-            if duration_s is not None:
-                return call_with_keywords(hl.go_to, [
-                    ('x', x), ('y', y), ('z', z),
-                    ('duration_s', duration_s),
-                ])
-            return call_with_keywords(hl.go_to, [('x', x), ('y', y), ('z', z)])
+    yaw_rad = math.radians(yaw_deg) if yaw_deg is not None else 0.0
+    calls = get_hl_calls(hl)
+    if not relative:
+        for listener in calls.setpoint_listeners:
+            listener.on_setpoint(x, y, z, yaw_deg)
+    return calls.call('go_to', _GO_TO_FORMS, x, y, z, yaw_rad, yaw_deg, duration_s, relative)
 
 # ---------- HL compat: RELATIVE safe steps ----------
 def hl_move_distance_compat(hl, dx, dy, dz, *, duration_s=None, velocity=None):
@@ -88,24 +352,10 @@ def hl_move_distance_compat(hl, dx, dy, dz, *, duration_s=None, velocity=None):
     SAFE relative motion. Preferred for diag/forward/left/backward/upward/downward.
     """
     try:
-        return call_with_keywords(hl.move_distance, [
-            ('x', dx), ('y', dy), ('z', dz),
-            ('duration_s', duration_s), ('velocity', velocity),
-        ])
-    except Exception:
-        try:
-            if duration_s is not None:
-                return hl.move_distance(dx, dy, dz, duration_s)
-            else:
-                return hl.move_distance(dx, dy, dz)
-        except Exception:
-            if velocity is not None:
-                # final attempt: some firmwares accept only velocity + xyz keywords
-                return call_with_keywords(hl.move_distance, [
-                    ('x', dx), ('y', dy), ('z', dz),
-                    ('velocity', velocity),
-                ])
-            raise RuntimeError("move_distance not supported; aborting relative move.")
+        return get_hl_calls(hl).call('move_distance', _MOVE_DISTANCE_FORMS,
+                                     dx, dy, dz, duration_s, velocity)
+    except Exception as e:
+        raise RuntimeError("move_distance not supported; aborting relative move.") from e
 
 def face_center_yaw_deg(px, py, cx, cy, world_yaw_offset_deg=0.0):
     ang = math.degrees(math.atan2(cy - py, cx - px))
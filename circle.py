@@ -1,23 +1,71 @@
-import math
-from cfutils import hl_go_to_compat, face_center_yaw_deg
-from safe_sleep import safe_sleep
+import functools
+from safe_sleep import run_steps
+from timeline import segment_plan
+from trajectory import compile_circle
+from waypoints import circle_waypoints, waypoint_steps, auto_circle_segments
 
 def circle(hl, *, cx=0.0, cy=0.0, z=1.5, radius=1.2, total_time=20.0,
-           segments=72, face_center=True, world_yaw_offset_deg=0.0, start_angle_deg=0.0):
+           segments=72, face_center=True, world_yaw_offset_deg=0.0, start_angle_deg=0.0,
+           runner=None, chord_tol=None):
     """
     Absolute CCW orbit around (cx,cy) at height z. Ends where it started.
     
     Args:
         start_angle_deg: Starting angle in degrees (0° = right, 90° = top/front, 180° = left, 270° = bottom/back)
+        runner: Optional trajectory.TrajectoryRunner. If given, the orbit is flown as one
+                uploaded polynomial trajectory instead of `segments` go_to packets
+                (same start point and total timing). Upload it beforehand
+                (circle_trajectory()); otherwise it is uploaded inside the approach slot.
+        chord_tol: Optional max chord error (m). If given, the go_to orbit uses as few
+                   waypoints as that allows instead of `segments` (same slot).
     """
+    run_steps(circle_steps(hl, cx=cx, cy=cy, z=z, radius=radius, total_time=total_time,
+                           segments=segments, face_center=face_center,
+                           world_yaw_offset_deg=world_yaw_offset_deg,
+                           start_angle_deg=start_angle_deg, runner=runner, chord_tol=chord_tol))
+
+def circle_steps(hl, *, cx=0.0, cy=0.0, z=1.5, radius=1.2, total_time=20.0,
+                 segments=72, face_center=True, world_yaw_offset_deg=0.0, start_angle_deg=0.0,
+                 runner=None, chord_tol=None):
+    """circle() as a step generator (see safe_sleep.run_steps())."""
     dt = max(0.02, total_time / float(segments))
-    start_angle_rad = math.radians(start_angle_deg)
-    
-    for k in range(segments + 1):
-        theta = start_angle_rad + 2.0 * math.pi * (k / float(segments))
-        px = cx + radius * math.cos(theta)
-        py = cy + radius * math.sin(theta)
-        yaw_deg = (face_center_yaw_deg(px, py, cx, cy, world_yaw_offset_deg)
-                   if face_center else None)
-        hl_go_to_compat(hl, px, py, z, yaw_deg=yaw_deg, duration_s=dt, relative=False)
-        safe_sleep(dt)
\ No newline at end of file
+
+    # The first waypoint (the start point) keeps dt; the rest share the orbit time
+    n, step = segments, dt
+    if chord_tol is not None and runner is None:
+        n = auto_circle_segments(radius, segments * dt, chord_tol)
+        step = segments * dt / n
+    # All waypoints are computed before the first command goes out
+    wp = circle_waypoints(cx=cx, cy=cy, z=z, radius=radius, segments=n, dt=step,
+                          face_center=face_center, world_yaw_offset_deg=world_yaw_offset_deg,
+                          start_angle_deg=start_angle_deg, approach_s=dt)
+    t_start = segment_plan((segments + 1) * dt, "circle")
+    if runner is None:
+        yield from waypoint_steps(hl, wp, t_start, step)
+        return
+
+    # Same timing as the go_to version: dt to reach the start point, then the orbit
+    key, build = circle_trajectory(cx=cx, cy=cy, z=z, radius=radius, total_time=total_time,
+                                   segments=segments, face_center=face_center,
+                                   world_yaw_offset_deg=world_yaw_offset_deg,
+                                   start_angle_deg=start_angle_deg)
+    yield from waypoint_steps(hl, wp[:1], t_start, 0.0, dt)
+    trajectory_id = yield functools.partial(runner.prepare, key, build)   # no upload if resident
+    yield t_start + dt, None
+    runner.start(trajectory_id, segments * dt)
+    yield t_start + dt + segments * dt, None
+
+def circle_trajectory(*, cx=0.0, cy=0.0, z=1.5, radius=1.2, total_time=20.0, segments=72,
+                      face_center=True, world_yaw_offset_deg=0.0, start_angle_deg=0.0):
+    """
+    (key, build) of the trajectory circle() flies with a runner; build()
+    compiles it. Upload it with runner.prepare(key, build) before takeoff
+    and circle() only sends the start command. Circles that differ only in
+    total_time share the key, and so one upload.
+    """
+    dt = max(0.02, total_time / float(segments))
+    shape = dict(cx=cx, cy=cy, z=z, radius=radius, face_center=face_center,
+                 world_yaw_offset_deg=world_yaw_offset_deg, start_angle_deg=start_angle_deg)
+    # Keyed by shape only; runner.start(id, duration) replays it at any speed
+    return (('circle',) + tuple(sorted(shape.items())),
+            functools.partial(compile_circle, total_time=segments * dt, **shape))
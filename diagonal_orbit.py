@@ -1,5 +1,8 @@
-import time, math
-from cfutils import hl_go_to_compat, face_center_yaw_deg
+import functools
+from safe_sleep import run_steps
+from timeline import segment_plan
+from trajectory import compile_diagonal_orbit
+from waypoints import diagonal_orbit_waypoints, waypoint_steps, auto_pass_subdivisions
 
 def diagonal_orbit(hl, *,
                    cx=0.0, cy=0.0,
@@ -8,7 +11,9 @@ def diagonal_orbit(hl, *,
                    passes=10,
                    total_time=24.0,
                    face_center=True,
-                   world_yaw_offset_deg=0.0):
+                   world_yaw_offset_deg=0.0,
+                   runner=None,
+                   chord_tol=None):
     """
     Orbits the performer (cx, cy) in a series of 'passes',
     alternating between z_low and z_high at each step.
@@ -26,43 +31,68 @@ def diagonal_orbit(hl, *,
         total_time: The total time for the entire sequence
         face_center: If True, always face the performer (cx, cy)
         world_yaw_offset_deg: Yaw offset from facing center
+        runner: Optional trajectory.TrajectoryRunner. If given, pass 0 is still a go_to
+                (it starts from wherever the drone is) and the remaining passes are
+                flown as one uploaded trajectory. Upload it beforehand
+                (diagonal_trajectory()); otherwise it is uploaded during pass 0.
+        chord_tol: Optional max chord error (m) for the go_to version. Passes after the
+                   first then follow the arc in as many waypoints as that needs.
     """
     
+    run_steps(diagonal_orbit_steps(hl, cx=cx, cy=cy, z_low=z_low, z_high=z_high, radius=radius,
+                                   passes=passes, total_time=total_time, face_center=face_center,
+                                   world_yaw_offset_deg=world_yaw_offset_deg, runner=runner,
+                                   chord_tol=chord_tol))
+
+def diagonal_orbit_steps(hl, *, cx=0.0, cy=0.0, z_low=1.2, z_high=2.0, radius=1.2, passes=10,
+                         total_time=24.0, face_center=True, world_yaw_offset_deg=0.0,
+                         runner=None, chord_tol=None):
+    """diagonal_orbit() as a step generator (see safe_sleep.run_steps())."""
     if passes <= 0:
         return
     
     # Calculate time for each movement segment
-    # Note: This follows the pattern of circle.py, using time.sleep()
-    # The 'safe_sleep' from main.py is not used here to keep the module simple.
+    # Each pass gets a fixed slot of dt on the show clock; the move uses most of it
     dt = max(0.02, total_time / float(passes))
     duration_s = dt * 0.95  # Use most of the time for movement
-    sleep_s = dt * 0.05     # Small sleep buffer
+    subdiv = 1
+    if chord_tol is not None and runner is None:
+        subdiv = auto_pass_subdivisions(radius, passes, passes * dt, chord_tol)
              
-    angle_step = (2.0 * math.pi) / float(passes)
+    # All waypoints are computed before the first command goes out
+    wp = diagonal_orbit_waypoints(cx=cx, cy=cy, z_low=z_low, z_high=z_high, radius=radius,
+                                  passes=passes, dt=dt, face_center=face_center,
+                                  world_yaw_offset_deg=world_yaw_offset_deg, subdiv=subdiv)
+    t_start = segment_plan(passes * dt, "diagonal_orbit")
+
+    if runner is None:
+        # Pass i goes to the (i+1)th point on the circle, alternating z_high / z_low
+        yield from waypoint_steps(hl, wp, t_start, dt / subdiv, duration_s)
+        return
+
+    # Pass 0 starts from wherever the drone is, so it stays a go_to
+    yield from waypoint_steps(hl, wp[:1], t_start, 0.0, duration_s)
+    if passes > 1:
+        trajectory_id = yield functools.partial(runner.prepare, *diagonal_trajectory(
+            cx=cx, cy=cy, z_low=z_low, z_high=z_high, radius=radius, passes=passes,
+            total_time=total_time, face_center=face_center,
+            world_yaw_offset_deg=world_yaw_offset_deg))
+        yield t_start + dt, None
+        runner.start(trajectory_id, (passes - 1) * dt)
+    yield t_start + passes * dt, None
 
-    for i in range(passes):
-        # Determine target height for this pass
-        # Pass 0 (i=0) is "up" to z_high
-        # Pass 1 (i=1) is "down" to z_low
-        mode_is_up = (i % 2 == 0)
-        z_end = z_high if mode_is_up else z_low
-        
-        # Calculate target (x, y) position
-        # We are moving TO the (i+1)th point on the circle
-        angle_end = (i + 1) * angle_step
-        
-        x_end = cx + radius * math.cos(angle_end)
-        y_end = cy + radius * math.sin(angle_end)
-        
-        # Calculate yaw to face the performer
-        yaw_deg = (face_center_yaw_deg(x_end, y_end, cx, cy, world_yaw_offset_deg)
-                   if face_center else None)
-        
-        # Execute movement
-        hl_go_to_compat(hl, x=x_end, y=y_end, z=z_end,
-                        yaw_deg=yaw_deg,
-                        duration_s=duration_s,
-                        relative=False)
-        
-        # Sleep for the remaining duration
-        time.sleep(duration_s + sleep_s)
\ No newline at end of file
+def diagonal_trajectory(*, cx=0.0, cy=0.0, z_low=1.2, z_high=2.0, radius=1.2, passes=10,
+                        total_time=24.0, face_center=True, world_yaw_offset_deg=0.0):
+    """
+    (key, build) of the trajectory diagonal_orbit() flies after pass 0 with
+    a runner (passes > 1); build() compiles it. Upload it with
+    runner.prepare(key, build) before takeoff. Orbits that differ only in
+    total_time share the key, and so one upload.
+    """
+    dt = max(0.02, total_time / float(passes))
+    # Keyed by shape only; runner.start(id, duration) replays it at any speed
+    key = ('diagonal_orbit', cx, cy, z_low, z_high, radius, passes,
+           face_center, world_yaw_offset_deg)
+    return key, functools.partial(compile_diagonal_orbit, cx=cx, cy=cy, z_low=z_low, z_high=z_high,
+                                  radius=radius, passes=passes, total_time=passes * dt,
+                                  face_center=face_center, world_yaw_offset_deg=world_yaw_offset_deg)
@@ -0,0 +1,213 @@
+# flight_recorder.py
+"""
+In-flight telemetry recorder.
+
+Every pose log sample is written, together with the commanded setpoint
+and the show-clock time, into preallocated memory-mapped column files
+(one .npy per column). The setpoint is the last absolute go_to/land target
+sent to the recorder's commander, or, while an uploaded trajectory (orbit
+or blended spline) is flying, that trajectory evaluated at the sample time. Every other log block attached with add_block()
+(e.g. the telemetry motion and status groups) gets its own table in a
+subdirectory, with a column per logged variable at that block's rate.
+The log callbacks only store floats into the mapped arrays; a background
+thread flushes them to disk, so the callbacks never wait on I/O. After
+the flight, load_flight() maps the columns back as NumPy arrays without
+copying.
+
+    flights/20261017-201500/
+        meta.json           {"n": rows written, "capacity": .., "columns": [...],
+                             "blocks": {"motion": {"n": .., "columns": [...]}, ...}}
+        t_show.npy  x.npy  y.npy  ...
+        motion/t_show.npy  motion/stateEstimate.vx.npy  ...
+"""
+import os, json, math, time, threading
+import numpy as np
+
+import cfutils
+import show_clock
+from timeline import get_show
+
+COLUMNS = ('t_wall', 't_show', 't_log', 'x', 'y', 'z', 'yaw_deg',
+           'sp_x', 'sp_y', 'sp_z', 'sp_yaw_deg')
+POSE_NAMES = ('stateEstimate.x', 'stateEstimate.y', 'stateEstimate.z', 'stabilizer.yaw')
+TIME_COLUMNS = ('t_wall', 't_show', 't_log')
+
+class BlockTable:
+    """Memory-mapped columns for one extra log block: times plus every logged variable."""
+
+    def __init__(self, path, variables, keys, capacity):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.columns = TIME_COLUMNS + tuple(variables)
+        self.capacity = capacity
+        self.n = 0
+        self.dropped = 0
+        self.cols = {c: np.lib.format.open_memmap(os.path.join(path, c + '.npy'), mode='w+',
+                                                  dtype=np.float64, shape=(capacity,))
+                     for c in self.columns}
+        self.cols['t_show'][:] = np.nan
+        self._slots = [(self.cols[v], k) for v, k in zip(variables, keys)]
+
+    def on_log(self, timestamp, data, logconf):
+        i = self.n
+        if i >= self.capacity:
+            self.dropped += 1
+            return
+        c = self.cols
+        show = get_show()
+        c['t_wall'][i] = time.time()
+        if show is not None:
+            c['t_show'][i] = show.show_time()
+        c['t_log'][i] = timestamp / 1000.0
+        for col, k in self._slots:
+            col[i] = data[k]
+        self.n = i + 1   # publish the row only once it is complete
+
+    def meta(self):
+        return {'n': self.n, 'capacity': self.capacity, 'columns': list(self.columns),
+                'dropped': self.dropped}
+
+    def flush(self):
+        for arr in self.cols.values():
+            arr.flush()
+
+class FlightRecorder:
+    def __init__(self, root='flights', *, capacity=100 * 60 * 15, flush_s=1.0, name=None,
+                 names=POSE_NAMES, hl=None):
+        """
+        names: keys of x, y, z, yaw in a log sample (variable names, or telemetry columns).
+        hl: the HighLevelCommander whose commanded setpoints are recorded.
+        """
+        self.names = names
+        self.hl = hl
+        self.path = os.path.join(root, name or time.strftime('%Y%m%d-%H%M%S'))
+        os.makedirs(self.path, exist_ok=True)
+        self.capacity = capacity
+        self.n = 0
+        self.dropped = 0
+        self.cols = {c: np.lib.format.open_memmap(os.path.join(self.path, c + '.npy'), mode='w+',
+                                                  dtype=np.float64, shape=(capacity,))
+                     for c in COLUMNS}
+        for c in ('sp_x', 'sp_y', 'sp_z', 'sp_yaw_deg', 't_show'):
+            self.cols[c][:] = np.nan
+        self._setpoint = (np.nan, np.nan, np.nan, np.nan)
+        self._trajectory = None   # (Trajectory, t0, time_scale) while one is flying
+        self.blocks = {}    # name -> BlockTable
+        self._flush_s = flush_s
+        self._running = True
+        self._thread = threading.Thread(target=self._flusher, daemon=True)
+        self._thread.start()
+        if hl is not None:
+            cfutils.add_setpoint_listener(hl, self)
+        self._write_meta()
+
+    def add_block(self, name, variables, keys=None, capacity=None):
+        """
+        Record another log block: `variables` are its logged names, `keys`
+        how to index a sample (default: the names; telemetry rows use column
+        indices). Returns the LogConfig callback.
+        """
+        table = BlockTable(os.path.join(self.path, name), variables,
+                           variables if keys is None else keys, capacity or self.capacity)
+        self.blocks[name] = table
+        self._write_meta()
+        return table.on_log
+
+    def add_telemetry(self, telemetry):
+        """add_block() every block of a telemetry.Telemetry with more than the pose variables."""
+        for b in telemetry.blocks:
+            if not set(b.names) <= set(POSE_NAMES):
+                b.logconf.data_received_cb.add_callback(
+                    self.add_block(b.name, b.names, b.columns(b.names)))
+
+    # ---------- producers ----------
+    def on_setpoint(self, x, y, z, yaw_deg):
+        self._setpoint = (x, y, z, np.nan if yaw_deg is None else yaw_deg)
+        self._trajectory = None
+
+    def on_trajectory(self, traj, t0, time_scale=1.0):
+        self._trajectory = (traj, t0, time_scale) if traj is not None else None
+
+    def _commanded(self, t):
+        flying = self._trajectory
+        if flying is None:
+            return self._setpoint
+        traj, t0, scale = flying
+        x, y, z, yaw = traj.evaluate((t - t0) / scale)
+        return x, y, z, (math.degrees(yaw) + 180.0) % 360.0 - 180.0
+
+    def on_log(self, timestamp, data, logconf, received=None):
+        """
+        received: (show-clock time, wall time) the sample arrived at, for
+        callers that hand samples over later (aio_show.TelemetryPump);
+        default now.
+        """
+        i = self.n
+        if i >= self.capacity:
+            self.dropped += 1
+            return
+        c = self.cols
+        show = get_show()
+        t_clock, t_wall = received if received is not None else (show_clock.now(), time.time())
+        c['t_wall'][i] = t_wall
+        if show is not None:
+            c['t_show'][i] = t_clock - show.t0
+        c['t_log'][i] = timestamp / 1000.0
+        nx, ny, nz, nyaw = self.names
+        c['x'][i] = data[nx]
+        c['y'][i] = data[ny]
+        c['z'][i] = data[nz]
+        c['yaw_deg'][i] = data[nyaw]
+        sx, sy, sz, syaw = self._commanded(t_clock)
+        c['sp_x'][i] = sx
+        c['sp_y'][i] = sy
+        c['sp_z'][i] = sz
+        c['sp_yaw_deg'][i] = syaw
+        self.n = i + 1   # publish the row only once it is complete
+
+    # ---------- flushing ----------
+    def _write_meta(self):
+        meta = {'n': self.n, 'capacity': self.capacity, 'columns': list(COLUMNS),
+                'dropped': self.dropped, 'blocks': {n: b.meta() for n, b in self.blocks.items()}}
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+
+    def _flush(self):
+        for arr in self.cols.values():
+            arr.flush()
+        for b in self.blocks.values():
+            b.flush()
+        self._write_meta()
+
+    def _flusher(self):
+        while self._running:
+            time.sleep(self._flush_s)
+            try:
+                self._flush()
+            except Exception as e:
+                print(f"[REC] Flush failed: {e}")
+
+    def close(self):
+        self._running = False
+        self._thread.join(timeout=2.0 * self._flush_s)
+        if self.hl is not None:
+            cfutils.remove_setpoint_listener(self.hl, self)
+        self._flush()
+        print(f"[REC] {self.n} samples written to {self.path}"
+              + (f" ({self.dropped} dropped: capacity full)" if self.dropped else "")
+              + "".join(f", {name} {b.n}" + (f" ({b.dropped} dropped)" if b.dropped else "")
+                        for name, b in self.blocks.items()))
+
+def load_flight(path, block=None):
+    """
+    {column: array} for a recorded flight (or one of its extra log blocks);
+    the arrays are read-only views of the files.
+    """
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    if block is not None:
+        meta, path = meta.get('blocks', {})[block], os.path.join(path, block)
+    n = meta['n']
+    return {c: np.load(os.path.join(path, c + '.npy'), mmap_mode='r')[:n] for c in meta['columns']}
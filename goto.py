@@ -0,0 +1,41 @@
+from cfutils import hl_go_to_compat, face_center_yaw_deg
+from safe_sleep import run_steps
+from timeline import segment_plan
+
+SLACK = 0.05  # timing slack after each commanded segment
+
+def goto(hl, xy, z, dur, face_performer=True, world_yaw_offset_deg=0.0, arrival=None):
+    """Absolute go_to with duration + small slack on the show clock. Checks for keyboard input during movement.
+    
+    Args:
+        hl: High-level commander
+        xy: Target (x, y) position tuple
+        z: Target z height
+        dur: Duration in seconds
+        face_performer: If True, drone faces performer at (0,0). If False, maintains current yaw.
+        arrival: Optional arrival.ArrivalDetector; the wait ends once the drone is at the
+                 target (dur + SLACK stays the upper bound).
+    """
+    run_steps(goto_steps(hl, xy, z, dur, face_performer, world_yaw_offset_deg, arrival))
+
+def goto_steps(hl, xy, z, dur, face_performer=True, world_yaw_offset_deg=0.0, arrival=None):
+    """goto() as a step generator (see safe_sleep.run_steps())."""
+    x, y = xy
+    
+    # Calculate yaw to face performer at origin (0, 0)
+    if face_performer:
+        yaw_deg = face_center_yaw_deg(x, y, 0.0, 0.0, world_yaw_offset_deg)
+    else:
+        yaw_deg = None
+    
+    t_start = segment_plan(dur + SLACK, "goto")
+    yield t_start, None
+    hl_go_to_compat(hl, x=x, y=y, z=z, yaw_deg=yaw_deg, duration_s=dur, relative=False)
+    
+    # Wait for the segment deadline (or arrival), checking for keyboard input
+    if arrival is not None:
+        arrival.expect(x, y, z)
+        yield t_start + dur + SLACK, arrival.arrived
+        arrival.finish(t_start + dur, "goto")
+    else:
+        yield t_start + dur + SLACK, None
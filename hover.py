@@ -1,5 +1,11 @@
-from safe_sleep import safe_sleep
+from safe_sleep import run_steps
+from timeline import segment_plan
 
 def hover(_hl, duration_s=2.0):
     # HL commander holds last setpoint; we just wait.
-    safe_sleep(max(0.0, duration_s))
\ No newline at end of file
+    run_steps(hover_steps(_hl, duration_s))
+
+def hover_steps(_hl, duration_s=2.0):
+    """hover() as a step generator (see safe_sleep.run_steps())."""
+    duration_s = max(0.0, duration_s)
+    yield segment_plan(duration_s, "hover") + duration_s, None
@@ -0,0 +1,84 @@
+# input_watcher.py
+"""
+Background emergency trigger.
+
+A daemon thread blocks on stdin (and, optionally, a UDP abort socket) and
+calls safe_sleep.trigger_emergency() the moment either becomes readable.
+Every safe_sleep_until() wait blocks on the same event, so the main thread
+wakes immediately instead of at its next 0.1 s poll.
+
+Any datagram on the abort port triggers (e.g. `echo abort | nc -u <ip> 5006`).
+aio_show reads the same socket (open_abort_socket()) as a loop reader.
+"""
+import sys, socket, select, threading
+
+import safe_sleep
+
+def open_abort_socket(port, host="0.0.0.0"):
+    """The bound UDP abort socket; any datagram on it is an abort."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    print(f"[ABORT] Listening for abort datagrams on UDP {port}")
+    return sock
+
+class InputWatcher:
+    def __init__(self, *, keyboard=True, abort_port=None, abort_host="0.0.0.0"):
+        self.keyboard = keyboard
+        self.abort_port = abort_port
+        self.abort_host = abort_host
+        self.abort_sock = None
+        self._wake_r, self._wake_w = socket.socketpair()   # unblocks select() on stop()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        if self.abort_port is not None:
+            self.abort_sock = open_abort_socket(self.abort_port, self.abort_host)
+        self._running = True
+        if sys.platform == 'win32' and self.keyboard:
+            # select() only takes sockets on Windows; the console gets its own thread
+            threading.Thread(target=self._watch_console, daemon=True).start()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+        safe_sleep.watcher_active = True
+        return self
+
+    def _watch(self):
+        sources = [self._wake_r]
+        if self.abort_sock is not None:
+            sources.append(self.abort_sock)
+        if self.keyboard and sys.platform != 'win32':
+            sources.append(sys.stdin)
+        while self._running:
+            try:
+                ready, _, _ = select.select(sources, [], [])
+            except (OSError, ValueError):
+                return
+            if not self._running or self._wake_r in ready:
+                return
+            if self.abort_sock in ready:
+                _, addr = self.abort_sock.recvfrom(256)
+                safe_sleep.trigger_emergency(f"UDP abort from {addr[0]}")
+            elif sys.stdin in ready:
+                sys.stdin.readline()
+                safe_sleep.trigger_emergency("keyboard")
+            return
+
+    def _watch_console(self):
+        import msvcrt
+        msvcrt.getwch()   # blocks until a key is pressed
+        if self._running:
+            safe_sleep.trigger_emergency("keyboard")
+
+    def stop(self):
+        self._running = False
+        safe_sleep.watcher_active = False
+        try:
+            self._wake_w.send(b'x')
+        except OSError:
+            pass
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        for s in (self.abort_sock, self._wake_r, self._wake_w):
+            if s is not None:
+                s.close()
@@ -1,10 +1,26 @@
 from cfutils import hl_land_compat
-from safe_sleep import safe_sleep
+from safe_sleep import run_steps
+from timeline import segment_plan
 
-def land(hl, from_height_m=1.5, descent_vel=0.125):
+def land(hl, from_height_m=1.5, descent_vel=0.125, interruptible=True, arrival=None):
+    # The emergency landing passes interruptible=False: its wait must not re-raise.
+    # With an arrival detector the wait ends once the drone is down and still.
+    run_steps(land_steps(hl, from_height_m, descent_vel, arrival), interruptible)
+
+def land_steps(hl, from_height_m=1.5, descent_vel=0.125, arrival=None):
+    """land() as a step generator (see safe_sleep.run_steps())."""
+    move_s = max(2.0, from_height_m / max(0.1, descent_vel))
+    wait_s = move_s + 0.3
+    t_start = segment_plan(wait_s, "land")
+    yield t_start, None
     hl_land_compat(hl, from_height_m, descent_vel)
-    safe_sleep(max(2.0, from_height_m / max(0.1, descent_vel)) + 0.3)
+    if arrival is not None:
+        arrival.expect(None, None, 0.0)
+        yield t_start + wait_s, arrival.arrived
+        arrival.finish(t_start + move_s, "land")
+    else:
+        yield t_start + wait_s, None
     try:
         hl.stop()
     except Exception:
-        pass
\ No newline at end of file
+        pass
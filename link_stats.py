@@ -0,0 +1,257 @@
+# link_stats.py
+"""
+Radio link and command-traffic instrumentation.
+
+LinkStats counts what shares the Crazyradio link during a flight:
+
+- high-level commands per primitive (go_to, start_trajectory, land, ...),
+  from the cfutils send listener
+- trajectory uploads and their memory-write packets (cfutils upload
+  listener), so uploaded orbits and splines show up even without packet
+  callbacks
+- every CRTP packet sent and received, by port (cflib's packet_sent /
+  packet_received): param writes, memory uploads, log data, pings
+- log samples per LogConfig block. A gap in the firmware timestamps of n
+  periods counts n - 1 samples as lost; a sample whose transport delay is
+  more than one period above the smallest seen is late
+- link quality, uplink RSSI, uplink congestion and ping latency from
+  cflib's link_statistics (absent on mock/sim Crazyflies)
+
+Event times are on the show clock. line() summarises the last WINDOW_S
+(start() prints it every `interval` seconds); report() is the post-flight
+report with per-second rate histograms, to size swarms and log rates
+from real flights.
+"""
+import math, bisect, threading
+from array import array
+import numpy as np
+
+import show_clock
+import cfutils
+
+WINDOW_S = 2.0      # live line averaging window
+
+PORTS = {0x00: 'console', 0x02: 'param', 0x03: 'commander', 0x04: 'mem', 0x05: 'log',
+         0x06: 'localization', 0x07: 'generic', 0x08: 'hl_commander', 0x09: 'supervisor',
+         0x0D: 'platform', 0x0F: 'link'}
+
+RATE_BINS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)   # histogram bin lower edges (per second)
+
+# link_statistics Caller -> series name
+_LINK_SERIES = (('link_quality_updated', 'quality'), ('uplink_rssi_updated', 'rssi'),
+                ('uplink_congestion_updated', 'congestion'), ('latency_updated', 'latency'))
+
+class LogBlockStats:
+    """Sample, loss and lateness counters for one LogConfig."""
+
+    def __init__(self, name, period_ms):
+        self.name = name
+        self.period_ms = period_ms
+        self.times = array('d')       # local receive times (show clock)
+        self.lost = 0
+        self.late = 0
+        self.max_gap_ms = 0.0
+        self._last_ts = None
+        self._min_delay = None
+
+    def on_log(self, timestamp, data, logconf):
+        t = show_clock.now()
+        self.times.append(t)
+        if self._last_ts is not None:
+            gap = timestamp - self._last_ts
+            self.max_gap_ms = max(self.max_gap_ms, gap)
+            self.lost += max(0, int(gap / self.period_ms + 0.25) - 1)   # +-1/4 period of tick jitter
+        self._last_ts = timestamp
+        # Firmware tick and local clock have an unknown offset; only the delay above the best one counts
+        delay = 1e3 * t - timestamp
+        if self._min_delay is None or delay < self._min_delay:
+            self._min_delay = delay
+        elif delay - self._min_delay > self.period_ms:
+            self.late += 1
+
+    def rate(self):
+        n = len(self.times)
+        return (n - 1) / (self.times[-1] - self.times[0]) if n > 1 and self.times[-1] > self.times[0] else 0.0
+
+class LinkStats:
+    def __init__(self):
+        self.t0 = show_clock.now()
+        self.commands = {}    # primitive -> send times
+        self.sent = {}        # port name -> send times
+        self.received = {}    # port name -> receive times
+        self.blocks = {}      # log block name -> LogBlockStats
+        self.uploads = array('d')          # trajectory upload times
+        self.upload_bytes = array('d')
+        self.upload_packets = array('d')   # memory-write packets per upload
+        self.link = {name: array('d') for _, name in _LINK_SERIES}
+        self._hooks = []      # (Caller, callback) to remove on close()
+        self._thread = None
+        self._stop = threading.Event()
+        cfutils.add_send_listener(self.on_command)
+        cfutils.add_upload_listener(self.on_upload)
+
+    # ---------- sources ----------
+    def attach(self, cf):
+        """Hook a cflib Crazyflie's packet and link-statistics callbacks (those it has)."""
+        for attr, fn in (('packet_sent', self._on_sent), ('packet_received', self._on_received)):
+            self._hook(getattr(cf, attr, None), fn)
+        stats = getattr(cf, 'link_statistics', None)
+        for attr, name in _LINK_SERIES:
+            series = self.link[name]
+            self._hook(getattr(stats, attr, None), lambda v, s=series: s.append(float(v)))
+        return self
+
+    def _hook(self, caller, fn):
+        if caller is not None:
+            caller.add_callback(fn)
+            self._hooks.append((caller, fn))
+
+    def watch_log(self, logconf, name=None):
+        """Count samples, gaps and late arrivals of a LogConfig block."""
+        period = getattr(logconf, 'period', 0)   # firmware runs blocks in 10 ms units
+        block = LogBlockStats(name or logconf.name, 10.0 * period if period else logconf.period_in_ms)
+        self.blocks[block.name] = block
+        logconf.data_received_cb.add_callback(block.on_log)
+        return block
+
+    def on_command(self, command, send_s):
+        times = self.commands.get(command)
+        if times is None:
+            times = self.commands[command] = array('d')
+        times.append(show_clock.now())
+
+    def on_upload(self, n_bytes, n_packets):
+        self.uploads.append(show_clock.now())
+        self.upload_bytes.append(n_bytes)
+        self.upload_packets.append(n_packets)
+
+    def _on_sent(self, pk):
+        self._count(self.sent, pk)
+
+    def _on_received(self, pk):
+        self._count(self.received, pk)
+
+    @staticmethod
+    def _count(table, pk):
+        port = PORTS.get(pk.port, f"port {pk.port}")
+        times = table.get(port)
+        if times is None:
+            times = table[port] = array('d')
+        times.append(show_clock.now())
+
+    # ---------- live line ----------
+    def start(self, interval):
+        """Print line() every `interval` seconds (real time) until stop()."""
+        self._stop.clear()
+        def run():
+            while not self._stop.wait(interval):
+                print(self.line())
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def close(self):
+        """Stop the live line and unhook every callback."""
+        self.stop()
+        cfutils.remove_send_listener(self.on_command)
+        cfutils.remove_upload_listener(self.on_upload)
+        for caller, fn in self._hooks:
+            caller.remove_callback(fn)
+        self._hooks = []
+
+    def line(self, window_s=WINDOW_S):
+        now = show_clock.now()
+        since = now - min(window_s, max(now - self.t0, 1e-3))
+        span = now - since
+        def rate(times):
+            return (len(times) - bisect.bisect_left(times, since)) / span
+        cmd = sorted(((rate(t), c) for c, t in self.commands.items()), reverse=True)
+        active = [f"{c} {r:.1f}" for r, c in cmd if r]
+        parts = [f"cmd {sum(r for r, _ in cmd):.1f}/s" + (f" ({', '.join(active)})" if active else "")]
+        recent = bisect.bisect_left(self.uploads, since)
+        if recent < len(self.uploads):
+            parts.append(f"upload {sum(self.upload_packets[recent:]) / span:.0f} pkt/s")
+        if self.sent or self.received:
+            parts.append(f"tx {sum(rate(t) for t in self.sent.values()):.0f}/s "
+                         f"rx {sum(rate(t) for t in self.received.values()):.0f}/s")
+        for b in self.blocks.values():
+            parts.append(f"log {b.name} {rate(b.times):.1f} Hz, {b.lost} lost, {b.late} late")
+        q, rssi, lat = self.link['quality'], self.link['rssi'], self.link['latency']
+        if q:
+            parts.append(f"LQ {q[-1]:.0f}%" + (f" RSSI -{rssi[-1]:.0f} dBm" if rssi else "")
+                         + (f" ping {lat[-1]:.1f} ms" if lat else ""))
+        return "[LINK] " + " | ".join(parts)
+
+    # ---------- post-flight report ----------
+    def _per_second(self, times, t_end):
+        """Event count in each whole second of the flight."""
+        n = max(1, math.ceil(t_end - self.t0))
+        if not len(times):
+            return np.zeros(n, dtype=np.int64)
+        k = np.clip((np.asarray(times, dtype=np.float64) - self.t0).astype(np.int64), 0, n - 1)
+        return np.bincount(k, minlength=n)
+
+    @staticmethod
+    def histogram(counts):
+        """'rate: seconds' pairs of per-second counts over RATE_BINS."""
+        edges = RATE_BINS + (math.inf,)
+        hist, _ = np.histogram(counts, bins=edges)
+        out = []
+        for lo, hi, n in zip(edges[:-1], edges[1:], hist):
+            if n:
+                label = f"{lo}" if hi - lo == 1 else (f"{lo}+" if hi == math.inf else f"{lo}-{hi - 1}")
+                out.append(f"{label}: {n}s")
+        return "  ".join(out)
+
+    def report(self):
+        t_end = show_clock.now()
+        span = max(t_end - self.t0, 1e-3)
+        all_cmd = np.concatenate([np.asarray(t, dtype=np.float64) for t in self.commands.values()]
+                                 or [np.empty(0)])
+        total = self._per_second(all_cmd, t_end)
+        lines = [f"[LINK] {span:.1f}s: {len(all_cmd)} high-level commands, "
+                 f"mean {len(all_cmd) / span:.2f}/s, peak {total.max()}/s"]
+        for command, times in sorted(self.commands.items()):
+            per_s = self._per_second(times, t_end)
+            lines.append(f"  {command:16s} n={len(times):5d}  mean {len(times) / span:6.2f}/s  peak {per_s.max():3d}/s")
+        if len(all_cmd):
+            lines.append(f"  commands/s histogram  {self.histogram(total)}")
+        if self.uploads:
+            per_s = np.bincount(np.clip((np.asarray(self.uploads) - self.t0).astype(np.int64), 0, None),
+                                weights=np.asarray(self.upload_packets))
+            lines.append(f"  trajectory upload n={len(self.uploads):5d}  {sum(self.upload_bytes):.0f} bytes in "
+                         f"{sum(self.upload_packets):.0f} memory-write packets (peak {per_s.max():.0f}/s)")
+        for label, table in (('tx', self.sent), ('rx', self.received)):
+            if not table:
+                continue
+            per_s = sum(self._per_second(t, t_end) for t in table.values())
+            by_port = ", ".join(f"{p} {len(t)}" for p, t in sorted(table.items(), key=lambda kv: -len(kv[1])))
+            lines.append(f"  radio {label}: {sum(len(t) for t in table.values())} packets "
+                         f"(peak {per_s.max()}/s; {by_port})")
+            lines.append(f"  radio {label} packets/s histogram  {self.histogram(per_s)}")
+        if not (self.sent or self.received):
+            lines.append("  radio packets: not available on this link")
+        for b in self.blocks.values():
+            n = len(b.times)
+            expected = n + b.lost
+            lines.append(f"  log {b.name}: {n} samples at {b.rate():.1f} Hz (period {b.period_ms:.0f} ms), "
+                         f"{b.lost} lost ({100.0 * b.lost / max(expected, 1):.1f}%), {b.late} late, "
+                         f"max gap {b.max_gap_ms:.0f} ms")
+        q = np.asarray(self.link['quality'], dtype=np.float64)
+        if len(q):
+            line = f"  link quality mean {q.mean():.0f}% min {q.min():.0f}%"
+            for name, unit, fmt in (('rssi', 'dBm', lambda v: f"-{v:.0f}"),
+                                    ('congestion', '%', lambda v: f"{v:.0f}"),
+                                    ('latency', 'ms', lambda v: f"{v:.1f}")):
+                s = np.asarray(self.link[name], dtype=np.float64)
+                if len(s):
+                    line += f", {name} mean {fmt(s.mean())} / worst {fmt(s.max())} {unit}"
+            lines.append(line)
+        else:
+            lines.append("  link quality: not reported by this link")
+        return "\n".join(lines)
@@ -1,76 +1,160 @@
 #!/usr/bin/env python3
-import time, math, sys, select, json, socket, threading
+import os, time, math, sys, select, json, threading
 import cflib.crtp
 from cflib.crazyflie import Crazyflie
 from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
 from cflib.crazyflie.log import LogConfig
 
-from safe_sleep import safe_sleep, check_keyboard_input, get_emergency_flag
+from safe_sleep import get_emergency_flag, trigger_emergency, emergency_latency
+import safe_sleep
+from timeline import end_show, use_music_clock
+import show_clock
 
-from cfutils import reset_estimator, hl_go_to_compat
-from takeoff import takeoff
-from hover import hover
-from circle import circle
+from cfutils import reset_estimator, get_hl_calls, EstimatorSettle
+from preflight import Preflight
 from land import land
-from diagonal_orbit import diagonal_orbit
+from trajectory import TrajectoryRunner
+from show import load_show, ShowExecutor
+from pose_udp import PoseSender, FLAG_EMERGENCY
+from pose_forward import PoseForwarder
+from flight_recorder import FlightRecorder
+from input_watcher import InputWatcher
+from arrival import ArrivalDetector, VEL_NAMES
+from safety_check import check_show
+from music_clock import make_clock, WallClock
+from link_stats import LinkStats
+from telemetry import Telemetry, DEFAULT_GROUPS, POSE_NAMES
+import toc_cache
 
 URI = "radio://0/80/2M"
+CACHE_DIR = "./cache"
+FAST_TOC_CACHE = True       # load log/param TOCs from a pickled index (toc_cache.py)
 
 # =========================
 # UDP Streaming Configuration
 # =========================
 # Enable/disable UDP streaming to Unity
 # Set UDP_ENABLED = True to stream real-time pose data to Unity for visualization
-# Packet format matches mock_pos.py: {"x": float, "y": float, "z": float, "yaw_deg": float, "ts": float}
+# Packet format (UDP_FORMAT):
+#   "json"   - matches mock_pos.py: {"x": float, "y": float, "z": float, "yaw_deg": float, "ts": float}
+#   "binary" - fixed 32-byte packet with sequence number and flags (see pose_udp.py)
 # Unity coordinate mapping: unityX = -cfY, unityY = cfZ, unityZ = cfX
 UDP_ENABLED = True          # Set to False to disable UDP streaming
 UDP_IP = "172.20.10.3"        # Destination IP (127.0.0.1 for local Unity, or Quest IP)
 UDP_PORT = 5005             # Destination port (must match Unity receiver)
+# Every destination gets every packet (encoded once, one non-blocking socket
+# each), e.g. [("127.0.0.1", 5005), ("172.20.10.3", 5005), ("239.255.0.5", 5005)].
+# Entries may also be "host" or "host:port" (port defaults to UDP_PORT) and
+# multicast groups. An unreachable receiver only loses its own packets.
+UDP_DESTINATIONS = [(UDP_IP, UDP_PORT)]
+UDP_MULTICAST_TTL = 1       # multicast hops (1 = local network only)
 UDP_HZ = 30.0               # Send rate (Hz)
+UDP_FORMAT = "json"         # "json" or "binary"
+UDP_MODE = "poll"           # "poll": send latest pose at UDP_HZ from a thread
+                            # "event": send each log sample as it arrives (see pose_forward.py)
+UDP_MAX_HZ = 0.0            # "event" mode rate limit (0 = send every sample)
+
+# Multi-rate telemetry (telemetry.py): pose at 100 Hz, velocity/attitude at
+# 50 Hz, battery/link at 2 Hz, decoded into NumPy ring arrays that the UDP
+# sender, recorder and arrival detector read (the arrival detector takes its
+# speed from the velocity block). False = the single 30 Hz pose block
+# (make_pose_logconf).
+MULTI_RATE_TELEMETRY = True
+TELEMETRY_GROUPS = DEFAULT_GROUPS
 
 # =========================
-# Global choreo parameters
+# Show
 # =========================
+# The choreography, venue parameters (heights, stage points, orbit radius)
+# and music timestamps live in the show file; a venue overlay swaps in
+# another stage's parameters. See SHOW_FORMAT.md.
 # Coordinate system:
 # - Performer is at origin (0, 0, 0)
 # - Positive Y is in front of the performer (toward audience)
 # - Positive X is to the performer's right
 # - Positive Z is upward
-
-H_STD   = 1.3    # standard height (m)
-H_LOW   = 1.2    # diagonal phase base height (m)
-H_MAX   = 2.0    # spiral/wave max height (m)
-
-# "Center front" = 1 meter in front of the performer
-CENTER_FRONT_Y = 1.0
-
-RETREAT_DIST = 1.5  # additional distance back from center front (m)
-SIDE_DIST    = 1.0  # left/right from center line (m)
-CIRCLE_R     = 1.2 # orbit radius around performer (m)
-
-# Diagonal movement parameters (1:26-1:50)
-DIAG_HORIZONTAL = 1.5  # horizontal distance per diagonal pass (m)
-DIAG_VERTICAL   = 0.4  # height change per diagonal pass (m) - reduced from 0.7 for gentler slope
-
-ASCENT_VEL   = 0.25 # take off much slower; approx. 0.25 meter per second; will take around 5 seconds to reach 1.3 meters (std.height)
-DESCENT_VEL  = 0.125
-
-FACE_CENTER  = True
-YAW_OFF_DEG  = 0.0
-
-# Named absolute points in the stage plane (x,y)
-# Performer at (0,0), drone operates at y=CENTER_FRONT_Y normally
-POINTS = {
-    "CENTER":  (0.0, CENTER_FRONT_Y),                    # 1m in front of performer
-    "RIGHT":   (+SIDE_DIST, CENTER_FRONT_Y),             # 1m right of center front
-    "LEFT":    (-SIDE_DIST, CENTER_FRONT_Y),             # 1m left of center front
-    "RETREAT": (0.0, 1.8),     # 1.5m back from center front, it ung 1.8
-}
-
-SLACK = 0.05  # timing slack after each commanded segment
+SHOW_FILE  = "shows/incomplete.json"
+VENUE_FILE = None           # e.g. "shows/venues/small.json"
+
+# Offline safety check of the compiled show before connecting (safety_check.py):
+# "reject" refuses to fly a show with violations, "report" only prints them,
+# None skips the check. SAFETY_LIMITS overrides safety_check.DEFAULT_LIMITS.
+# The stock show still has fast re-positioning hops (see the report), so this
+# stays on "report" until those are smoothed.
+SAFETY_CHECK = "report"
+SAFETY_LIMITS = {}
+
+# Record every pose log sample + commanded setpoint to flights/<timestamp>/,
+# and every other telemetry block (velocity, attitude, battery, ...) to a
+# subdirectory each (memory-mapped columns; load with flight_recorder.load_flight).
+RECORD_FLIGHT = True
+RECORD_DIR = "flights"
+
+# Per-segment timing trace (planned vs sent vs music timestamp) is printed
+# after the flight and written as timeline.csv into the flight's record
+# directory; without recording it goes to TIMELINE_CSV (None = don't write).
+TIMELINE_CSV = None
+
+# Fly circle/diagonal_orbit as uploaded polynomial trajectories (one start
+# command per orbit) instead of a go_to packet per waypoint. Every orbit is
+# uploaded before takeoff; one that doesn't fit in the 4 KB trajectory
+# memory is flown as go_tos. An upload costs about as many memory-write
+# packets as the go_tos it replaces, so only a repeated shape is actually
+# cheaper. Uploads are keyed by shape, not duration: an orbit that repeats
+# at another speed is replayed with start_trajectory's time_scale (the stock
+# show: 131 packets instead of 207 with go_tos).
+USE_TRAJECTORIES = False
+
+# Fly circle/diagonal_orbit segments as one uploaded spline each, continuous
+# in velocity and acceleration and flowing into the next segment's first
+# waypoint, instead of stop-to-stop go_to chords (show.SplineBlender).
+# This trades radio traffic for smoothness: each spline is uploaded as it
+# comes up (up to 14 pieces, ~77 memory-write packets) in place of a ~26-row
+# orbit, so the stock show sends about 2.8x the packets of plain go_tos
+# (574 vs 207 in simulate.py). Fewer pieces would undercut the go_tos but
+# leave the orbit path by tens of cm. Only a spline already in one of the
+# two buffers is restarted without an upload. The [BLEND] report and the
+# [LINK] report count the upload packets.
+BLEND_SPLINES = False
+
+# Finish goto steps and the landing as soon as the pose log shows the drone
+# at the target (within tolerance) instead of after the fixed duration; also
+# reports how late the drone reaches each target. See arrival.py.
+ARRIVAL_DETECT = False
+ARRIVAL_POS_TOL = 0.05      # m
+ARRIVAL_VEL_TOL = 0.10      # m/s
+
+# Music clock the show timeline follows (see music_clock.py):
+#   "wall"  - music 0:00 is when the show clock starts (after takeoff)
+#   "audio" - play MUSIC_FILE locally at show start and follow its position (needs pygame)
+#   "udp"   - follow positions sent by the playback machine to MUSIC_UDP_PORT
+MUSIC_SOURCE = "wall"
+MUSIC_FILE = None           # e.g. "shows/music/incomplete.ogg"
+MUSIC_UDP_PORT = 5007
+
+# Radio link instrumentation (link_stats.py): commands/s per primitive,
+# packets per CRTP port, lost/late log samples and link quality. A live
+# [LINK] line every LINK_STATS_PRINT_S seconds (0 = off) and a report after
+# the flight.
+LINK_STATS = True
+LINK_STATS_PRINT_S = 5.0
+
+# Emergency landing triggers: any key on stdin, and optionally any datagram
+# sent to this UDP port (None = keyboard only). See EMERGENCY_LANDING.md.
+ABORT_UDP_PORT = None
+
+# Estimator readiness: reset_estimator() returns once the Kalman position
+# variances stay below EST_VAR_THRESHOLD (m^2) for EST_WINDOW_S.
+EST_VAR_THRESHOLD = 1e-3
+EST_WINDOW_S = 0.3
+EST_TIMEOUT_S = 5.0
+ARM_SETTLE_S = 0.3          # minimum time between arming and takeoff
+PREFLIGHT_TIMEOUT_S = 2.0   # max wait for param echoes / first log samples
 
 # Global variables for UDP streaming
-udp_sock = None
+udp_sender = None
+pose_forwarder = None
+pose_block = None           # telemetry.TelemetryBlock with the pose (multi-rate telemetry)
 latest_pose = {"x": 0.0, "y": 0.0, "z": 0.0, "yaw_deg": 0.0, "ts": 0.0}
 pose_lock = threading.Lock()
 streaming_active = False
@@ -89,25 +173,34 @@ def pose_callback(timestamp, data, logconf):
 
 def udp_streaming_thread():
     """Background thread that sends pose data over UDP at specified rate."""
-    global streaming_active, udp_sock
+    global streaming_active, udp_sender
     dt = 1.0 / UDP_HZ
+    pose_cols = pose_block.columns(POSE_NAMES) if pose_block is not None else None
     
     while streaming_active:
         try:
-            with pose_lock:
-                pkt = latest_pose.copy()
+            if pose_block is not None:
+                # Newest row of the telemetry ring; no per-sample dict
+                row = pose_block.latest()
+                x, y, z, yaw_deg = (0.0,) * 4 if row is None else (row[k] for k in pose_cols)
+                ts = pose_block.latest_wall()
+            else:
+                with pose_lock:
+                    pose = latest_pose
+                x, y, z, yaw_deg, ts = pose["x"], pose["y"], pose["z"], pose["yaw_deg"], pose["ts"]
             
             # Send UDP packet
-            if udp_sock:
-                udp_sock.sendto(json.dumps(pkt).encode("utf-8"), (UDP_IP, UDP_PORT))
+            if udp_sender:
+                flags = FLAG_EMERGENCY if get_emergency_flag() else 0
+                udp_sender.send(x, y, z, yaw_deg, ts, flags)
             
             time.sleep(dt)
         except Exception as e:
             print(f"[UDP] Error sending: {e}")
             time.sleep(dt)
 
-def setup_pose_logging(cf):
-    """Set up Crazyflie logging for position and orientation."""
+def make_pose_logconf(callback=pose_callback):
+    """Pose LogConfig for position and orientation (not yet added to the Crazyflie)."""
     log_conf = LogConfig(name='Pose', period_in_ms=33)  # ~30Hz
     
     # Add pose variables to log
@@ -115,286 +208,203 @@ def setup_pose_logging(cf):
     log_conf.add_variable('stateEstimate.y', 'float')
     log_conf.add_variable('stateEstimate.z', 'float')
     log_conf.add_variable('stabilizer.yaw', 'float')
-    
-    # Register callback
+    if callback:
+        log_conf.data_received_cb.add_callback(callback)
+    return log_conf
+
+def setup_pose_logging(cf, callback=pose_callback):
+    """Set up Crazyflie logging for position and orientation."""
+    log_conf = make_pose_logconf(callback)
     cf.log.add_config(log_conf)
-    log_conf.data_received_cb.add_callback(pose_callback)
     log_conf.start()
-    
     return log_conf
 
-def goto(hl, xy, z, dur, face_performer=True):
-    """Absolute go_to with duration + small slack. Checks for keyboard input during movement.
-    
-    Args:
-        hl: High-level commander
-        xy: Target (x, y) position tuple
-        z: Target z height
-        dur: Duration in seconds
-        face_performer: If True, drone faces performer at (0,0). If False, maintains current yaw.
-    """
-    from cfutils import face_center_yaw_deg
-    
-    x, y = xy
-    
-    # Calculate yaw to face performer at origin (0, 0)
-    if face_performer:
-        yaw_deg = face_center_yaw_deg(x, y, 0.0, 0.0, YAW_OFF_DEG)
-    else:
-        yaw_deg = None
-    
-    hl_go_to_compat(hl, x=x, y=y, z=z, yaw_deg=yaw_deg, duration_s=dur, relative=False)
-    
-    # Sleep in small increments to check for keyboard input
-    elapsed = 0
-    interval = 0.1
-    total_sleep = dur + SLACK
-    
-    while elapsed < total_sleep:
-        if check_keyboard_input():
-            emergency_stop = True
-            raise KeyboardInterrupt("Keyboard input detected - initiating smooth landing")
-        time.sleep(min(interval, total_sleep - elapsed))
-        elapsed += interval
-
-def main():
-    global emergency_stop, udp_sock, streaming_active
+def connect_radio():
     cflib.crtp.init_drivers(enable_debug_driver=False)
+    cf = Crazyflie(rw_cache=CACHE_DIR)
+    if FAST_TOC_CACHE:
+        toc_cache.install(cf, rw_cache=CACHE_DIR)
+    return SyncCrazyflie(URI, cf=cf)
+
+def preflight_check(show):
+    """Run the offline safety check per SAFETY_CHECK; False = don't fly."""
+    if not SAFETY_CHECK:
+        return True
+    result = check_show(show, SAFETY_LIMITS)
+    print(result.report())
+    if not result.ok and SAFETY_CHECK == "reject":
+        print("[SAFETY] Refusing to fly (SAFETY_CHECK = \"reject\").")
+        return False
+    return True
+
+def main(show_file=SHOW_FILE, venue_file=VENUE_FILE, connect=connect_radio):
+    """Fly a show. `connect` returns the (Sync)Crazyflie context; sim_cf provides a simulated one."""
+    global udp_sender, pose_forwarder, pose_block, streaming_active
+    # Compile (or load the cached) show before touching the radio
+    show = load_show(show_file, venue_file)
+    print(f"[SHOW] {show.name}: {len(show.segments)} segments, {show.duration:.1f}s")
+    if show.density:
+        print(show.density_report())
+    if not preflight_check(show):
+        return
+    descent_vel = show.params.get('DESCENT_VEL', 0.125)
     
-    # Initialize UDP socket if enabled
+    # Initialize UDP sockets if enabled
     if UDP_ENABLED:
         try:
-            udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            print(f"[UDP] Initialized - sending to {UDP_IP}:{UDP_PORT} at {UDP_HZ}Hz")
+            udp_sender = PoseSender(UDP_DESTINATIONS, UDP_FORMAT, default_port=UDP_PORT,
+                                    multicast_ttl=UDP_MULTICAST_TTL)
+            print(f"[UDP] Initialized - sending {UDP_FORMAT} to {udp_sender.describe()} at {UDP_HZ}Hz")
         except Exception as e:
             print(f"[UDP] Failed to initialize: {e}")
-            udp_sock = None
+            udp_sender = None
+
+    # Segment starts follow the music position from here on
+    try:
+        music = make_clock(MUSIC_SOURCE, audio_file=MUSIC_FILE, udp_port=MUSIC_UDP_PORT)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"[MUSIC] {MUSIC_SOURCE} clock unavailable ({e}); following the local clock")
+        music = WallClock()
+    use_music_clock(music)
     
-    with SyncCrazyflie(URI, cf=Crazyflie(rw_cache='./cache')) as scf:
+    with connect() as scf:
         cf = scf.cf
         current_height = 0.0  # Track current height for emergency landing
+        executor = None
         log_conf = None
+        telemetry = None
         udp_thread = None
-
+        recorder = None
+        watcher = None
+        arrival = ArrivalDetector(ARRIVAL_POS_TOL, ARRIVAL_VEL_TOL) if ARRIVAL_DETECT else None
+        link = LinkStats().attach(cf) if LINK_STATS else None
+
+        # Preflight: param writes, arming and log blocks all go out first and
+        # their acknowledgements are awaited together (see preflight.py)
+        pf = Preflight(cf, timeout_s=PREFLIGHT_TIMEOUT_S)
         # High-level + safety setup
-        cf.param.set_value('commander.enHighLevel', '1')
-        try:
-            cf.param.set_value('motorPowerSet.enable', '0')
-        except Exception:
-            pass
-
+        pf.param('commander.enHighLevel', '1')
+        pf.param('motorPowerSet.enable', '0', optional=True)
         # Brushless arming (no-op on some platforms)
-        try:
-            cf.platform.send_arming_request(True)
-        except Exception:
-            pass
-        time.sleep(0.3)
-        print("[ARM] Armed.")
-        print("[INFO] Press any key at any time to initiate emergency smooth landing...")
+        pf.action('arm', lambda: cf.platform.send_arming_request(True))
+        t_armed = show_clock.now()   # the estimator settle below covers ARM_SETTLE_S
         
-        # Set up pose logging for UDP streaming
-        if UDP_ENABLED and udp_sock:
+        # Pose logging for UDP streaming and the flight recorder
+        if (UDP_ENABLED and udp_sender) or RECORD_FLIGHT or arrival:
+            def start_log(conf):
+                pf.log(conf)   # acked by the block's first sample
+                if link:
+                    link.watch_log(conf)
+            # Blocks start one at a time: a failing extra block is dropped on
+            # its own; only a failing pose block turns pose logging off
             try:
-                log_conf = setup_pose_logging(cf)
-                time.sleep(0.5)  # Let logging stabilize
-                
-                # Start UDP streaming thread
-                streaming_active = True
-                udp_thread = threading.Thread(target=udp_streaming_thread, daemon=True)
-                udp_thread.start()
-                print("[UDP] Streaming started")
+                # Consumers index samples by `keys`: ring columns, or names in the 30 Hz dicts
+                if MULTI_RATE_TELEMETRY:
+                    telemetry = Telemetry(TELEMETRY_GROUPS)
+                    pose_block = telemetry.block_of(POSE_NAMES[0])
+                    log_conf, keys = pose_block.logconf, pose_block.columns(POSE_NAMES)
+                    telemetry.start(cf, start_log, required=[pose_block])
+                else:
+                    log_conf, keys = make_pose_logconf(None), POSE_NAMES
+                    start_log(log_conf)
             except Exception as e:
-                print(f"[UDP] Failed to start logging: {e}")
+                print(f"[UDP] Failed to start pose logging: {e}")
+                if telemetry:
+                    telemetry.stop()
+                log_conf = telemetry = pose_block = None
+
+        if log_conf:
+            if UDP_ENABLED and udp_sender and UDP_MODE == "event":
+                # Send from the log callback itself; no streaming thread
+                pose_forwarder = PoseForwarder(udp_sender, max_hz=UDP_MAX_HZ,
+                                               flags_fn=lambda: FLAG_EMERGENCY if get_emergency_flag() else 0,
+                                               names=keys)
+                log_conf.data_received_cb.add_callback(pose_forwarder.on_log)
+            elif not telemetry:
+                log_conf.data_received_cb.add_callback(pose_callback)
+            if RECORD_FLIGHT:
+                recorder = FlightRecorder(RECORD_DIR, names=keys, hl=cf.high_level_commander)
+                log_conf.data_received_cb.add_callback(recorder.on_log)
+                if telemetry:
+                    recorder.add_telemetry(telemetry)   # motion, status, ...: every variable
+                print(f"[REC] Recording to {recorder.path}")
+            if arrival:
+                arrival.names = keys[:3]
+                log_conf.data_received_cb.add_callback(arrival.on_log)
+                if telemetry and all(telemetry.has(v) for v in VEL_NAMES):
+                    # Speed from the estimator's velocity instead of differenced positions
+                    motion = telemetry.block_of(VEL_NAMES[0])
+                    arrival.vel_names = motion.columns(VEL_NAMES)
+                    motion.logconf.data_received_cb.add_callback(arrival.on_velocity)
+
+        # Kalman variance block for reset_estimator, created alongside the pose block
+        settle = EstimatorSettle(cf, EST_VAR_THRESHOLD, EST_WINDOW_S)
+        try:
+            pf.log(settle.make_config(), 'kalman variances')
+        except Exception as e:
+            print(f"[EST] Can't log Kalman variances ({e})")
+            settle = None
+        # The watcher runs before the preflight waits, so a key press or an
+        # abort datagram ends them (and the flight) at once
+        print("[INFO] Press any key at any time to initiate emergency smooth landing...")
+        if safe_sleep.monitor_keyboard or ABORT_UDP_PORT is not None:
+            try:
+                watcher = InputWatcher(keyboard=safe_sleep.monitor_keyboard,
+                                       abort_port=ABORT_UDP_PORT).start()
+            except OSError as e:
+                print(f"[ABORT] Input watcher failed to start ({e}); polling stdin instead")
 
         try:
-            reset_estimator(cf)
+            pf.wait()
+            print("[ARM] Armed.")
+            if log_conf and UDP_ENABLED and udp_sender:
+                if UDP_MODE != "event":
+                    # Start UDP streaming thread
+                    streaming_active = True
+                    udp_thread = threading.Thread(target=udp_streaming_thread, daemon=True)
+                    udp_thread.start()
+                print(f"[UDP] Streaming started ({UDP_MODE})")
+            if link and LINK_STATS_PRINT_S:
+                link.start(LINK_STATS_PRINT_S)
+
+            pf.timed('estimator settle', lambda: reset_estimator(
+                cf, threshold=EST_VAR_THRESHOLD, window_s=EST_WINDOW_S,
+                timeout_s=EST_TIMEOUT_S, settle=settle))
+            show_clock.sleep(t_armed + ARM_SETTLE_S - show_clock.now())
+            print(pf.report())
             hl = cf.high_level_commander
+            runner = TrajectoryRunner(cf) if USE_TRAJECTORIES or BLEND_SPLINES else None
 
-            # =========================
-            # Pre-Dance (0:00–0:15)
-            # =========================
-            # Initial placement: Drone is on the ground at center front (0, 1.0, 0.0)
-            # facing the performer (toward negative Y direction).
-
-            # Takeoff from ground to 1.5 m at center front position
-            print("[DEBUG] Sending takeoff command...")
-            takeoff(hl, height_m=H_STD, ascent_vel=ASCENT_VEL)
-            print("[DEBUG] Takeoff command issued.")
-            current_height = H_STD
-            # goto(hl, POINTS["CENTER"], H_STD, 0.0)   # ensure we're at center front (0, -1.0, 1.5)
-
-            # 0:00–0:05 Hover
-            hover(hl, 5.0)
-            print("[DEBUG] hover command issued.")
-            
-
-            # 0:05–0:10 Retreat farther back (~1.5 m total from dancer)
-            goto(hl, POINTS["RETREAT"], H_STD, 5.0)
-            print("[DEBUG] retreat command issued.")
-            
-            # 0:10–0:15 Approach again to 1 m in front of dancer
-            goto(hl, POINTS["CENTER"], H_STD, 5.0)
-            print("[DEBUG] center command issued.")
-            
-            # =========================
-            # Main Dance (0:16–3:30)
-            # =========================
-
-            # 0:16–0:20 Fly right (~1 m)
-            goto(hl, POINTS["RIGHT"], H_STD, 4.0)
-            print("[DEBUG] right command issued.")
-            
-            # 0:21–0:23 Hover
-            hover(hl, 2.0)
-
-            # 0:23–0:29 Back to center
-            goto(hl, POINTS["CENTER"], H_STD, 6.0)
-
-            # 0:30–0:36 Fly left (~1 m)
-            goto(hl, POINTS["LEFT"], H_STD, 6.0)
-
-            # 0:37–0:40 Hover
-            hover(hl, 3.0)
-
-            # 0:40–0:46 Back to center
-            goto(hl, POINTS["CENTER"], H_STD, 6.0)
-
-            # 0:46–1:15 Circle around performer (flat at 1.5m height), end at center front
-            # Circle center = performer position (0, 0), radius = 0.8m
-            # Center front is at (0, 1.0) which is 1.0m from origin
-            # Since radius is 0.8m, center front is OUTSIDE the circle!
-            # We need to move to the circle's starting point first (top of circle at 90°)
-            # Top of circle: (0, 0.8) when radius=0.8m and center=(0,0)
-            
-            # Move to top of circle to start
-            goto(hl, (0.0, 1.0), H_STD, 0.5)
-            
-            # First circle (14.5 seconds) - faster orbit
-            start_angle_deg = 90.0
-            circle(hl,
-                   cx=0.0, cy=0.0, z=H_STD,
-                   radius=CIRCLE_R, total_time=14.5,
-                   segments=45, face_center=FACE_CENTER,
-                   world_yaw_offset_deg=YAW_OFF_DEG,
-                   start_angle_deg=start_angle_deg)
-            
-            # Second circle (14.5 seconds) - same speed, continues smoothly
-            circle(hl,
-                   cx=0.0, cy=0.0, z=H_STD,
-                   radius=CIRCLE_R, total_time=14.5,
-                   segments=45, face_center=FACE_CENTER,
-                   world_yaw_offset_deg=YAW_OFF_DEG,
-                   start_angle_deg=start_angle_deg)
-            
-            # Return to center front after circles
-            goto(hl, POINTS["CENTER"], H_STD, 0.6)
-
-            # 1:16–1:20 Retreat
-            goto(hl, POINTS["RETREAT"], H_STD, 4.0)
-
-            # 1:21–1:26 Approach
-            goto(hl, POINTS["CENTER"], H_STD, 5.0)
-
-            # 1:26–1:50 Diagonal movements while circling around the performer
-            diagonal_orbit(hl,
-                        cx=0.0, cy=0.0,
-                        z_low=H_LOW,
-                        z_high=H_LOW + DIAG_VERTICAL,
-                        radius=CIRCLE_R,
-                        passes=10,
-                        total_time=24.0, # 10 passes * 2.4s each
-                        face_center=FACE_CENTER,
-                        world_yaw_offset_deg=YAW_OFF_DEG)
-
-            # Update current height after the full sequence
-            current_height = H_LOW # The last pass (i=9, "down") ends at z_low
-
-            start_angle_deg = 90.0
-            circle(hl,
-                   cx=0.0, cy=0.0, z=H_STD,
-                   radius=CIRCLE_R, total_time=9.67,
-                   segments=30, face_center=FACE_CENTER,
-                   world_yaw_offset_deg=YAW_OFF_DEG,
-                   start_angle_deg=start_angle_deg)
-            
-            # Second circle (9.67 seconds)
-            circle(hl,
-                   cx=0.0, cy=0.0, z=H_STD,
-                   radius=CIRCLE_R, total_time=9.67,
-                   segments=30, face_center=FACE_CENTER,
-                   world_yaw_offset_deg=YAW_OFF_DEG,
-                   start_angle_deg=start_angle_deg)
-            
-            # Third circle (9.67 seconds)
-            circle(hl,
-                   cx=0.0, cy=0.0, z=H_STD,
-                   radius=CIRCLE_R, total_time=9.67,
-                   segments=30, face_center=FACE_CENTER,
-                   world_yaw_offset_deg=YAW_OFF_DEG,
-                   start_angle_deg=start_angle_deg)
-            
-            # End at center front
-            goto(hl, POINTS["CENTER"], H_STD, 0.8)
-            current_height = H_STD
-
-            # 2:21–2:43 Diagonal Retreat/Approach blocks with hovers
-            # 2:21–2:25 Retreat
-            goto(hl, POINTS["RETREAT"], H_STD, 4.0)
-            # 2:25–2:28 Hover
-            hover(hl, 3.0)
-            # 2:28–2:32 Approach
-            goto(hl, POINTS["CENTER"], H_STD, 4.0)
-            # 2:32–2:36 Retreat
-            goto(hl, POINTS["RETREAT"], H_STD, 4.0)
-            # 2:36–2:39 Hover
-            hover(hl, 3.0)
-            # 2:39–2:43 Approach
-            goto(hl, POINTS["CENTER"], H_STD, 4.0)
-
-            # 2:51–3:30 Wave path while circling (using diagonal_orbit)
-            diagonal_orbit(hl,
-                        cx=0.0, cy=0.0,
-                        z_low=H_LOW,
-                        z_high=H_LOW + DIAG_VERTICAL,
-                        radius=CIRCLE_R,
-                        passes=10,
-                        total_time=39.0, # 10 passes * 3.9s each
-                        face_center=FACE_CENTER,
-                        world_yaw_offset_deg=YAW_OFF_DEG)
-
-            # Update current height after the full sequence
-            current_height = H_LOW # The last pass (i=9, "down") ends at z_low
-            
-            # Ensure we finish at center front
-            goto(hl, POINTS["CENTER"], H_STD, 0.8)
-
-            # =========================
-            # Post-Dance (3:30–3:43+)
-            # =========================
-            # 3:30–3:35 Retreat ~1.5 m
-            goto(hl, POINTS["RETREAT"], H_STD, 5.0)
-            # 3:35–3:43 Approach to center front
-            goto(hl, POINTS["CENTER"], H_STD, 8.0)
-
-            # Descent & landing
-            land(hl, from_height_m=H_STD, descent_vel=DESCENT_VEL)
-            current_height = 0.0
+            executor = ShowExecutor(hl, show, runner, arrival, BLEND_SPLINES)
+            executor.run()
+            current_height = executor.current_height
             print("[DONE] Landed.")
 
         except KeyboardInterrupt:
-            print("\n[EMERGENCY] Keyboard input detected — initiating smooth emergency landing...")
+            trigger_emergency("Ctrl-C")   # no-op if the watcher already triggered it
+            if executor is None:
+                print(f"\n[EMERGENCY] {safe_sleep.emergency_source} before takeoff — not flying.")
+                return
+            print(f"\n[EMERGENCY] {safe_sleep.emergency_source} — initiating smooth emergency landing...")
+            timeline = end_show()
+            if timeline:
+                print(timeline.report())
+            if executor:
+                current_height = executor.current_height
             try:
                 # Stop current high-level commands
                 cf.high_level_commander.stop()
-                time.sleep(0.2)
+                print(f"[EMERGENCY] Trigger -> stop() latency: {1e3 * emergency_latency():.2f} ms")
+                show_clock.sleep(0.2)
                 
                 # Perform smooth emergency landing from current height
-                # Estimate height (use last known height or default to H_STD)
-                emergency_height = current_height if current_height > 0 else H_STD
+                # Estimate height (use last known height or default to the show's standard height)
+                emergency_height = current_height if current_height > 0 else show.params.get('H_STD', 1.3)
                 print(f"[EMERGENCY] Landing from approximately {emergency_height:.2f}m...")
                 
                 # Smooth descent at safe velocity
-                land(hl, from_height_m=emergency_height, descent_vel=DESCENT_VEL)
+                land(cf.high_level_commander, from_height_m=emergency_height, descent_vel=descent_vel,
+                     interruptible=False, arrival=arrival)
                 print("[EMERGENCY] Emergency landing completed.")
             except Exception as e:
                 print(f"[ERROR] Error during emergency landing: {e}")
@@ -404,6 +414,9 @@ def main():
                 except Exception:
                     pass
         finally:
+            if watcher:
+                watcher.stop()
+
             # Stop UDP streaming
             if UDP_ENABLED and streaming_active:
                 streaming_active = False
@@ -412,18 +425,37 @@ def main():
                 print("[UDP] Streaming stopped")
             
             # Stop logging
-            if log_conf:
+            if telemetry:
+                telemetry.stop()
+                print(telemetry.summary())
+            elif log_conf:
                 try:
                     log_conf.stop()
                 except Exception:
                     pass
+            if pose_forwarder:
+                print(pose_forwarder.report())
+            if arrival:
+                print(arrival.report())
+            if executor and executor.blender:
+                print(executor.blender.report())
+            music.stop()
+            print(music.report())
+            if executor and executor.timeline and executor.timeline.segments:
+                print(executor.timeline.table())
+                csv_path = os.path.join(recorder.path, 'timeline.csv') if recorder else TIMELINE_CSV
+                if csv_path:
+                    print(f"[TIMELINE] Trace written to {executor.timeline.export_csv(csv_path)}")
+            if recorder:
+                recorder.close()
+            if link:
+                link.close()
+                print(link.report())
             
-            # Close UDP socket
-            if udp_sock:
-                try:
-                    udp_sock.close()
-                except Exception:
-                    pass
+            # Close UDP sockets
+            if udp_sender:
+                print(udp_sender.report())
+                udp_sender.close()
             
             # Stop drone commands
             try:
@@ -436,5 +468,14 @@ def main():
                 pass
             print("[DISARM] Disarmed.")
 
+            timing = get_hl_calls(cf.high_level_commander).summary()
+            if timing:
+                print("[HL] Command send timing:\n" + timing)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    ap = argparse.ArgumentParser(description="Fly a show.")
+    ap.add_argument('--show', default=SHOW_FILE, help="show JSON file")
+    ap.add_argument('--venue', default=VENUE_FILE, help="venue overlay JSON file")
+    args = ap.parse_args()
+    main(args.show, args.venue)
\ No newline at end of file
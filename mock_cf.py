@@ -0,0 +1,125 @@
+# mock_cf.py
+"""
+Offline stand-ins for the parts of a Crazyflie the routines touch: the
+high-level commander, trajectory memory, params, platform and commander.
+Every call is recorded so routines can be exercised and inspected without
+a radio, e.g.
+
+    cf = MockCrazyflie()
+    circle(cf.high_level_commander, total_time=1.0, runner=TrajectoryRunner(cf))
+    print(cf.high_level_commander.calls)
+"""
+from trajectory import TYPE_TRAJ, TRAJ_MEM_BYTES, PIECE_BYTES, MAX_TRAJECTORIES, write_packets
+
+class MockHighLevelCommander:
+    """Records every high-level command; same signatures as cflib's."""
+
+    def __init__(self, cf=None):
+        self._cf = cf
+        self.calls = []     # (name, args, kwargs)
+        self.trajectories = {}
+
+    def _log(self, name, *args, **kwargs):
+        self.calls.append((name, args, kwargs))
+
+    def takeoff(self, absolute_height_m, duration_s, group_mask=0, yaw=0.0):
+        self._log('takeoff', absolute_height_m, duration_s, yaw=yaw)
+
+    def land(self, absolute_height_m, duration_s, group_mask=0, yaw=0.0):
+        self._log('land', absolute_height_m, duration_s, yaw=yaw)
+
+    def stop(self, group_mask=0):
+        self._log('stop')
+
+    def go_to(self, x, y, z, yaw, duration_s, relative=False, group_mask=0, linear=False):
+        self._log('go_to', x, y, z, yaw, duration_s, relative=relative)
+
+    def move_distance(self, distance_x_m, distance_y_m, distance_z_m, duration_s=None,
+                      velocity=None):
+        self._log('move_distance', distance_x_m, distance_y_m, distance_z_m,
+                  duration_s=duration_s, velocity=velocity)
+
+    def define_trajectory(self, trajectory_id, offset, n_pieces, group_mask=0, type=0):
+        self._log('define_trajectory', trajectory_id, offset, n_pieces)
+        if not 0 <= trajectory_id < MAX_TRAJECTORIES:
+            # The firmware rejects it without telling the host; fail loudly here
+            raise ValueError(f"Trajectory id {trajectory_id} out of range (0-{MAX_TRAJECTORIES - 1})")
+        self.trajectories[trajectory_id] = (offset, n_pieces)
+
+    def start_trajectory(self, trajectory_id, time_scale=1.0, relative=False,
+                         reversed=False, group_mask=0):
+        self._log('start_trajectory', trajectory_id, time_scale, relative)
+
+    def count(self, name=None):
+        return sum(1 for c in self.calls if name is None or c[0] == name)
+
+class MockTrajectoryMemory:
+    """Trajectory memory: one slot per piece, so overlapping writes overwrite each other."""
+
+    def __init__(self):
+        self.trajectory = []
+        self.pieces = [None] * (TRAJ_MEM_BYTES // PIECE_BYTES)
+        self.write_packets = 0
+
+    def write_data_sync(self, start_addr=0x0):
+        n_bytes = PIECE_BYTES * len(self.trajectory)
+        if start_addr % PIECE_BYTES or start_addr + n_bytes > TRAJ_MEM_BYTES:
+            raise ValueError(f"Bad trajectory write: {n_bytes} bytes at {start_addr}")
+        k = start_addr // PIECE_BYTES
+        self.pieces[k:k + len(self.trajectory)] = self.trajectory
+        self.write_packets += write_packets(n_bytes)
+        return True
+
+    def read(self, offset, n_pieces):
+        """The pieces currently stored for a trajectory defined at `offset`."""
+        k = offset // PIECE_BYTES
+        return self.pieces[k:k + n_pieces]
+
+class MockMemory:
+    def __init__(self):
+        self.traj = MockTrajectoryMemory()
+
+    def get_mems(self, type):
+        return [self.traj] if type == TYPE_TRAJ else []
+
+class MockParam:
+    def __init__(self):
+        self.values = {}
+        self.callbacks = {}   # complete name -> [cb]
+
+    def set_value(self, complete_name, value):
+        self.values[complete_name] = value
+        # The firmware echoes every write back; cflib calls the update callbacks
+        for cb in list(self.callbacks.get(complete_name, ())):
+            cb(complete_name, str(value))
+
+    def add_update_callback(self, group=None, name=None, cb=None):
+        self.callbacks.setdefault(f"{group}.{name}", []).append(cb)
+
+    def remove_update_callback(self, group, name=None, cb=None):
+        cbs = self.callbacks.get(f"{group}.{name}", [])
+        if cb in cbs:
+            cbs.remove(cb)
+
+class MockPlatform:
+    def __init__(self):
+        self.armed = False
+
+    def send_arming_request(self, do_arm):
+        self.armed = bool(do_arm)
+
+class MockCommander:
+    def send_stop_setpoint(self):
+        pass
+
+class MockCrazyflie:
+    def __init__(self):
+        self.high_level_commander = MockHighLevelCommander(self)
+        self.mem = MockMemory()
+        self.param = MockParam()
+        self.platform = MockPlatform()
+        self.commander = MockCommander()
+
+    def radio_packets(self):
+        """High-level commands + memory-write packets sent so far."""
+        return len(self.high_level_commander.calls) + self.mem.traj.write_packets
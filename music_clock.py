@@ -0,0 +1,208 @@
+# music_clock.py
+"""
+Music-position sources the show timeline slaves to.
+
+A source turns observations of the music position into an estimate of
+where music 0:00 falls on the show clock (t0()). ShowTimeline re-reads it
+at every segment start, so segment k starts at t0 + its planned music time
+and error doesn't accumulate across the show.
+
+Sources:
+    WallClock       music 0:00 = when the show starts (the old behaviour)
+    AudioFileClock  plays a local audio file (pygame) and follows its
+                    playback position
+    UdpMusicClock   follows the position reported by the playback machine
+                    over UDP: one datagram per update holding the position
+                    in seconds, as text ("83.417") or a little-endian double
+
+Each observation gives an offset = local receive time - music position.
+Delivery delay and polling only ever make an observation late, so the
+estimate is the minimum offset over the last WINDOW observations (as NTP
+does); jitter is their spread. A shift larger than JUMP_S that persists
+for JUMP_CONFIRM observations (the track was restarted or seeked) resets
+the window.
+"""
+import math, time, struct, socket, threading
+from collections import deque
+
+import show_clock
+
+WINDOW = 50           # observations kept for the offset estimate
+JUMP_S = 0.5          # offset change treated as a seek/restart
+JUMP_CONFIRM = 3      # consecutive observations needed to accept a jump
+
+class MusicClock:
+    name = "music"
+
+    def __init__(self, window=WINDOW):
+        self._offsets = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._jumped = 0
+        self.samples = 0
+        self.jumps = 0
+        self.t_started = None     # show clock time start() was called
+        self.first_t0 = None
+
+    def start(self):
+        """Start the music (or start following it)."""
+        self.t_started = show_clock.now()
+        return self
+
+    def stop(self):
+        pass
+
+    def observe(self, position_s, t_local=None):
+        """Record that the music was at `position_s` at show-clock time t_local (default now)."""
+        offset = (show_clock.now() if t_local is None else t_local) - position_s
+        with self._lock:
+            self.samples += 1
+            if self._offsets and abs(offset - min(self._offsets)) > JUMP_S:
+                self._jumped += 1
+                if self._jumped < JUMP_CONFIRM:
+                    return
+                self._offsets.clear()
+                self.jumps += 1
+            self._jumped = 0
+            self._offsets.append(offset)
+            if self.first_t0 is None:
+                self.first_t0 = offset
+
+    def t0(self):
+        """Show-clock time of music 0:00, or None before the first observation."""
+        with self._lock:
+            return min(self._offsets) if self._offsets else None
+
+    def position(self):
+        """Current music position (s), or None if unknown."""
+        t0 = self.t0()
+        return None if t0 is None else show_clock.now() - t0
+
+    def jitter(self):
+        """Spread (max - min) of the offsets in the window (s)."""
+        with self._lock:
+            return max(self._offsets) - min(self._offsets) if self._offsets else math.nan
+
+    def report(self):
+        t0 = self.t0()
+        if t0 is None:
+            return f"[MUSIC] {self.name}: no position received."
+        line = (f"[MUSIC] {self.name}: {self.samples} observations, "
+                f"jitter {1e3 * self.jitter():.1f} ms, "
+                f"drift over show {1e3 * (t0 - self.first_t0):+.1f} ms")
+        if self.t_started is not None:
+            line += f", music 0:00 at {1e3 * (t0 - self.t_started):+.1f} ms vs show start"
+        if self.jumps:
+            line += f", {self.jumps} seek/restart"
+        return line
+
+class WallClock(MusicClock):
+    """Music 0:00 is the moment the show starts; nothing to follow."""
+    name = "wall clock"
+
+    def start(self):
+        super().start()
+        self.observe(0.0, self.t_started)
+        return self
+
+class AudioFileClock(MusicClock):
+    """
+    Plays `path` through pygame's mixer when the show starts and follows
+    its playback position, sampled from a thread at `hz`. pygame is only
+    needed for this source.
+    """
+
+    def __init__(self, path, hz=50.0, window=WINDOW):
+        super().__init__(window)
+        try:
+            import pygame
+        except ImportError as e:
+            raise RuntimeError("AudioFileClock needs pygame (pip install pygame)") from e
+        self.path = path
+        self.name = f"audio file {path}"
+        self.hz = hz
+        self._running = False
+        self._thread = None
+        self._music = pygame.mixer.music
+        pygame.mixer.init()
+        self._music.load(path)
+
+    def start(self):
+        self._music.play()
+        super().start()
+        self._running = True
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return self
+
+    def position_now(self):
+        ms = self._music.get_pos()   # ms since play(); -1 when stopped
+        return ms / 1000.0 if ms >= 0 else None
+
+    def _poll(self):
+        dt = 1.0 / self.hz
+        while self._running:
+            pos = self.position_now()
+            if pos is not None:
+                self.observe(pos)
+            time.sleep(dt)   # real time even under a virtual show clock
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self._music.stop()
+
+class UdpMusicClock(MusicClock):
+    """Follows position datagrams from the playback machine on UDP `port`."""
+
+    def __init__(self, port, host="0.0.0.0", window=WINDOW):
+        super().__init__(window)
+        self.name = f"UDP clock :{port}"
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.2)
+        self.bad = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()   # follow the music before the show starts too
+
+    def _receive(self):
+        while self._running:
+            try:
+                data = self.sock.recv(64)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            t_local = show_clock.now()
+            pos = parse_position(data)
+            if pos is None:
+                self.bad += 1
+            else:
+                self.observe(pos, t_local)
+
+    def stop(self):
+        self._running = False
+        self._thread.join(timeout=1.0)
+        self.sock.close()
+
+def parse_position(data):
+    """Music position (s) from a clock datagram, or None if it isn't one."""
+    if len(data) == 8:
+        pos = struct.unpack('<d', data)[0]
+    else:
+        try:
+            pos = float(data.decode('ascii').strip())
+        except (UnicodeDecodeError, ValueError):
+            return None
+    return pos if math.isfinite(pos) else None
+
+def make_clock(source, *, audio_file=None, udp_port=None):
+    """Build a source from main.py's MUSIC_* config: "wall", "audio" or "udp"."""
+    if source == "wall":
+        return WallClock()
+    if source == "audio":
+        return AudioFileClock(audio_file)
+    if source == "udp":
+        return UdpMusicClock(udp_port)
+    raise ValueError(f"Unknown music clock source {source!r} (wall, audio, udp)")
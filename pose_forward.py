@@ -0,0 +1,87 @@
+# pose_forward.py
+import time
+from array import array
+
+class LatencyStats:
+    """Running count/mean/max plus a ring of recent samples for percentiles (seconds)."""
+
+    def __init__(self, ring=512):
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._ring = array('d', bytes(8 * ring))
+        self._size = ring
+
+    def add(self, dt):
+        self._ring[self.n % self._size] = dt
+        self.n += 1
+        self.total += dt
+        if dt > self.max:
+            self.max = dt
+
+    def percentile(self, q):
+        k = min(self.n, self._size)
+        if not k:
+            return 0.0
+        recent = sorted(self._ring[:k])
+        return recent[min(k - 1, int(q * k))]
+
+    def summary(self):
+        if not self.n:
+            return "no samples"
+        return (f"n={self.n}  mean={1e6 * self.total / self.n:.0f} us  "
+                f"p95={1e6 * self.percentile(0.95):.0f} us  max={1e6 * self.max:.0f} us")
+
+class PoseForwarder:
+    """
+    Event-driven pose forwarding: each LogConfig sample is sent over UDP from
+    the log callback as it arrives, instead of being picked up by a polling
+    thread that isn't phase-aligned with the log period.
+
+    The newest pose is published as one immutable tuple (single-slot, no lock);
+    other threads read it with latest(). max_hz optionally rate-limits sends.
+    """
+
+    def __init__(self, sender, *, max_hz=0.0, flags_fn=None,
+                 names=('stateEstimate.x', 'stateEstimate.y', 'stateEstimate.z', 'stabilizer.yaw')):
+        self.sender = sender
+        self.min_interval = 1.0 / max_hz if max_hz else 0.0
+        self.flags_fn = flags_fn
+        self.names = names
+        self._latest = (0.0, 0.0, 0.0, 0.0, 0.0)
+        self._last_send = float('-inf')
+        self.received = 0
+        self.sent = 0
+        self.skipped = 0
+        self.errors = 0
+        self.latency = LatencyStats()
+
+    def latest(self):
+        """(x, y, z, yaw_deg, ts) of the newest sample."""
+        return self._latest
+
+    def on_log(self, timestamp, data, logconf):
+        t_arrive = time.perf_counter()
+        nx, ny, nz, nyaw = self.names
+        pose = (data[nx], data[ny], data[nz], data[nyaw], time.time())
+        self._latest = pose
+        self.received += 1
+
+        if t_arrive - self._last_send < self.min_interval:
+            self.skipped += 1
+            return
+        self._last_send = t_arrive
+        try:
+            self.sender.send(*pose, self.flags_fn() if self.flags_fn else 0)
+        except Exception as e:
+            self.errors += 1
+            if self.errors == 1 or self.errors % 100 == 0:
+                print(f"[UDP] Error sending ({self.errors} so far): {e}")
+            return
+        self.sent += 1
+        self.latency.add(time.perf_counter() - t_arrive)
+
+    def report(self):
+        return (f"[UDP] Forwarded {self.sent}/{self.received} log samples "
+                f"({self.skipped} rate-limited, {self.errors} errors) | "
+                f"log arrival -> sendto latency: {self.latency.summary()}")
@@ -0,0 +1,184 @@
+# pose_udp.py
+"""
+Pose packet encoding for the Unity/Quest UDP stream.
+
+Two formats, selected with UDP_FORMAT in main.py:
+
+- "json":   {"x": .., "y": .., "z": .., "yaw_deg": .., "ts": ..}  (same as mock_pos.py)
+- "binary": fixed 32-byte little-endian packet, packed into a preallocated buffer
+
+    offset  type     field
+    0       char[2]  magic  b"CF"
+    2       uint8    version (1)
+    3       uint8    flags   (FLAG_*)
+    4       uint32   seq     (wraps at 2^32)
+    8       float64  ts      (unix time, s)
+    16      float32  x, y, z (m), yaw_deg
+
+The sequence number lets a receiver detect loss and reordering (see SeqTracker).
+
+PoseSender fans each encoded packet out to any number of destinations
+(unicast or multicast), e.g. the Unity editor and the Quest at once.
+"""
+import json, struct, socket, ipaddress
+
+PACKET = struct.Struct('<2sBBIdffff')
+MAGIC = b'CF'
+VERSION = 1
+
+FLAG_EMERGENCY = 0x01   # emergency landing in progress
+FLAG_REPLAY    = 0x02   # replayed / simulated data, not a live flight
+
+FORMATS = ('json', 'binary')
+
+MULTICAST_TTL = 1       # multicast hops: stay on the local network
+
+class PoseEncoder:
+    def __init__(self, fmt='json'):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown pose packet format {fmt!r}; expected one of {FORMATS}")
+        self.fmt = fmt
+        self.seq = 0
+        self._buf = bytearray(PACKET.size)
+        self._view = memoryview(self._buf)
+
+    def encode(self, x, y, z, yaw_deg, ts, flags=0):
+        """Encoded packet. Binary packets reuse one buffer: send it before encoding the next."""
+        seq = self.seq
+        self.seq = (seq + 1) & 0xFFFFFFFF
+        if self.fmt == 'binary':
+            PACKET.pack_into(self._buf, 0, MAGIC, VERSION, flags, seq, ts, x, y, z, yaw_deg)
+            return self._view
+        return json.dumps({"x": x, "y": y, "z": z, "yaw_deg": yaw_deg, "ts": ts}).encode("utf-8")
+
+def decode(packet):
+    """Decode either format into a dict (binary packets also carry seq and flags)."""
+    if len(packet) == PACKET.size and bytes(packet[:2]) == MAGIC:
+        _, version, flags, seq, ts, x, y, z, yaw = PACKET.unpack(packet)
+        return {"x": x, "y": y, "z": z, "yaw_deg": yaw, "ts": ts, "seq": seq, "flags": flags,
+                "version": version}
+    return json.loads(bytes(packet).decode("utf-8"))
+
+class SeqTracker:
+    """Receiver-side loss / reordering counters from binary packet sequence numbers."""
+
+    def __init__(self):
+        self.last = None
+        self.received = 0
+        self.lost = 0
+        self.reordered = 0
+
+    def update(self, seq):
+        """Returns False for a late (reordered/duplicate) packet that should be dropped."""
+        self.received += 1
+        if self.last is None:
+            self.last = seq
+            return True
+        gap = (seq - self.last) & 0xFFFFFFFF
+        if gap == 0:                        # duplicate
+            return False
+        if gap >= 0x80000000:               # older than the newest seen: arrived late
+            self.reordered += 1
+            if self.lost:
+                self.lost -= 1
+            return False
+        self.lost += gap - 1
+        self.last = seq
+        return True
+
+def parse_destination(spec, default_port):
+    """(host, port) from "host", "host:port" or a (host, port) pair."""
+    if isinstance(spec, str):
+        host, _, port = spec.rpartition(':') if ':' in spec else (spec, '', '')
+        return host, int(port) if port else default_port
+    host, port = spec
+    return host, int(port)
+
+class Destination:
+    """One receiver: its own non-blocking socket plus send counters."""
+
+    def __init__(self, host, port, multicast_ttl=MULTICAST_TTL):
+        self.addr = (socket.gethostbyname(host), port)   # resolve once, not per packet
+        self.label = f"{host}:{port}"
+        self.multicast = ipaddress.ip_address(self.addr[0]).is_multicast
+        self.sent = 0
+        self.errors = 0         # send failed (no route, ICMP port unreachable, ...)
+        self.backpressure = 0   # socket buffer full: packet dropped for this receiver only
+        self.last_error = None
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        if self.multicast:
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, multicast_ttl)
+        try:
+            # Connected: no route lookup per packet, and a closed port on the
+            # receiver is reported back as ConnectionRefusedError
+            self.sock.connect(self.addr)
+            self._send = self.sock.send
+        except OSError as e:
+            self._fail(e)
+            self._send = lambda packet: self.sock.sendto(packet, self.addr)
+
+    def send(self, packet):
+        try:
+            self._send(packet)
+            self.sent += 1
+        except BlockingIOError:
+            self.backpressure += 1
+        except OSError as e:
+            self._fail(e)
+
+    def _fail(self, e):
+        self.errors += 1
+        self.last_error = e
+        if self.errors == 1 or self.errors % 100 == 0:
+            print(f"[UDP] {self.label}: error sending ({self.errors} so far): {e}")
+
+    def close(self):
+        self.sock.close()
+
+class PoseSender:
+    """
+    Encodes each pose once and sends it to every destination. Each
+    destination has its own non-blocking socket and counters, so a receiver
+    that is unreachable or can't keep up loses packets without delaying the
+    others.
+    """
+
+    def __init__(self, dests, fmt='json', *, default_port=5005, multicast_ttl=MULTICAST_TTL):
+        """dests: (host, port), "host[:port]", or a list of those; multicast groups are fine."""
+        if isinstance(dests, (str, tuple)):
+            dests = [dests]
+        self.encoder = PoseEncoder(fmt)
+        self.poses = 0
+        self.dests = []
+        for spec in dests:
+            host, port = parse_destination(spec, default_port)
+            try:
+                self.dests.append(Destination(host, port, multicast_ttl))
+            except OSError as e:
+                print(f"[UDP] Skipping {host}:{port}: {e}")
+        if not self.dests:
+            raise ValueError("no usable UDP destination")
+
+    def send(self, x, y, z, yaw_deg, ts, flags=0):
+        packet = self.encoder.encode(x, y, z, yaw_deg, ts, flags)
+        self.poses += 1
+        for d in self.dests:
+            d.send(packet)
+
+    def describe(self):
+        return ", ".join(d.label + (" (multicast)" if d.multicast else "") for d in self.dests)
+
+    def report(self):
+        lines = [f"[UDP] {self.poses} poses to {len(self.dests)} destination(s):"]
+        for d in self.dests:
+            line = (f"  {d.label:21s} sent {d.sent}, {d.errors} errors, "
+                    f"{d.backpressure} dropped (socket buffer full)")
+            if d.last_error is not None:
+                line += f" | last error: {d.last_error}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def close(self):
+        for d in self.dests:
+            d.close()
@@ -0,0 +1,148 @@
+# preflight.py
+"""
+Pipelined preflight.
+
+Independent setup steps (param writes, arming, log blocks) are all issued
+first and their acknowledgements are then waited on together, instead of
+each step sleeping behind the previous one:
+
+- param write: acked when the Crazyflie echoes the new value back
+  (cflib param update callback)
+- log block:   acked when its first sample arrives
+- action:      fire-and-forget (e.g. arming); timed, no ack
+
+    pf = Preflight(cf)
+    pf.param('commander.enHighLevel', '1')
+    pf.param('motorPowerSet.enable', '0', optional=True)
+    pf.action('arm', lambda: cf.platform.send_arming_request(True))
+    pf.log(log_conf)
+    pf.wait()
+    print(pf.report())
+"""
+import threading
+
+import show_clock
+import safe_sleep
+from cfutils import wait_event
+
+class Step:
+    def __init__(self, kind, label, t_issued):
+        self.kind = kind
+        self.label = label
+        self.t_issued = t_issued
+        self.t_acked = None
+        self.status = 'pending'      # pending / ok / skipped / timeout / failed
+        self.event = threading.Event()
+
+    def ack(self):
+        if not self.event.is_set():
+            self.t_acked = show_clock.now()
+            self.status = 'ok'
+            self.event.set()
+            safe_sleep.wake()
+
+class Preflight:
+    def __init__(self, cf, timeout_s=2.0):
+        self.cf = cf
+        self.timeout_s = timeout_s
+        self.t0 = show_clock.now()
+        self.steps = []
+        self._cleanup = []
+
+    def _step(self, kind, label):
+        step = Step(kind, label, show_clock.now())
+        self.steps.append(step)
+        return step
+
+    def param(self, name, value, optional=False):
+        """Write a param; acked by its echoed value. optional: skip if not in the TOC."""
+        step = self._step('param', f"{name}={value}")
+        group, _, short = name.partition('.')
+        param = self.cf.param
+
+        def on_update(complete_name, value_s):
+            step.ack()
+        if hasattr(param, 'add_update_callback'):
+            param.add_update_callback(group=group, name=short, cb=on_update)
+            if hasattr(param, 'remove_update_callback'):
+                self._cleanup.append(lambda: param.remove_update_callback(group, short, on_update))
+        try:
+            param.set_value(name, value)
+        except Exception as e:
+            if not optional:
+                step.status = 'failed'
+                raise
+            step.status = 'skipped'
+            step.event.set()
+            print(f"[PREFLIGHT] {name} not set: {e}")
+            return step
+        if not hasattr(param, 'add_update_callback'):
+            step.ack()   # no echo available (older cflib / mock): treat the write as done
+        return step
+
+    def log(self, conf, label=None):
+        """Add and start a LogConfig; acked by its first sample."""
+        step = self._step('log', label or conf.name)
+        conf.data_received_cb.add_callback(lambda *_: step.ack())
+        try:
+            self.cf.log.add_config(conf)
+            conf.start()
+        except Exception:
+            step.status = 'failed'   # nothing to wait for
+            step.event.set()
+            raise
+        return step
+
+    def action(self, label, fn):
+        """Run fn now (no acknowledgement to wait for)."""
+        step = self._step('action', label)
+        try:
+            fn()
+            step.ack()
+        except Exception as e:
+            step.status = 'skipped'
+            step.event.set()
+            print(f"[PREFLIGHT] {label} skipped: {e}")
+        return step
+
+    def timed(self, label, fn):
+        """Run a blocking step after the pipelined ones (e.g. estimator settle); returns fn()."""
+        step = self._step('timed', label)
+        result = fn()
+        step.ack()
+        return result
+
+    def wait(self):
+        """
+        Wait for every outstanding ack (all at once, one shared timeout). Returns
+        True if all ok. An emergency ends the wait with KeyboardInterrupt.
+        """
+        deadline = show_clock.now() + self.timeout_s
+        try:
+            for step in self.steps:
+                if not wait_event(step.event, max(0.0, deadline - show_clock.now())):
+                    step.status = 'timeout'
+                    print(f"[PREFLIGHT] No ack for {step.kind} {step.label} within {self.timeout_s:.1f} s")
+        finally:
+            for fn in self._cleanup:
+                try:
+                    fn()
+                except Exception:
+                    pass
+            self._cleanup = []
+        return all(s.status in ('ok', 'skipped') for s in self.steps)
+
+    def elapsed(self):
+        return show_clock.now() - self.t0
+
+    def report(self):
+        lines = [f"[PREFLIGHT] {len(self.steps)} steps in {1e3 * self.elapsed():.0f} ms:"]
+        for s in self.steps:
+            start = 1e3 * (s.t_issued - self.t0)
+            if s.t_acked is not None:
+                end = 1e3 * (s.t_acked - self.t0)
+                timing = f"{start:7.1f} -> {end:7.1f} ms  ({end - start:6.1f} ms)"
+            else:
+                timing = f"{start:7.1f} ms issued"
+            lines.append(f"  {s.kind:<6} {s.label:<28} {timing}  {s.status}")
+        return "\n".join(lines)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# replay.py
+"""
+Stream a recorded flight or a simulator trace to the Unity/Quest receiver.
+
+Replay uses the same pose_udp.PoseSender as the live stream, so it sends
+the same packets (binary packets also carry FLAG_REPLAY). Unity can be
+tested, and the headset receiver load-tested, without flying or running
+mock_pos.py.
+
+Sources:
+    flights/<timestamp>/   a flight_recorder directory (live or simulate.py --record)
+    trace.npz              simulate.py --trace output
+
+Playback:
+    --speed K   K times real time (default 1)
+    --afap      no pacing (packets a full socket buffer can't take are dropped)
+    --hz N      resample the track to N Hz (linear, yaw the short way), so the
+                send rate doesn't depend on the recorded log rate
+    --from/--to seek by show time ("1:26" or seconds). Recorded flights are
+                on show time, with takeoff before 0; a .npz trace is on its
+                simulation clock
+    --loop      start over at the end until Ctrl-C
+
+    python3 replay.py flights/20261017-201500
+    python3 replay.py flights/20261017-201500 --from 1:26 --to 1:50 --speed 2 --loop
+    python3 replay.py trace.npz --afap --hz 500 --format binary --dest 127.0.0.1 --dest 239.255.0.5
+"""
+import os, sys, time, argparse
+import numpy as np
+
+from flight_recorder import load_flight
+from pose_udp import PoseSender, FLAG_REPLAY
+from show import parse_timestamp
+
+def load_track(path):
+    """(n, 5) float64 rows t, x, y, z, yaw_deg from a flight directory or a .npz trace."""
+    if os.path.isdir(path):
+        cols = load_flight(path)
+        t_log, t_show = np.asarray(cols['t_log']), np.asarray(cols['t_show'])
+        # Put the whole flight on show time: takeoff before 0, landing after the show
+        on_show = np.flatnonzero(~np.isnan(t_show))
+        offset = t_show[on_show[0]] - t_log[on_show[0]] if len(on_show) else -t_log[0]
+        t = t_log + offset
+        track = np.column_stack((t, cols['x'], cols['y'], cols['z'], cols['yaw_deg']))
+    else:
+        with np.load(path) as z:
+            track = np.column_stack((z['t'], z['x'], z['y'], z['z'], z['yaw_deg']))
+    if not len(track):
+        raise ValueError(f"{path}: no samples")
+    return np.ascontiguousarray(track, dtype=np.float64)
+
+def resample(track, hz):
+    """The track at `hz`, linearly interpolated; yaw is unwrapped first so it turns the short way."""
+    t = track[:, 0]
+    t_new = np.arange(t[0], t[-1] + 0.5 / hz, 1.0 / hz)
+    yaw = np.degrees(np.unwrap(np.radians(track[:, 4])))
+    out = np.column_stack([t_new] + [np.interp(t_new, t, track[:, k]) for k in (1, 2, 3)]
+                          + [np.interp(t_new, t, yaw)])
+    out[:, 4] = (out[:, 4] + 180.0) % 360.0 - 180.0
+    return out
+
+class Replayer:
+    """
+    Sends track rows through a PoseSender on the track's own timing scaled
+    by `speed` (0 = as fast as possible). Packet timestamps are the send
+    time, like a live stream; per-destination send errors are counted by
+    the sender (sender.report()).
+    """
+
+    def __init__(self, sender, track, *, speed=1.0, flags=FLAG_REPLAY):
+        self.sender = sender
+        self.track = track
+        self.speed = speed
+        self.flags = flags
+        self.sent = 0
+        self.passes = 0
+        self.max_behind = 0.0    # worst lag behind the schedule (s)
+
+    def window(self, t_from=None, t_to=None):
+        t = self.track[:, 0]
+        lo = 0 if t_from is None else int(np.searchsorted(t, t_from))
+        hi = len(t) if t_to is None else int(np.searchsorted(t, t_to, side='right'))
+        return self.track[lo:hi]
+
+    def play(self, t_from=None, t_to=None, loop=False):
+        rows = self.window(t_from, t_to)
+        if not len(rows):
+            raise ValueError("nothing to replay in the selected window")
+        # Keep the sample spacing across the wrap from the last row back to the first
+        gap = float(np.median(np.diff(rows[:, 0]))) / self.speed if self.speed > 0 and len(rows) > 1 else 0.0
+        while True:
+            self._pass(rows)
+            self.passes += 1
+            if not loop:
+                return
+            time.sleep(gap)
+
+    def _pass(self, rows):
+        send, flags, speed = self.sender.send, self.flags, self.speed
+        offsets = (rows[:, 0] - rows[0, 0]) / speed if speed > 0 else None
+        t_start = time.perf_counter()
+        for k, (t, x, y, z, yaw) in enumerate(rows.tolist()):
+            if offsets is not None:
+                due = t_start + offsets[k]
+                lag = time.perf_counter() - due
+                if lag < 0:
+                    time.sleep(-lag)
+                elif lag > self.max_behind:
+                    self.max_behind = lag
+            send(x, y, z, yaw, time.time(), flags)
+            self.sent += 1
+
+    def report(self, elapsed_s):
+        rate = self.sent / elapsed_s if elapsed_s > 0 else 0.0
+        return (f"[REPLAY] {self.sent} poses in {elapsed_s:.2f}s ({rate:.0f} Hz), {self.passes} pass(es), "
+                f"max behind schedule {1e3 * self.max_behind:.1f} ms")
+
+def main():
+    import main as routine
+    ap = argparse.ArgumentParser(description="Replay a recorded flight or sim trace over UDP.")
+    ap.add_argument('source', help="flight directory (flights/...) or simulate.py --trace .npz")
+    ap.add_argument('--dest', action='append', metavar='HOST[:PORT]',
+                    help="destination, repeatable (default: UDP_DESTINATIONS in main.py)")
+    ap.add_argument('--port', type=int, default=routine.UDP_PORT, help="port for destinations without one")
+    ap.add_argument('--format', default=routine.UDP_FORMAT, choices=('json', 'binary'))
+    ap.add_argument('--speed', type=float, default=1.0, help="playback speed (1 = real time)")
+    ap.add_argument('--afap', action='store_true', help="send as fast as possible")
+    ap.add_argument('--hz', type=float, help="resample the track to this rate")
+    ap.add_argument('--from', dest='t_from', help="start at this show time (m:ss or s)")
+    ap.add_argument('--to', dest='t_to', help="stop at this show time (m:ss or s)")
+    ap.add_argument('--loop', action='store_true', help="repeat until Ctrl-C")
+    args = ap.parse_args()
+    if args.speed <= 0 and not args.afap:
+        ap.error("--speed must be > 0 (use --afap for as fast as possible)")
+
+    try:
+        track = load_track(args.source)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"[REPLAY] Can't load {args.source}: {e}")
+        sys.exit(1)
+    if args.hz:
+        track = resample(track, args.hz)
+    t_from = parse_timestamp(args.t_from) if args.t_from is not None else None
+    t_to = parse_timestamp(args.t_to) if args.t_to is not None else None
+
+    try:
+        sender = PoseSender(args.dest or routine.UDP_DESTINATIONS, args.format, default_port=args.port,
+                            multicast_ttl=routine.UDP_MULTICAST_TTL)
+    except ValueError as e:
+        print(f"[REPLAY] {e}")
+        sys.exit(1)
+    replayer = Replayer(sender, track, speed=0.0 if args.afap else args.speed)
+    span = replayer.window(t_from, t_to)
+    if not len(span):
+        print(f"[REPLAY] {args.source}: nothing between {args.t_from} and {args.t_to} "
+              f"(track covers {track[0, 0]:.2f} - {track[-1, 0]:.2f}s)")
+        sender.close()
+        sys.exit(1)
+    print(f"[REPLAY] {args.source}: {len(span)} poses, show time {span[0, 0]:.2f} - {span[-1, 0]:.2f}s")
+    print(f"[REPLAY] Sending {args.format} to {sender.describe()} "
+          f"({'as fast as possible' if args.afap else f'{args.speed:g}x real time'}"
+          f"{', looping' if args.loop else ''})")
+    t0 = time.perf_counter()
+    try:
+        replayer.play(t_from, t_to, args.loop)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        print(replayer.report(time.perf_counter() - t0))
+        print(sender.report())
+        sender.close()
+
+if __name__ == "__main__":
+    main()
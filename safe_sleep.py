@@ -1,48 +1,135 @@
 # safe_sleep.py
-import sys, select, time
+import sys, time, select, threading
+import show_clock
 
 # Global flag to signal an emergency stop
 emergency_stop = False
 
+# Set by trigger_emergency(); every safe_sleep_until() wait blocks on it
+emergency_event = threading.Event()
+_wake = threading.Condition()   # notified on emergency and by wake()
+emergency_source = None
+_triggered_at = None      # time.perf_counter() of the trigger
+
+# Set False to ignore stdin (simulation / non-interactive runs)
+monitor_keyboard = True
+
+# True while an input_watcher.InputWatcher owns stdin; check_keyboard_input
+# then only reports the event instead of polling stdin itself
+watcher_active = False
+
+def trigger_emergency(source="keyboard"):
+    """Raise the emergency: sets the flag and wakes every waiter. Safe from any thread."""
+    global emergency_stop, emergency_source, _triggered_at
+    if emergency_event.is_set():
+        return
+    _triggered_at = time.perf_counter()
+    emergency_source = source
+    emergency_stop = True
+    emergency_event.set()
+    wake()
+
+def wake():
+    """Make blocked safe_sleep_until() waits re-check their `until` condition. Safe from any thread."""
+    with _wake:
+        _wake.notify_all()
+
+def emergency_latency():
+    """Seconds since the emergency was triggered (None if it wasn't)."""
+    if _triggered_at is None:
+        return None
+    return time.perf_counter() - _triggered_at
+
 def check_keyboard_input():
     """
     Check if any keyboard input is available (non-blocking).
     Sets the global emergency_stop flag if input is detected.
     """
-    global emergency_stop
     if emergency_stop:  # Don't check again if already triggered
         return True
+    if not monitor_keyboard or watcher_active:
+        return False
 
     if sys.platform == 'win32':
         import msvcrt
         if msvcrt.kbhit():
-            emergency_stop = True
+            trigger_emergency("keyboard")
             return True
     else:
         # Unix/Linux/Mac
         if select.select([sys.stdin], [], [], 0)[0] != []:
-            emergency_stop = True
+            trigger_emergency("keyboard")
             return True
     return False
 
-def safe_sleep(duration):
+def safe_sleep_until(deadline, interruptible=True, until=None):
+    """
+    Sleep until the absolute show-clock time `deadline`. The remaining time
+    is re-read from the clock on every step, so send time and oversleep
+    don't accumulate.
+
+    With an InputWatcher running, the wait blocks on the emergency event
+    and returns the moment it is set; otherwise stdin is polled every 0.1 s.
+    Raises KeyboardInterrupt on an emergency unless interruptible is False
+    (used by the emergency landing itself). `until` is an optional
+    predicate that ends the wait early; whoever makes it true calls wake().
+    """
+    interval = 0.1 if until is None else 0.01   # virtual-clock step for until checks
+
+    def woken():
+        return (interruptible and emergency_event.is_set()) or (until is not None and until())
+
+    while True:
+        if interruptible and check_keyboard_input():
+            raise KeyboardInterrupt(f"Emergency ({emergency_source}) - initiating smooth landing")
+        if until is not None and until():
+            return
+
+        remaining = deadline - show_clock.now()
+        if remaining <= 0:
+            return
+        if show_clock.is_virtual():
+            show_clock.sleep(min(interval, remaining))
+            continue
+        # Without a watcher stdin has to be polled, so wake up every 0.1 s
+        polling = interruptible and monitor_keyboard and not watcher_active
+        with _wake:
+            _wake.wait_for(woken, min(0.1, remaining) if polling else remaining)
+
+def safe_sleep(duration, interruptible=True):
     """
     Sleep for a given duration while checking for keyboard input.
     Raises KeyboardInterrupt if input is detected.
     """
-    global emergency_stop
-    elapsed = 0
-    interval = 0.1
-    
-    while elapsed < duration:
-        if check_keyboard_input():
-            emergency_stop = True
-            raise KeyboardInterrupt("Keyboard input detected - initiating smooth landing")
-        
-        time.sleep(min(interval, duration - elapsed))
-        elapsed += interval
+    safe_sleep_until(show_clock.now() + duration, interruptible)
+
+def run_steps(steps, interruptible=True):
+    """
+    Fly a primitive's step generator (e.g. waypoints.waypoint_steps()) on
+    this thread; returns the generator's return value. The generator sends
+    the commands itself and yields only what it waits for:
+
+        (deadline, until)  safe_sleep_until(deadline, interruptible, until)
+        callable           a blocking call (e.g. an upload); its result is
+                           sent back into the generator
+
+    aio_show.run_steps() flies the same generators on an event loop.
+    """
+    result = None
+    try:
+        while True:
+            try:
+                item = steps.send(result)
+            except StopIteration as stop:
+                return stop.value
+            if callable(item):
+                result = item()
+            else:
+                result = None
+                safe_sleep_until(item[0], interruptible, until=item[1])
+    finally:
+        steps.close()
 
 def get_emergency_flag():
     """Allows other modules to check the flag"""
-    global emergency_stop
-    return emergency_stop
\ No newline at end of file
+    return emergency_stop
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# safety_check.py
+"""
+Offline safety / feasibility check of a compiled show, run before the
+radio is touched.
+
+Every commanded move (takeoff, each go_to waypoint row, land) becomes one
+row of a move table. Velocity, acceleration, yaw rate and path geometry are
+then computed for all rows at once with NumPy:
+
+- An isolated move (the next command comes after it ends) is planned by the
+  firmware as a rest-to-rest 7th-order polynomial, whose peaks are
+  K_V * d / T and K_A * d / T^2.
+- A chained move (the next go_to goes out before it ends: orbit rows) is
+  flown through without stopping, so its speed is d / T and its
+  acceleration the change of that velocity to the neighbouring rows over T.
+
+Checks: geofence (box), performer keep-out radius around (0, 0) (closest
+approach of each straight move), min/max height while in the show, and max
+velocity / acceleration / yaw rate. Limits are DEFAULT_LIMITS, overridden
+by venue parameters of the same name, then by the `limits` argument.
+
+    python3 safety_check.py shows/incomplete.json --venue shows/venues/small.json
+"""
+import sys, time, argparse
+import numpy as np
+
+from show import load_show, ShowError, TAKEOFF, LAND
+from waypoints import T, X, Z, YAW, row_durations
+
+DEFAULT_LIMITS = {
+    'GEOFENCE_X': [-2.0, 2.0],     # m
+    'GEOFENCE_Y': [-2.0, 3.0],     # m (+Y toward the audience)
+    'Z_MIN': 0.3,                  # m, between takeoff and land
+    'Z_MAX': 2.5,                  # m
+    'KEEP_OUT_R': 0.5,             # m around the performer at (0, 0)
+    'V_MAX': 1.0,                  # m/s
+    'A_MAX': 3.0,                  # m/s^2
+    'YAW_RATE_MAX': 90.0,          # deg/s
+    'MIN_SEPARATION': 0.5,         # m between any two drones (swarm.py)
+}
+
+# Peak velocity / acceleration of the unit rest-to-rest 7th-order
+# polynomial p(s) = 35 s^4 - 84 s^5 + 70 s^6 - 20 s^7 (firmware go_to planner)
+_s = np.linspace(0.0, 1.0, 2001)
+K_V = float(np.max(140 * _s**3 - 420 * _s**4 + 420 * _s**5 - 140 * _s**6))           # 2.1875
+K_A = float(np.max(np.abs(420 * _s**2 - 1680 * _s**3 + 2100 * _s**4 - 840 * _s**5)))  # ~7.51
+del _s
+
+CHAIN_EPS = 1e-6   # next send no later than the move's end (s) = chained
+SEPARATION_DT = 0.05   # s between samples of the swarm separation check
+
+def move_table(show, start_xy=None):
+    """
+    One entry per commanded move: segment index, send time (show s),
+    duration, from (n, 3), to (n, 3), yaw change (deg) and chained flag.
+    start_xy is where the drone takes off (default: under the first waypoint).
+    """
+    segs, sp = show.segments, show.setpoints
+    if start_xy is None:
+        start_xy = sp[0, X:Z] if len(sp) else (0.0, 0.0)
+    seg_idx, t_send, dur, to, yaw = [], [], [], [], []
+    for i, seg in enumerate(segs):
+        kind = int(seg['kind'])
+        if kind == TAKEOFF or kind == LAND:
+            z = float(seg['z_end']) if kind == TAKEOFF else 0.0
+            move = float(seg['move']) if kind == TAKEOFF else max(0.0, float(seg['slot']) - 0.3)
+            seg_idx.append([i]); t_send.append([seg['start']]); dur.append([move])
+            to.append([[np.nan, np.nan, z]]); yaw.append([np.nan])
+            continue
+        rows = sp[seg['row0']:seg['row0'] + seg['nrows']]
+        if not len(rows):
+            continue
+        n = len(rows)
+        seg_idx.append(np.full(n, i)); t_send.append(seg['start'] + rows[:, T])
+        dur.append(row_durations(rows, seg['step'], seg['move'])); to.append(rows[:, X:YAW]); yaw.append(rows[:, YAW])
+    seg_idx = np.concatenate(seg_idx).astype(np.int64)
+    t_send = np.concatenate(t_send).astype(np.float64)
+    dur = np.concatenate(dur).astype(np.float64)
+    to = np.concatenate(to).astype(np.float64)
+    yaw = np.concatenate(yaw).astype(np.float64)
+
+    # Takeoff/land keep x, y: carry the last known horizontal position forward
+    to[0, :2] = np.where(np.isnan(to[0, :2]), start_xy, to[0, :2])
+    to = _ffill(to)
+    frm = np.vstack(([start_xy[0], start_xy[1], 0.0], to[:-1]))
+    # NaN yaw leaves yaw alone; change is measured against the last commanded yaw
+    yaw_f = _ffill(yaw[:, None])[:, 0]
+    prev = np.concatenate(([np.nan], yaw_f[:-1]))
+    dyaw = np.where(np.isnan(yaw) | np.isnan(prev), 0.0, (yaw_f - prev + 180.0) % 360.0 - 180.0)
+    # Chained: the next command is sent before this move ends (same segment)
+    nxt = np.concatenate((t_send[1:], [np.inf]))
+    chained = (nxt < t_send + dur + CHAIN_EPS) & (np.concatenate((seg_idx[1:], [-1])) == seg_idx)
+    return seg_idx, t_send, dur, frm, to, dyaw, chained
+
+def _ffill(a):
+    """Forward-fill NaNs down the columns of a 2-D array."""
+    out = a.copy()
+    for c in range(out.shape[1]):
+        col = out[:, c]
+        idx = np.where(np.isnan(col), 0, np.arange(len(col)))
+        np.maximum.accumulate(idx, out=idx)
+        out[:, c] = col[idx]
+    return out
+
+def move_profile(dur, frm, to, dyaw, chained):
+    """Per-move peak speed (m/s), acceleration (m/s^2) and yaw rate (deg/s)."""
+    T_ = np.maximum(dur, 1e-3)
+    d = to - frm
+    dist = np.linalg.norm(d, axis=1)
+    v_vec = d / T_[:, None]
+    # Chained rows flow into their neighbours; isolated rows start and end at rest
+    in_chain = chained | np.concatenate(([False], chained[:-1]))
+    v_prev = np.vstack((np.zeros(3), v_vec[:-1]))
+    v_prev[~np.concatenate(([False], chained[:-1]))] = 0.0
+    v_next = np.vstack((v_vec[1:], np.zeros(3)))
+    v_next[~chained] = 0.0
+    a_chain = np.maximum(np.linalg.norm(v_vec - v_prev, axis=1),
+                         np.linalg.norm(v_vec - v_next, axis=1)) / T_
+    speed = np.where(in_chain, dist / T_, K_V * dist / T_)
+    accel = np.where(in_chain, a_chain, K_A * dist / T_**2)
+    yaw_rate = np.abs(dyaw) / T_ * np.where(in_chain, 1.0, K_V)
+    return speed, accel, yaw_rate
+
+def keep_out_distance(frm, to):
+    """Closest horizontal approach of each straight move to the performer at (0, 0)."""
+    a, b = frm[:, :2], to[:, :2]
+    ab = b - a
+    L2 = np.einsum('ij,ij->i', ab, ab)
+    s = np.clip(np.where(L2 > 0, -np.einsum('ij,ij->i', a, ab) / np.where(L2 > 0, L2, 1.0), 0.0), 0.0, 1.0)
+    return np.linalg.norm(a + s[:, None] * ab, axis=1)
+
+class SafetyReport:
+    def __init__(self, show, limits, violations, stats, elapsed_s):
+        self.show = show
+        self.limits = limits
+        self.violations = violations    # (segment, t_show, check, value, limit), one per move
+        self.stats = stats              # worst values over the show
+        self.elapsed_s = elapsed_s
+
+    @property
+    def ok(self):
+        return not self.violations
+
+    def report(self):
+        s = self.stats
+        lines = [f"[SAFETY] {self.show.name}: {s['moves']} moves checked in {1e3 * self.elapsed_s:.1f} ms | "
+                 f"peak v {s['speed']:.2f} m/s, a {s['accel']:.2f} m/s^2, yaw {s['yaw_rate']:.0f} deg/s, "
+                 f"closest to performer {s['keep_out']:.2f} m, z {s['z_lo']:.2f}-{s['z_hi']:.2f} m"]
+        if self.ok:
+            lines.append("[SAFETY] OK - no violations.")
+            return "\n".join(lines)
+        # One line per (segment, check): first occurrence, count and worst value
+        groups = {}
+        for seg, t, check, value, limit in self.violations:
+            g = groups.setdefault((seg, check), [t, 0, value, limit])
+            g[1] += 1
+            if check in ('z min', 'keep-out'):
+                g[2] = min(g[2], value)
+            else:
+                g[2] = max(g[2], value, key=abs)
+        lines.append(f"[SAFETY] {len(self.violations)} violation(s) in {len(groups)} group(s):")
+        for (seg, check), (t, n, worst, limit) in sorted(groups.items(), key=lambda kv: kv[1][0]):
+            lines.append(f"  {t:7.2f}s  {self.show.labels[seg][:22]:<22} {check:<10} {worst:8.2f}"
+                         f"  (limit {limit}){f'  x{n}' if n > 1 else ''}")
+        return "\n".join(lines)
+
+def _limits(show, limits):
+    lim = dict(DEFAULT_LIMITS)
+    lim.update({k: show.params[k] for k in DEFAULT_LIMITS if k in show.params})
+    lim.update(limits or {})
+    return lim
+
+def planned_positions(show, times, start_xy=None):
+    """
+    Commanded (x, y, z) at each show time in `times`, (n, 3), each move
+    following the go_to polynomial from its start to its target. NaN before
+    the first move after takeoff and from the landing on.
+    """
+    seg_idx, t_send, dur, frm, to, _, _ = move_table(show, start_xy)
+    k = np.searchsorted(t_send, times, side='right') - 1
+    before = k < 0
+    k = np.maximum(k, 0)
+    u = np.clip((times - t_send[k]) / np.maximum(dur[k], 1e-3), 0.0, 1.0)
+    p = u**4 * (35 - 84 * u + 70 * u**2 - 20 * u**3)
+    pos = frm[k] + (to[k] - frm[k]) * p[:, None]
+    kinds = show.segments['kind'][seg_idx[k]]
+    pos[before | (kinds == TAKEOFF) | (kinds == LAND)] = np.nan
+    return pos
+
+class SeparationReport:
+    def __init__(self, limit, closest, violations, elapsed_s):
+        self.limit = limit
+        self.closest = closest          # (i, j) -> (distance, t) of the closest approach
+        self.violations = violations    # (i, j, first t, distance, t) for pairs under the limit
+        self.elapsed_s = elapsed_s
+
+    @property
+    def ok(self):
+        return not self.violations
+
+    def report(self):
+        if not self.closest:
+            return "[SAFETY] Separation: single drone, nothing to check."
+        (i, j), (d, t) = min(self.closest.items(), key=lambda kv: kv[1][0])
+        lines = [f"[SAFETY] Separation: {len(self.closest)} pair(s) checked in {1e3 * self.elapsed_s:.1f} ms | "
+                 f"closest drones {i}-{j}: {d:.2f} m at {t:.2f}s"]
+        if self.ok:
+            lines.append(f"[SAFETY] OK - every pair stays {self.limit} m apart.")
+            return "\n".join(lines)
+        lines.append(f"[SAFETY] {len(self.violations)} pair(s) closer than {self.limit} m:")
+        for i, j, t_first, d, t in self.violations:
+            lines.append(f"  drones {i}-{j}  from {t_first:7.2f}s, closest {d:.2f} m at {t:.2f}s")
+        return "\n".join(lines)
+
+def check_separation(shows, phases, limits=None, dt=SEPARATION_DT):
+    """
+    Check every pair of drones for MIN_SEPARATION. shows[i] is drone i's
+    (already transformed) CompiledShow, flown phases[i] seconds late; the
+    commanded positions are compared every `dt` seconds while both are
+    airborne. Returns a SeparationReport.
+    """
+    t0 = time.perf_counter()
+    limit = _limits(shows[0], limits)['MIN_SEPARATION']
+    t_end = max(s.duration + ph for s, ph in zip(shows, phases))
+    times = np.arange(min(phases), t_end + dt, dt)
+    pos = [planned_positions(s, times - ph) for s, ph in zip(shows, phases)]
+    closest, violations = {}, []
+    for i in range(len(shows)):
+        for j in range(i + 1, len(shows)):
+            d = np.linalg.norm(pos[i] - pos[j], axis=1)
+            both = np.flatnonzero(~np.isnan(d))
+            if not len(both):
+                continue
+            k = both[np.argmin(d[both])]
+            closest[(i, j)] = (float(d[k]), float(times[k]))
+            if d[k] < limit:
+                first = both[np.argmax(d[both] < limit)]
+                violations.append((i, j, float(times[first]), float(d[k]), float(times[k])))
+    return SeparationReport(limit, closest, violations, time.perf_counter() - t0)
+
+def check_show(show, limits=None, start_xy=None):
+    """Check a CompiledShow; returns a SafetyReport (report.ok, report.report())."""
+    t0 = time.perf_counter()
+    lim = _limits(show, limits)
+
+    seg_idx, t_send, dur, frm, to, dyaw, chained = move_table(show, start_xy)
+    speed, accel, yaw_rate = move_profile(dur, frm, to, dyaw, chained)
+    clearance = keep_out_distance(frm, to)
+    kinds = show.segments['kind'][seg_idx]
+    airborne = (kinds != TAKEOFF) & (kinds != LAND)
+
+    (x_lo, x_hi), (y_lo, y_hi) = lim['GEOFENCE_X'], lim['GEOFENCE_Y']
+    checks = [
+        ('x', to[:, 0], (to[:, 0] < x_lo) | (to[:, 0] > x_hi), lim['GEOFENCE_X']),
+        ('y', to[:, 1], (to[:, 1] < y_lo) | (to[:, 1] > y_hi), lim['GEOFENCE_Y']),
+        ('z min', to[:, 2], airborne & (to[:, 2] < lim['Z_MIN']), lim['Z_MIN']),
+        ('z max', to[:, 2], to[:, 2] > lim['Z_MAX'], lim['Z_MAX']),
+        ('keep-out', clearance, airborne & (clearance < lim['KEEP_OUT_R']), lim['KEEP_OUT_R']),
+        ('velocity', speed, speed > lim['V_MAX'], lim['V_MAX']),
+        ('accel', accel, accel > lim['A_MAX'], lim['A_MAX']),
+        ('yaw rate', yaw_rate, yaw_rate > lim['YAW_RATE_MAX'], lim['YAW_RATE_MAX']),
+    ]
+    violations = []
+    for name, value, bad, limit in checks:
+        for k in np.flatnonzero(bad):
+            violations.append((int(seg_idx[k]), float(t_send[k]), name, float(value[k]), limit))
+    violations.sort(key=lambda v: v[1])
+    z_air = to[airborne, 2] if airborne.any() else to[:, 2]
+    stats = {'moves': len(t_send), 'speed': float(speed.max()), 'accel': float(accel.max()),
+             'yaw_rate': float(yaw_rate.max()),
+             'keep_out': float(clearance[airborne].min()) if airborne.any() else float('inf'),
+             'z_lo': float(z_air.min()), 'z_hi': float(z_air.max())}
+    return SafetyReport(show, lim, violations, stats, time.perf_counter() - t0)
+
+def main():
+    ap = argparse.ArgumentParser(description="Check a show against geofence, keep-out, height and dynamics limits.")
+    ap.add_argument('show', help="show JSON file")
+    ap.add_argument('--venue', help="venue overlay JSON file")
+    ap.add_argument('--start', nargs=2, type=float, metavar=('X', 'Y'),
+                    help="takeoff position (default: under the first waypoint)")
+    args = ap.parse_args()
+    try:
+        compiled = load_show(args.show, args.venue)
+    except ShowError as e:
+        print(f"[SHOW] Invalid show: {e}")
+        sys.exit(1)
+    result = check_show(compiled, start_xy=args.start)
+    print(result.report())
+    sys.exit(0 if result.ok else 1)
+
+if __name__ == "__main__":
+    main()
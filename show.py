@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+# show.py
+"""
+Declarative show files compiled once into an executable timeline.
+
+A show file (JSON) names venue parameters, stage points and a list of steps:
+
+    {"name": ..., "venue": {"H_STD": 1.3, ..., "points": {"CENTER": [0, "$CENTER_FRONT_Y"]}},
+     "steps": [{"do": "goto", "at": "0:05", "label": "Retreat",
+                "to": "RETREAT", "z": "$H_STD", "duration": 5.0}, ...]}
+
+"$NAME" / "-$NAME" refer to venue parameters. A venue overlay is a JSON
+object merged over "venue" (points are merged by name), so a different stage
+is just a small parameter file.
+
+compile_show() validates the file and precomputes every setpoint into
+NumPy arrays, cached under show_cache/ by a hash of the show, the overlay
+and COMPILER_VERSION. ShowExecutor flies a compiled show.
+
+Orbit waypoint density: with a chord tolerance (venue CHORD_TOL in metres,
+or 'chord_tol' on the step) circle and diagonal_orbit rows are spaced as
+coarsely as the tolerance allows instead of by 'segments' / one per pass;
+the segment keeps its show-time slot.
+
+    python3 show.py shows/incomplete.json --venue shows/venues/small.json
+"""
+import os, sys, json, math, hashlib, argparse, time, functools
+import numpy as np
+
+from cfutils import face_center_yaw_deg
+from waypoints import (circle_waypoints, diagonal_orbit_waypoints, waypoint_steps, row_durations,
+                       auto_circle_segments, auto_pass_subdivisions, T, X, Z, YAW)
+from safe_sleep import run_steps
+from timeline import segment_plan, start_show, end_show, get_show, annotate_next
+from takeoff import takeoff_steps
+from land import land_steps
+from circle import circle_steps, circle_trajectory
+from diagonal_orbit import diagonal_orbit_steps, diagonal_trajectory
+from goto import SLACK
+from trajectory import compile_waypoint_spline, write_packets, MAX_SPLINE_PIECES, PIECE_BYTES
+
+COMPILER_VERSION = 3
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'show_cache')
+
+KINDS = ('takeoff', 'hover', 'goto', 'circle', 'diagonal_orbit', 'land')
+TAKEOFF, HOVER, GOTO, CIRCLE, DIAGONAL, LAND = range(len(KINDS))
+
+# do -> (required keys, optional keys with defaults)
+STEP_SPECS = {
+    'takeoff':        (('height',), {'ascent_vel': 0.6}),
+    'hover':          (('duration',), {}),
+    'goto':           (('to', 'z', 'duration'), {'face': True}),
+    'circle':         (('total_time',), {'cx': 0.0, 'cy': 0.0, 'z': 1.5, 'radius': 1.2,
+                                         'segments': 72, 'start_angle_deg': 0.0,
+                                         'chord_tol': None}),
+    'diagonal_orbit': (('total_time',), {'cx': 0.0, 'cy': 0.0, 'z_low': 1.2, 'z_high': 2.0,
+                                         'radius': 1.2, 'passes': 10,
+                                         'chord_tol': None}),
+    'land':           ((), {'from_height': None, 'descent_vel': 0.125}),
+}
+COMMON_KEYS = ('do', 'at', 'label')
+
+SEGMENT_DTYPE = np.dtype([
+    ('kind', 'i1'),
+    ('start', 'f8'),       # planned show time (s); takeoff is before 0
+    ('slot', 'f8'),        # show time the segment occupies (s)
+    ('step', 'f8'),        # per-waypoint slot for waypoint segments (s)
+    ('move', 'f8'),        # go_to duration per waypoint (s)
+    ('param', 'f8'),       # takeoff ascent_vel / land descent_vel
+    ('row0', 'i4'),
+    ('nrows', 'i4'),
+    ('annotated', 'f8'),   # music timestamp from "at" (s), NaN if none
+    ('z_end', 'f8'),       # height at the end of the segment
+])
+
+class ShowError(ValueError):
+    pass
+
+# ---------- loading / parameters ----------
+def _load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def merge_venue(venue, overlay):
+    merged = dict(venue)
+    for k, v in (overlay or {}).items():
+        if k == 'points':
+            merged['points'] = {**venue.get('points', {}), **v}
+        else:
+            merged[k] = v
+    return merged
+
+def _resolve(v, params, where):
+    if isinstance(v, list):
+        return [_resolve(x, params, where) for x in v]
+    if isinstance(v, str) and v.lstrip('-').startswith('$'):
+        name = v.lstrip('-')[1:]
+        if name not in params:
+            raise ShowError(f"{where}: unknown venue parameter '{name}'")
+        val = params[name]
+        return -val if v.startswith('-') else val
+    return v
+
+def parse_timestamp(at):
+    """'1:26' / '0:05.5' / 86 -> seconds."""
+    if at is None:
+        return float('nan')
+    if isinstance(at, (int, float)):
+        return float(at)
+    m, _, s = str(at).rpartition(':')
+    return float(m or 0) * 60.0 + float(s)
+
+def _number(step, key, where, positive=False, nonneg=False):
+    v = step[key]
+    if isinstance(v, bool) or not isinstance(v, (int, float)) or v != v:
+        raise ShowError(f"{where}: '{key}' must be a number, got {v!r}")
+    if positive and v <= 0:
+        raise ShowError(f"{where}: '{key}' must be > 0, got {v!r}")
+    if nonneg and v < 0:
+        raise ShowError(f"{where}: '{key}' must be >= 0, got {v!r}")
+    return float(v)
+
+def _count(step, key, where):
+    v = step[key]
+    if isinstance(v, bool) or not isinstance(v, (int, float)) or v != int(v):
+        raise ShowError(f"{where}: '{key}' must be a whole number, got {v!r}")
+    if v < 1:
+        raise ShowError(f"{where}: '{key}' must be >= 1, got {v!r}")
+    return int(v)
+
+def _option(step, key, where, options):
+    v = step[key]
+    if not any(type(v) is type(o) and v == o for o in options):   # 1 is not True here
+        raise ShowError(f"{where}: '{key}' must be one of "
+                        f"{', '.join(json.dumps(o) for o in options)}, got {v!r}")
+    return v
+
+# ---------- compiled form ----------
+class CompiledShow:
+    def __init__(self, name, key, params, steps, segments, setpoints, labels, density=None):
+        self.name = name
+        self.key = key
+        self.params = params          # resolved venue
+        self.steps = steps            # resolved step dicts
+        self.segments = segments      # SEGMENT_DTYPE array
+        self.setpoints = setpoints    # (n, 5) t, x, y, z, yaw_deg
+        self.labels = labels
+        self.density = density or {}  # segment index -> go_to rows with the fixed count
+
+    @property
+    def duration(self):
+        s = self.segments[self.segments['kind'] != TAKEOFF]
+        return float((s['start'] + s['slot']).max()) if len(s) else 0.0
+
+    def save(self, path):
+        meta = json.dumps({'name': self.name, 'key': self.key, 'params': self.params,
+                           'steps': self.steps, 'labels': self.labels,
+                           'density': self.density})
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, segments=self.segments, setpoints=self.setpoints,
+                     meta=np.array(meta))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            meta = json.loads(str(z['meta']))
+            return cls(meta['name'], meta['key'], meta['params'], meta['steps'],
+                       z['segments'], z['setpoints'], meta['labels'],
+                       {int(k): v for k, v in meta.get('density', {}).items()})
+
+    def summary(self):
+        lines = [f"[SHOW] {self.name}: {len(self.segments)} segments, "
+                 f"{len(self.setpoints)} setpoints, {self.duration:.2f}s of show time"]
+        for seg, label in zip(self.segments, self.labels):
+            at = '' if np.isnan(seg['annotated']) else f"{int(seg['annotated'] // 60)}:{seg['annotated'] % 60:04.1f}"
+            lines.append(f"  {seg['start']:7.2f}s  {seg['slot']:6.2f}s  {KINDS[seg['kind']]:15s}"
+                         f" {seg['nrows']:3d} pts  {at:>6s}  {label}")
+        if self.density:
+            lines.append(self.density_report())
+        return "\n".join(lines)
+
+    def density_report(self):
+        """go_to packets of the chord-tolerance orbits vs their fixed waypoint counts."""
+        fixed = sum(self.density.values())
+        auto = int(sum(self.segments[i]['nrows'] for i in self.density))
+        return (f"[SHOW] Orbit density: {auto} go_to rows in {len(self.density)} orbit segments "
+                f"instead of {fixed} ({fixed - auto:+d} packets saved)")
+
+def compile_show(show, overlay=None):
+    """Validate a show dict (+ optional venue overlay dict) and precompute its timeline."""
+    if not isinstance(show.get('steps'), list) or not show['steps']:
+        raise ShowError("show has no 'steps' list")
+    params = merge_venue(show.get('venue', {}), overlay)
+    points = {name: _resolve(xy, params, f"point {name}")
+              for name, xy in params.get('points', {}).items()}
+    face_center = bool(params.get('FACE_CENTER', True))
+    yaw_off = float(params.get('YAW_OFF_DEG', 0.0))
+
+    segs, rows, labels, steps = [], [], [], []
+    density = {}
+    t = 0.0
+    z_now = 0.0
+    n_rows = 0
+    for i, raw in enumerate(show['steps']):
+        where = f"step {i} ({raw.get('do', '?')})"
+        kind = raw.get('do')
+        if kind not in STEP_SPECS:
+            raise ShowError(f"{where}: unknown primitive; expected one of {', '.join(KINDS)}")
+        required, optional = STEP_SPECS[kind]
+        unknown = set(raw) - set(required) - set(optional) - set(COMMON_KEYS)
+        if unknown:
+            raise ShowError(f"{where}: unknown keys {sorted(unknown)}")
+        missing = [k for k in required if k not in raw]
+        if missing:
+            raise ShowError(f"{where}: missing {missing}")
+        step = {**optional, **{k: _resolve(v, params, where) for k, v in raw.items()}}
+        if step.get('chord_tol', 0) is None:
+            step['chord_tol'] = params.get('CHORD_TOL')
+        steps.append(step)
+        labels.append(step.get('label') or kind)
+        annotated = parse_timestamp(step.get('at'))
+
+        wp = np.empty((0, 5))
+        slot = step_s = move = param = 0.0
+        start = t
+        if kind == 'takeoff':
+            z_now = _number(step, 'height', where, positive=True)
+            param = _number(step, 'ascent_vel', where, positive=True)
+            move = max(1.0, z_now / max(0.1, param))
+            start = -move   # before show time 0
+        elif kind == 'hover':
+            slot = _number(step, 'duration', where, nonneg=True)
+        elif kind == 'goto':
+            xy = points.get(step['to']) if isinstance(step['to'], str) else step['to']
+            if xy is None:
+                raise ShowError(f"{where}: unknown point '{step['to']}'")
+            if (not isinstance(xy, (list, tuple)) or len(xy) != 2
+                    or any(isinstance(v, bool) or not isinstance(v, (int, float)) for v in xy)):
+                raise ShowError(f"{where}: 'to' must be a point name or [x, y], got {step['to']!r}")
+            x, y = float(xy[0]), float(xy[1])
+            z_now = _number(step, 'z', where, positive=True)
+            move = _number(step, 'duration', where, nonneg=True)
+            slot = step_s = move + SLACK
+            face = _option(step, 'face', where, (True, False))
+            yaw = face_center_yaw_deg(x, y, 0.0, 0.0, yaw_off) if face else np.nan
+            wp = np.array([[0.0, x, y, z_now, yaw]])
+        elif kind == 'circle':
+            segments = _count(step, 'segments', where)
+            total = _number(step, 'total_time', where, positive=True)
+            cx, cy = _number(step, 'cx', where), _number(step, 'cy', where)
+            radius = _number(step, 'radius', where, positive=True)
+            z_now = _number(step, 'z', where, positive=True)
+            start_angle = _number(step, 'start_angle_deg', where)
+            step_s = move = max(0.02, total / segments)
+            slot = (segments + 1) * step_s
+            approach = step_s
+            if step['chord_tol'] is not None:
+                tol = _number(step, 'chord_tol', where, positive=True)
+                density[i] = segments + 1
+                segments = auto_circle_segments(radius, total, tol)
+                step_s = move = total / segments
+            wp = circle_waypoints(cx=cx, cy=cy, z=z_now, radius=radius,
+                                  segments=segments, dt=step_s, face_center=face_center,
+                                  world_yaw_offset_deg=yaw_off,
+                                  start_angle_deg=start_angle, approach_s=approach)
+        elif kind == 'diagonal_orbit':
+            passes = _count(step, 'passes', where)
+            total = _number(step, 'total_time', where, positive=True)
+            cx, cy = _number(step, 'cx', where), _number(step, 'cy', where)
+            radius = _number(step, 'radius', where, positive=True)
+            z_low = _number(step, 'z_low', where, positive=True)
+            z_high = _number(step, 'z_high', where, positive=True)
+            step_s = max(0.02, total / passes)
+            move = step_s * 0.95
+            slot = passes * step_s
+            subdiv = 1
+            if step['chord_tol'] is not None:
+                tol = _number(step, 'chord_tol', where, positive=True)
+                density[i] = passes
+                subdiv = auto_pass_subdivisions(radius, passes, total, tol)
+            wp = diagonal_orbit_waypoints(cx=cx, cy=cy, z_low=z_low, z_high=z_high, radius=radius,
+                                          passes=passes, dt=step_s, face_center=face_center,
+                                          world_yaw_offset_deg=yaw_off, subdiv=subdiv)
+            step_s /= subdiv
+            z_now = float(wp[-1, Z])
+        elif kind == 'land':
+            from_h = (_number(step, 'from_height', where, positive=True)
+                      if step['from_height'] is not None else z_now)
+            step['from_height'] = from_h
+            param = _number(step, 'descent_vel', where, positive=True)
+            slot = max(2.0, from_h / max(0.1, param)) + 0.3
+            z_now = 0.0
+
+        if slot < 0:
+            raise ShowError(f"{where}: negative duration")
+        segs.append((KINDS.index(kind), start, slot, step_s, move, param,
+                     n_rows, len(wp), annotated, z_now))
+        rows.append(wp)
+        n_rows += len(wp)
+        if kind != 'takeoff':
+            t += slot
+
+    setpoints = np.ascontiguousarray(np.concatenate(rows), dtype=np.float64)
+    return CompiledShow(show.get('name', 'show'), None, params, steps,
+                        np.array(segs, dtype=SEGMENT_DTYPE), setpoints, labels, density)
+
+def show_key(show, overlay=None):
+    blob = json.dumps({'show': show, 'overlay': overlay, 'v': COMPILER_VERSION},
+                      sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()[:20]
+
+def load_show(path, venue=None, cache_dir=CACHE_DIR):
+    """
+    Compiled show for a show file (+ optional venue overlay file), from the
+    binary cache when the content hash matches, else compiled and cached.
+    """
+    show = _load_json(path)
+    overlay = _load_json(venue) if venue else None
+    key = show_key(show, overlay)
+    cached = os.path.join(cache_dir, key + '.npz')
+    if os.path.exists(cached):
+        try:
+            return CompiledShow.load(cached)
+        except Exception as e:
+            print(f"[SHOW] Ignoring unreadable cache {cached}: {e}")
+    compiled = compile_show(show, overlay)
+    compiled.key = key
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        compiled.save(cached)
+    except OSError as e:
+        print(f"[SHOW] Could not write cache {cached}: {e}")
+    return compiled
+
+# ---------- spline blending ----------
+class SplineBlender:
+    """
+    Flies circle/diagonal_orbit segments as one uploaded spline each
+    (trajectory.compile_waypoint_spline) instead of a go_to per row.
+
+    Tracks where the last command leaves the drone, so each spline starts
+    from the commanded state at its start time (mid-flight if the previous
+    spline is still running). When the next segment also starts with a
+    waypoint, the spline runs on to it instead of stopping.
+
+    Splines go into a double buffer: two fixed (id, offset) halves of
+    trajectory memory reserved from the runner. Each upload goes into the
+    half that isn't flying, so the running spline is never overwritten; a
+    spline already held by either half is started again without uploading.
+
+    Blending costs radio traffic: a spline of up to MAX_SPLINE_PIECES
+    pieces takes about 5.5 memory-write packets per piece, more than the
+    go_to rows it replaces. report() gives the net packet count.
+    """
+    KINDS = (CIRCLE, DIAGONAL)
+
+    def __init__(self, show, runner):
+        self.show = show
+        self.runner = runner
+        self.buffers = [runner.reserve(MAX_SPLINE_PIECES * PIECE_BYTES) for _ in range(2)]
+        self._held = [None, None]   # spline key in each half
+        self._active = None         # half of the spline started last
+        self._loaded = None         # half returned by the last load()
+        self.target = None      # (x, y, z, yaw_deg) the last command ends at; None = unknown
+        self._traj = None       # (Trajectory, t0) of the last spline started
+        self.blended = 0
+        self.rows_replaced = 0
+        self.uploads = 0
+        self.reused = 0
+        self.upload_bytes = 0
+        self.upload_packets = 0
+
+    def ready(self):
+        """True once the start state is known (after the first absolute go_to)."""
+        return self._traj is not None or (self.target is not None and self.target[0] is not None)
+
+    def seen(self, i):
+        """Segment i was flown without blending: note where it leaves the drone."""
+        seg = self.show.segments[i]
+        kind = int(seg['kind'])
+        rows = self.show.setpoints[seg['row0']:seg['row0'] + seg['nrows']]
+        yaw = self.target[3] if self.target is not None else math.nan
+        if len(rows):
+            x, y, z, row_yaw = rows[-1, X:YAW + 1]
+            self.target = (x, y, z, yaw if row_yaw != row_yaw else row_yaw)
+        elif kind == TAKEOFF or kind == LAND:
+            x, y = self.target[:2] if self.target is not None else (None, None)
+            self.target = (x, y, float(seg['z_end']), yaw)
+        else:
+            return   # hover: the previous command keeps running
+        self._traj = None
+
+    def _start_state(self, t_start, first_row):
+        if self._traj is not None:
+            traj, t0 = self._traj
+            x, y, z, (yaw, *yaw_d) = traj.state(t_start - t0)
+            # Orbits wind yaw up by 2 pi per turn; the firmware wraps yaw errors anyway
+            return x, y, z, ((yaw + math.pi) % (2.0 * math.pi) - math.pi, *yaw_d)
+        x, y, z, yaw = self.target
+        if yaw != yaw:
+            yaw = first_row[YAW] if first_row[YAW] == first_row[YAW] else 0.0
+        return tuple((v, 0.0, 0.0, 0.0) for v in (x, y, z, math.radians(yaw)))
+
+    def _next_knot(self, i):
+        segs = self.show.segments
+        if i + 1 >= len(segs):
+            return None
+        nxt = segs[i + 1]
+        if int(nxt['kind']) not in (GOTO, CIRCLE, DIAGONAL) or not nxt['nrows']:
+            return None
+        rows = self.show.setpoints[nxt['row0']:nxt['row0'] + nxt['nrows']]
+        last = self.show.setpoints[segs[i]['row0'] + segs[i]['nrows'] - 1]
+        # Next orbit starts where this one ends: aim for its second waypoint instead
+        k = 1 if len(rows) > 1 and np.allclose(rows[0, X:Z + 1], last[X:Z + 1], atol=1e-3) else 0
+        arrive = rows[k, T] + row_durations(rows, nxt['step'], nxt['move'])[k]
+        return (float(segs[i]['slot'] + arrive),) + tuple(rows[k, X:YAW + 1])
+
+    def compile(self, i, t_start):
+        """(key, Trajectory) for segment i starting at absolute time t_start."""
+        seg = self.show.segments[i]
+        rows = self.show.setpoints[seg['row0']:seg['row0'] + seg['nrows']]
+        start, nxt = self._start_state(t_start, rows[0]), self._next_knot(i)
+        # Keyed by content, so repeated orbits entered the same way reuse the upload
+        key = ('blend', np.round(rows, 4).tobytes(), round(float(seg['move']), 4),
+               (np.round(start, 3) + 0.0).tobytes(), None if nxt is None else np.round(nxt, 4).tobytes())
+        return key, compile_waypoint_spline(rows, row_durations(rows, seg['step'], seg['move']),
+                                            start, nxt)
+
+    def load(self, key, traj):
+        """Trajectory id of `traj`, uploaded into the idle half unless a half holds it already."""
+        if key in self._held:
+            half = self._held.index(key)   # restarting the running one leaves its memory alone
+            self.reused += 1
+        else:
+            half = 1 - self._active if self._active is not None else 0
+            self._held[half] = None        # being overwritten
+            self.runner.upload(*self.buffers[half], traj)
+            self._held[half] = key
+            self.uploads += 1
+            self.upload_bytes += traj.n_bytes()
+            self.upload_packets += write_packets(traj.n_bytes())
+        self._loaded = half
+        return self.buffers[half][0]
+
+    def started(self, i, traj, t_start):
+        self._active = self._loaded
+        self._traj = (traj, t_start)
+        x, y, z, yaw = traj.evaluate(traj.duration)
+        self.target = (x, y, z, math.degrees(yaw))
+        self.blended += 1
+        self.rows_replaced += int(self.show.segments[i]['nrows'])
+
+    def report(self):
+        # Each upload is its memory writes plus a define_trajectory command
+        sent = self.blended + self.uploads + self.upload_packets
+        return (f"[BLEND] {self.blended} segments flown as splines ({self.reused} without uploading): "
+                f"{self.rows_replaced} go_to rows replaced by {self.blended} start commands and "
+                f"{self.uploads} uploads ({self.upload_bytes} bytes, {self.upload_packets} memory-write "
+                f"packets + {self.uploads} define commands); {sent - self.rows_replaced:+d} radio packets "
+                f"vs go_tos")
+
+# ---------- execution ----------
+def orbit_args(show, i):
+    """Keyword arguments of circle()/diagonal_orbit() for circle/diagonal segment i."""
+    step = show.steps[i]
+    common = dict(face_center=bool(show.params.get('FACE_CENTER', True)),
+                  world_yaw_offset_deg=float(show.params.get('YAW_OFF_DEG', 0.0)))
+    if int(show.segments[i]['kind']) == CIRCLE:
+        return dict(cx=step['cx'], cy=step['cy'], z=step['z'], radius=step['radius'],
+                    total_time=step['total_time'], segments=int(step['segments']),
+                    start_angle_deg=step['start_angle_deg'], **common)
+    return dict(cx=step['cx'], cy=step['cy'], z_low=step['z_low'], z_high=step['z_high'],
+                radius=step['radius'], passes=int(step['passes']), total_time=step['total_time'],
+                **common)
+
+def upload_orbits(show, runner):
+    """
+    Upload the trajectory of every circle/diagonal_orbit segment, in show
+    order, while trajectory memory has room. Called before takeoff, so no
+    upload competes with the show for the radio or delays an orbit.
+    Returns the indices of the segments to fly from their uploaded
+    trajectory; the rest (didn't fit) are flown as go_to rows.
+    """
+    ready, skipped, n_bytes = set(), [], 0
+    for i, seg in enumerate(show.segments):
+        kind = int(seg['kind'])
+        if kind == CIRCLE:
+            key, build = circle_trajectory(**orbit_args(show, i))
+        elif kind == DIAGONAL and int(show.steps[i]['passes']) > 1:
+            key, build = diagonal_trajectory(**orbit_args(show, i))
+        else:
+            continue
+        if not runner.resident(key):
+            traj = build()
+            if not runner.fits(traj.n_bytes()):
+                skipped.append(show.labels[i])
+                continue
+            runner.prepare(key, traj)
+            n_bytes += traj.n_bytes()
+        ready.add(i)
+    print(f"[TRAJ] {len(ready)} orbit segments ready: {n_bytes} bytes uploaded before takeoff"
+          + (f"; no room for {', '.join(skipped)} (flown as go_tos)" if skipped else ""))
+    return ready
+
+class ShowExecutor:
+    """
+    Flies a CompiledShow segment by segment. The show clock starts after
+    takeoff (music 0:00) and stops before landing. current_height tracks the
+    last commanded height for emergency landing.
+    """
+
+    def __init__(self, hl, show, runner=None, arrival=None, blend=False):
+        self.hl = hl
+        self.show = show
+        self.runner = runner
+        self.arrival = arrival    # optional arrival.ArrivalDetector for goto steps and landing
+        self.blender = SplineBlender(show, runner) if blend and runner is not None else None
+        self.current_height = 0.0
+        self.timeline = None      # timeline.ShowTimeline of the flown show (kept after it ends)
+        self.uploaded = set()     # orbit segments flown from a trajectory uploaded by run()
+
+    def run(self):
+        run_steps(self.steps())
+
+    def steps(self):
+        """
+        The whole show as one step generator (safe_sleep.run_steps());
+        aio_show.AsyncShowExecutor flies the same steps on an event loop.
+        """
+        hl, show = self.hl, self.show
+        if self.runner is not None and self.blender is None:
+            # With blending, trajectory memory is the blender's double buffer
+            self.uploaded = yield functools.partial(upload_orbits, show, self.runner)
+        for i, seg in enumerate(show.segments):
+            kind = int(seg['kind'])
+            label = show.labels[i]
+            step = show.steps[i]
+            rows = show.setpoints[seg['row0']:seg['row0'] + seg['nrows']]
+
+            if kind != TAKEOFF and kind != LAND:
+                if get_show() is None:
+                    self.timeline = start_show()
+                annotate_next(label, float(seg['annotated']))
+
+            blended = False
+            if kind == TAKEOFF:
+                yield from takeoff_steps(hl, height_m=step['height'], ascent_vel=step['ascent_vel'])
+            elif kind == HOVER:
+                yield segment_plan(seg['slot'], label) + seg['slot'], None
+            elif kind in SplineBlender.KINDS and self.blender is not None and self.blender.ready():
+                t_start = segment_plan(seg['slot'], label)
+                key, traj = self.blender.compile(i, t_start)
+                trajectory_id = yield functools.partial(self.blender.load, key, traj)
+                yield t_start, None
+                self.runner.start(trajectory_id)
+                self.blender.started(i, traj, t_start)
+                yield t_start + seg['slot'], None
+                blended = True
+            elif kind == GOTO:
+                t_start = segment_plan(seg['slot'], label)
+                yield from waypoint_steps(hl, rows, t_start, seg['step'], seg['move'],
+                                          self.arrival, label)
+            elif kind == CIRCLE and i in self.uploaded:
+                yield from circle_steps(hl, **orbit_args(show, i), runner=self.runner)
+            elif kind == DIAGONAL and i in self.uploaded:
+                yield from diagonal_orbit_steps(hl, **orbit_args(show, i), runner=self.runner)
+            elif kind in (CIRCLE, DIAGONAL):
+                t_start = segment_plan(seg['slot'], label)
+                yield from waypoint_steps(hl, rows, t_start, seg['step'], seg['move'])
+            elif kind == LAND:
+                timeline = end_show()
+                if timeline:
+                    print(timeline.report())
+                yield from land_steps(hl, from_height_m=step['from_height'],
+                                      descent_vel=step['descent_vel'], arrival=self.arrival)
+
+            if self.blender is not None and not blended:
+                self.blender.seen(i)
+            self.current_height = float(seg['z_end'])
+
+def main():
+    ap = argparse.ArgumentParser(description="Compile (and cache) a show file and print its timeline.")
+    ap.add_argument('show', help="show JSON file")
+    ap.add_argument('--venue', help="venue overlay JSON file")
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    try:
+        compiled = load_show(args.show, args.venue)
+    except ShowError as e:
+        print(f"[SHOW] Invalid show: {e}")
+        sys.exit(1)
+    print(compiled.summary())
+    print(f"[SHOW] Loaded in {1e3 * (time.perf_counter() - t0):.1f} ms (key {compiled.key})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# show_clock.py
+import time
+
+# Single monotonic clock behind every wait in the choreography. The
+# simulator swaps in a VirtualClock so whole shows run faster than real time.
+_now = time.monotonic
+_sleep = time.sleep
+_virtual = None
+
+def now():
+    """Current clock reading in seconds (monotonic)."""
+    return _now()
+
+def sleep(duration):
+    """Sleep on the show clock."""
+    if duration > 0:
+        _sleep(duration)
+
+def is_virtual():
+    return _virtual is not None
+
+class VirtualClock:
+    """
+    Simulated time: sleep() advances the clock instantly in steps of at most
+    `tick` seconds and calls every listener with the new time after each step.
+    """
+
+    def __init__(self, start=0.0, tick=0.01):
+        self.t = start
+        self.tick = tick
+        self.listeners = []
+
+    def now(self):
+        return self.t
+
+    def sleep(self, duration):
+        end = self.t + duration
+        while self.t < end:
+            self.t = min(end, self.t + self.tick)
+            for fn in self.listeners:
+                fn(self.t)
+
+def use_virtual_clock(clock=None):
+    """Route now()/sleep() through a VirtualClock (created if not given); returns it."""
+    global _now, _sleep, _virtual
+    _virtual = clock or VirtualClock()
+    _now, _sleep = _virtual.now, _virtual.sleep
+    return _virtual
+
+def use_real_clock():
+    global _now, _sleep, _virtual
+    _now, _sleep, _virtual = time.monotonic, time.sleep, None
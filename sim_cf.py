@@ -0,0 +1,199 @@
+# sim_cf.py
+"""
+Simulated Crazyflie for running whole routines without a drone.
+
+The high-level commander turns each command into a smooth reference (the
+same 7th-order rest-to-rest profile the firmware planner uses for go_to, or
+the uploaded polynomial trajectory) and the drone follows that reference
+with first-order dynamics. Time comes from a show_clock.VirtualClock, so
+every safe_sleep/goto/circle/... wait advances simulated time instantly.
+
+    clock = show_clock.use_virtual_clock()
+    sim = SimCrazyflie(clock)
+    main.main(connect=lambda: SimSyncCrazyflie(sim))
+    trace = sim.trace()
+"""
+import math, struct
+import numpy as np
+
+from mock_cf import MockCrazyflie, MockHighLevelCommander, MockParam
+from trajectory import Trajectory
+
+TAU = 0.15           # position/yaw time constant of the simulated drone (s)
+TRACE_PERIOD = 0.02  # trace sample period (s)
+EST_VAR0 = 1.0       # Kalman position variance right after a reset (m^2)
+EST_TAU = 0.1        # its decay time constant (s)
+EST_VAR_FLOOR = 1e-5
+
+def _smoothstep7(u):
+    u = min(max(u, 0.0), 1.0)
+    return u ** 4 * (35.0 - 84.0 * u + 70.0 * u * u - 20.0 * u ** 3)
+
+def _wrap_deg(a):
+    return (a + 180.0) % 360.0 - 180.0
+
+class SimHighLevelCommander(MockHighLevelCommander):
+    """Records commands like the mock, and turns them into a reference path."""
+
+    def __init__(self, cf):
+        super().__init__(cf)
+        self._plan = None   # (t0, duration, start(4), end(4)) or ('traj', t0, offset, n_pieces, time_scale)
+
+    def _ref_now(self):
+        return self._cf.reference(self._cf.clock.now())
+
+    def _plan_to(self, x, y, z, yaw_deg, duration_s):
+        start = self._ref_now()
+        yaw_end = start[3] + _wrap_deg(yaw_deg - start[3]) if yaw_deg is not None else start[3]
+        self._plan = (self._cf.clock.now(), max(1e-3, duration_s), start, (x, y, z, yaw_end))
+
+    def takeoff(self, absolute_height_m, duration_s, group_mask=0, yaw=0.0):
+        super().takeoff(absolute_height_m, duration_s, group_mask, yaw)
+        p = self._ref_now()
+        self._plan_to(p[0], p[1], absolute_height_m, None, duration_s)
+
+    def land(self, absolute_height_m, duration_s, group_mask=0, yaw=0.0):
+        super().land(absolute_height_m, duration_s, group_mask, yaw)
+        p = self._ref_now()
+        self._plan_to(p[0], p[1], absolute_height_m, None, duration_s)
+
+    def stop(self, group_mask=0):
+        super().stop(group_mask)
+        p = self._cf.state
+        self._plan = (self._cf.clock.now(), 1e-3, tuple(p), tuple(p))
+
+    def go_to(self, x, y, z, yaw, duration_s, relative=False, group_mask=0, linear=False):
+        super().go_to(x, y, z, yaw, duration_s, relative, group_mask, linear)
+        yaw_deg = math.degrees(yaw)
+        if relative:
+            p = self._ref_now()
+            x, y, z, yaw_deg = p[0] + x, p[1] + y, p[2] + z, p[3] + yaw_deg
+        self._plan_to(x, y, z, yaw_deg, duration_s)
+
+    def start_trajectory(self, trajectory_id, time_scale=1.0, relative=False,
+                         reversed=False, group_mask=0):
+        super().start_trajectory(trajectory_id, time_scale, relative, reversed, group_mask)
+        offset, n_pieces = self.trajectories[trajectory_id]
+        self._plan = ('traj', self._cf.clock.now(), offset, n_pieces, time_scale)
+
+class SimParam(MockParam):
+    """Records param writes; a kalman.resetEstimation pulse restarts the simulated convergence."""
+
+    def __init__(self, cf):
+        super().__init__()
+        self._cf = cf
+
+    def set_value(self, complete_name, value):
+        super().set_value(complete_name, value)
+        if complete_name == 'kalman.resetEstimation' and str(value) == '1':
+            self._cf.t_reset = self._cf.clock.now()
+
+class SimLog:
+    """Delivers LogConfig callbacks at their period on the virtual clock."""
+
+    def __init__(self, cf):
+        self.cf = cf
+        self.configs = []   # [conf, next_due]
+
+    def add_config(self, conf):
+        conf.cf = self.cf   # cflib's LogConfig.start()/stop() are no-ops with link None
+        self.configs.append([conf, self.cf.clock.now()])
+
+    def step(self, t):
+        for entry in self.configs:
+            conf, due = entry
+            if t + 1e-9 < due:
+                continue
+            period = getattr(conf, 'period_in_ms', 100) / 1000.0
+            entry[1] = due + period
+            conf.unpack_log_data(self.payload(conf), int(t * 1000))
+
+    def payload(self, conf):
+        """The block's log packet payload, packed as the firmware would."""
+        from cflib.crazyflie.log import LogTocElement
+        out = b''
+        for v in conf.variables:
+            fmt = LogTocElement.get_unpack_string_from_id(v.fetch_as)
+            value = self.cf.log_value(v.name)
+            out += struct.pack(fmt, value if fmt[-1] in 'fe' else int(value))
+        return out
+
+class SimCrazyflie(MockCrazyflie):
+    def __init__(self, clock, start=(0.0, 1.0, 0.0, -90.0), tau=TAU):
+        super().__init__()
+        self.clock = clock
+        self.tau = tau
+        self.link = None
+        self.high_level_commander = SimHighLevelCommander(self)
+        self.log = SimLog(self)
+        self.param = SimParam(self)
+        self.t_reset = None
+        self.state = list(start)          # x, y, z, yaw_deg
+        self.velocity = [0.0, 0.0, 0.0]
+        self._t = clock.now()
+        self._next_trace = self._t
+        self._trace = []
+        self._home = tuple(start)
+        clock.listeners.append(self.step)
+
+    def reference(self, t):
+        plan = self.high_level_commander._plan
+        if plan is None:
+            return tuple(self.state) if self.state[2] > 0 else self._home
+        if plan[0] == 'traj':
+            # Read from memory every time, so overwriting a running trajectory shows in the trace
+            _, t0, offset, n_pieces, time_scale = plan
+            x, y, z, yaw = Trajectory(self.mem.traj.read(offset, n_pieces)).evaluate((t - t0) / time_scale)
+            return (x, y, z, math.degrees(yaw))
+        t0, duration, a, b = plan
+        s = _smoothstep7((t - t0) / duration)
+        return tuple(a[i] + (b[i] - a[i]) * s for i in range(4))
+
+    def step(self, t):
+        dt = t - self._t
+        if dt <= 0:
+            return
+        self._t = t
+        ref = self.reference(t)
+        k = 1.0 - math.exp(-dt / self.tau)
+        for i in range(4):
+            # Yaw error is wrapped like the firmware's controller does
+            d = (ref[i] - self.state[i] if i < 3 else _wrap_deg(ref[i] - self.state[i])) * k
+            if i < 3:
+                self.velocity[i] = d / dt
+            self.state[i] += d
+        self.log.step(t)
+        if t >= self._next_trace:
+            self._next_trace += TRACE_PERIOD
+            self._trace.append((t, *self.state, *ref))
+
+    def log_value(self, name):
+        x, y, z, yaw = self.state
+        yaw = _wrap_deg(yaw)
+        var = EST_VAR_FLOOR
+        if self.t_reset is not None:
+            var += EST_VAR0 * math.exp(-(self.clock.now() - self.t_reset) / EST_TAU)
+        return {
+            'stateEstimate.x': x, 'stateEstimate.y': y, 'stateEstimate.z': z,
+            'stateEstimate.yaw': yaw, 'stabilizer.yaw': yaw,
+            'stateEstimate.vx': self.velocity[0], 'stateEstimate.vy': self.velocity[1],
+            'stateEstimate.vz': self.velocity[2],
+            'kalman.varPX': var, 'kalman.varPY': var, 'kalman.varPZ': var,
+            'pm.vbat': 3.9,
+        }.get(name, 0.0)
+
+    def trace(self):
+        """(n, 9) array: t, x, y, z, yaw_deg, ref_x, ref_y, ref_z, ref_yaw_deg."""
+        return np.array(self._trace, dtype=np.float64).reshape(-1, 9)
+
+class SimSyncCrazyflie:
+    """Stands in for cflib's SyncCrazyflie context manager."""
+
+    def __init__(self, cf):
+        self.cf = cf
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
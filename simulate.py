@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# simulate.py
+"""
+Run the full routine (main.main, or aio_show.main with --asyncio) against the simulated Crazyflie on a
+virtual clock. A 3:43 show finishes in well under a second of wall time and
+leaves a trajectory trace for regression checks and benchmarks.
+
+    python3 simulate.py [--show shows/incomplete.json] [--venue ...] [--trace out.npz]
+"""
+import argparse, time
+import numpy as np
+
+import show_clock
+import safe_sleep
+from sim_cf import SimCrazyflie, SimSyncCrazyflie
+
+def simulate(show_file, venue_file=None, *, udp=False, use_trajectories=False, record=False,
+             asyncio_runtime=False, arrival=False, blend=False):
+    """Fly `show_file` in simulation; returns the SimCrazyflie (see .trace())."""
+    import main
+    import aio_show
+    clock = show_clock.use_virtual_clock()
+    safe_sleep.monitor_keyboard = False
+    main.UDP_ENABLED = udp
+    main.USE_TRAJECTORIES = use_trajectories
+    main.RECORD_FLIGHT = record
+    main.ARRIVAL_DETECT = arrival
+    main.BLEND_SPLINES = blend
+    sim = SimCrazyflie(clock)
+    try:
+        run = aio_show.main if asyncio_runtime else main.main
+        run(show_file, venue_file, connect=lambda: SimSyncCrazyflie(sim))
+    finally:
+        show_clock.use_real_clock()
+        safe_sleep.monitor_keyboard = True
+    return sim
+
+def main():
+    import main as routine
+    ap = argparse.ArgumentParser(description="Simulate a show on a virtual clock.")
+    ap.add_argument('--show', default=routine.SHOW_FILE)
+    ap.add_argument('--venue', default=routine.VENUE_FILE)
+    ap.add_argument('--trajectories', action='store_true', help="fly orbits as uploaded trajectories")
+    ap.add_argument('--udp', action='store_true', help="also stream pose over UDP")
+    ap.add_argument('--record', action='store_true', help="run the flight recorder (flights/)")
+    ap.add_argument('--arrival', action='store_true', help="finish gotos/landing on arrival (arrival.py)")
+    ap.add_argument('--blend', action='store_true', help="fly orbits as blended splines (show.SplineBlender)")
+    ap.add_argument('--asyncio', action='store_true', help="fly on the asyncio runtime (aio_show.py)")
+    ap.add_argument('--trace', help="write the trajectory trace to this .npz file")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    sim = simulate(args.show, args.venue, udp=args.udp, use_trajectories=args.trajectories,
+                   record=args.record, asyncio_runtime=args.asyncio,
+                   arrival=args.arrival, blend=args.blend)
+    wall = time.perf_counter() - t0
+    trace = sim.trace()
+    err = np.linalg.norm(trace[:, 1:4] - trace[:, 5:8], axis=1)
+    print(f"[SIM] {sim.clock.now():.1f}s simulated in {wall:.3f}s wall "
+          f"({sim.clock.now() / wall:.0f}x real time)")
+    print(f"[SIM] {len(trace)} trace samples, {sim.radio_packets()} radio packets, "
+          f"tracking error mean {100 * err.mean():.1f} cm / max {100 * err.max():.1f} cm")
+    if args.trace:
+        np.savez(args.trace, t=trace[:, 0], x=trace[:, 1], y=trace[:, 2], z=trace[:, 3],
+                 yaw_deg=trace[:, 4], ref=trace[:, 5:9])
+        print(f"[SIM] Trace written to {args.trace}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# swarm.py
+"""
+Fly one compiled show on several drones in lockstep.
+
+Each drone gets a transformed copy of the show's setpoints (rotation about
+the performer, mirrored x, phase offset in seconds). All drones' commands
+are merged into one event list and dispatched from a single show clock;
+the lateness of every send against its planned time (skew) is recorded per
+drone and reported, with a warning whenever it exceeds max_skew_s.
+
+Before any link is opened, every drone's transformed show goes through
+safety_check.check_show, and all pairs are checked for MIN_SEPARATION
+along their commanded paths; a pair too close refuses the flight.
+
+    python3 swarm.py --drone radio://0/80/2M/E7E7E7E701 \
+                     --drone radio://0/80/2M/E7E7E7E702,mirror \
+                     --drone radio://0/80/2M/E7E7E7E703,rotate=120,phase=0.5
+"""
+import sys, copy, math, argparse, contextlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import show_clock
+from cfutils import hl_go_to_compat, hl_land_compat, reset_estimator, EstimatorSettle
+from preflight import Preflight
+import safe_sleep
+from safe_sleep import safe_sleep_until
+from input_watcher import InputWatcher
+from show import load_show, TAKEOFF, HOVER, LAND
+from safety_check import check_show, check_separation
+from waypoints import X, Y, YAW, row_durations
+from pose_forward import LatencyStats
+
+class DroneTransform:
+    def __init__(self, rotate_deg=0.0, phase_s=0.0, mirror_x=False):
+        self.rotate_deg = rotate_deg
+        self.phase_s = phase_s
+        self.mirror_x = mirror_x
+
+    def apply(self, rows):
+        """Transformed copy of (n, 5) setpoint rows: mirror x first, then rotate about (0, 0)."""
+        out = rows.copy()
+        if self.mirror_x:
+            out[:, X] = -out[:, X]
+            out[:, YAW] = 180.0 - out[:, YAW]
+        if self.rotate_deg:
+            th = math.radians(self.rotate_deg)
+            c, s = math.cos(th), math.sin(th)
+            x, y = out[:, X].copy(), out[:, Y].copy()
+            out[:, X] = c * x - s * y
+            out[:, Y] = s * x + c * y
+            out[:, YAW] += self.rotate_deg
+        yaw = out[:, YAW]
+        out[:, YAW] = np.where(np.isnan(yaw), np.nan, (yaw + 180.0) % 360.0 - 180.0)
+        return out
+
+    def apply_show(self, show):
+        """Copy of a CompiledShow with transformed setpoints (the phase stays with the events)."""
+        out = copy.copy(show)
+        out.setpoints = self.apply(show.setpoints)
+        return out
+
+    def __repr__(self):
+        return (f"DroneTransform(rotate_deg={self.rotate_deg}, phase_s={self.phase_s}, "
+                f"mirror_x={self.mirror_x})")
+
+# Event commands
+GO_TO, TAKE_OFF, LAND_CMD = range(3)
+
+def build_events(show, transform):
+    """[(t, cmd, args)] for one drone, t in show time (takeoff is negative)."""
+    events = []
+    for seg, step in zip(show.segments, show.steps):
+        kind = int(seg['kind'])
+        t0 = float(seg['start']) + transform.phase_s
+        if kind == TAKEOFF:
+            events.append((t0, TAKE_OFF, (float(seg['z_end']), float(seg['move']))))
+        elif kind == LAND:
+            events.append((t0, LAND_CMD, (float(step.get('from_height') or 0.0),
+                                          float(seg['param']))))
+        elif kind != HOVER:
+            rows = transform.apply(show.setpoints[seg['row0']:seg['row0'] + seg['nrows']])
+            # Same per-row durations as fly_waypoints(): subdivided orbit rows move for their own gap
+            for (t, x, y, z, yaw), move in zip(rows.tolist(),
+                                               row_durations(rows, seg['step'], seg['move']).tolist()):
+                events.append((t0 + t, GO_TO, (x, y, z, None if yaw != yaw else yaw, move)))
+    return events
+
+class SwarmRunner:
+    """Dispatches every drone's events from one clock and measures per-drone skew."""
+
+    def __init__(self, hls, show, transforms, *, max_skew_s=0.02):
+        if len(hls) != len(transforms):
+            raise ValueError("need one transform per drone")
+        self.hls = hls
+        self.show = show
+        self.transforms = transforms
+        self.max_skew_s = max_skew_s
+        self.skew = [LatencyStats() for _ in hls]
+        self.over_bound = [0] * len(hls)
+        self.current_height = [0.0] * len(hls)
+
+    def schedule(self):
+        """Merged, time-sorted [(t, drone, cmd, args)], shifted so the first event is at 0."""
+        merged = [(t, i, cmd, args)
+                  for i, tf in enumerate(self.transforms)
+                  for (t, cmd, args) in build_events(self.show, tf)]
+        merged.sort(key=lambda e: (e[0], e[1]))
+        t_first = merged[0][0] if merged else 0.0
+        return [(t - t_first, i, cmd, args) for (t, i, cmd, args) in merged]
+
+    def _send(self, i, cmd, args):
+        hl = self.hls[i]
+        if cmd == GO_TO:
+            x, y, z, yaw, move = args
+            hl_go_to_compat(hl, x, y, z, yaw_deg=yaw, duration_s=move, relative=False)
+            self.current_height[i] = z
+        elif cmd == TAKE_OFF:
+            height, duration = args
+            hl_go_to_compat(hl, 0.0, 0.0, height, yaw_deg=None, duration_s=duration, relative=True)
+            self.current_height[i] = height
+        elif cmd == LAND_CMD:
+            from_height, descent_vel = args
+            hl_land_compat(hl, from_height or self.current_height[i], descent_vel)
+            self.current_height[i] = 0.0
+
+    def run(self):
+        events = self.schedule()
+        n = len(self.hls)
+        t0 = show_clock.now()
+        k = 0
+        tick = 0
+        while k < len(events):
+            t_due = events[k][0]
+            safe_sleep_until(t0 + t_due)
+            # Everything due at this instant; rotate the send order each tick
+            # so no drone is always served last.
+            batch = []
+            while k < len(events) and events[k][0] <= t_due + 1e-9:
+                batch.append(events[k])
+                k += 1
+            batch.sort(key=lambda e: (e[1] - tick) % n)
+            tick += 1
+            for t, i, cmd, args in batch:
+                self._send(i, cmd, args)
+                skew = show_clock.now() - (t0 + t)
+                self.skew[i].add(skew)
+                if skew > self.max_skew_s:
+                    self.over_bound[i] += 1
+                    if self.over_bound[i] == 1:
+                        print(f"[SWARM] Drone {i} skew {1e3 * skew:.1f} ms exceeds "
+                              f"{1e3 * self.max_skew_s:.0f} ms bound")
+        # Wait out the final segment (landing)
+        last = self.show.segments[-1]
+        safe_sleep_until(t0 + events[-1][0] + float(last['slot']) if events else t0)
+
+    def stop_and_land(self, descent_vel=0.125):
+        # Stop every drone before the first land command goes out
+        for i, hl in enumerate(self.hls):
+            try:
+                hl.stop()
+            except Exception as e:
+                print(f"[SWARM] Drone {i}: stop failed: {e}")
+        latency = safe_sleep.emergency_latency()
+        if latency is not None:
+            print(f"[EMERGENCY] Trigger -> last stop() latency: {1e3 * latency:.2f} ms")
+        for i, hl in enumerate(self.hls):
+            try:
+                hl_land_compat(hl, self.current_height[i] or 1.0, descent_vel)
+            except Exception as e:
+                print(f"[SWARM] Drone {i}: emergency landing failed: {e}")
+
+    def report(self):
+        lines = [f"[SWARM] {len(self.hls)} drones, dispatch skew (send time - planned):"]
+        for i, (st, tf) in enumerate(zip(self.skew, self.transforms)):
+            lines.append(f"  drone {i}: {st.summary()}  over {1e3 * self.max_skew_s:.0f} ms: "
+                         f"{self.over_bound[i]}  {tf}")
+        return "\n".join(lines)
+
+# ---------- radio ----------
+def open_links(stack, uris, rw_cache='./cache'):
+    """Open every link in parallel inside an ExitStack; returns the Crazyflie objects."""
+    import cflib.crtp
+    from cflib.crazyflie import Crazyflie
+    from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+    from toc_cache import FastTocCache
+    cflib.crtp.init_drivers(enable_debug_driver=False)
+
+    toc = FastTocCache(rw_cache=rw_cache)   # shared: drones on the same firmware parse it once
+
+    def open_one(uri):
+        cf = Crazyflie(rw_cache=rw_cache)
+        cf._toc_cache = toc
+        scf = SyncCrazyflie(uri, cf=cf)
+        scf.open_link()
+        stack.callback(scf.close_link)   # so links that did open are closed if another fails
+        return scf
+
+    with ThreadPoolExecutor(max_workers=len(uris)) as pool:
+        links = list(pool.map(open_one, uris))
+    return [scf.cf for scf in links]
+
+def preflight(cf):
+    """Pipelined preflight (see preflight.py); returns the Preflight for its timing report."""
+    pf = Preflight(cf)
+    pf.param('commander.enHighLevel', '1')
+    pf.action('arm', lambda: cf.platform.send_arming_request(True))
+    settle = EstimatorSettle(cf)
+    try:
+        pf.log(settle.make_config(), 'kalman variances')
+    except Exception as e:
+        print(f"[EST] Can't log Kalman variances ({e})")
+        settle = None
+    pf.wait()
+    pf.timed('estimator settle', lambda: reset_estimator(cf, settle=settle))
+    return pf
+
+def parse_drone(spec):
+    """'URI[,rotate=DEG][,phase=S][,mirror]' -> (uri, DroneTransform)."""
+    uri, *opts = spec.split(',')
+    tf = DroneTransform()
+    for opt in opts:
+        key, _, val = opt.partition('=')
+        if key == 'rotate':
+            tf.rotate_deg = float(val)
+        elif key == 'phase':
+            tf.phase_s = float(val)
+        elif key == 'mirror':
+            tf.mirror_x = True
+        else:
+            raise ValueError(f"unknown drone option {opt!r}")
+    return uri, tf
+
+def main():
+    ap = argparse.ArgumentParser(description="Fly a show on several drones from one clock.")
+    ap.add_argument('--drone', action='append', required=True,
+                    help="URI[,rotate=DEG][,phase=S][,mirror]; repeat per drone")
+    ap.add_argument('--show', default="shows/incomplete.json")
+    ap.add_argument('--venue')
+    ap.add_argument('--max-skew-ms', type=float, default=20.0)
+    ap.add_argument('--abort-port', type=int, help="also land all drones on any datagram to this UDP port")
+    ap.add_argument('--safety', default='report', choices=('report', 'reject'),
+                    help="'reject' refuses to fly if any drone's show fails the safety check")
+    args = ap.parse_args()
+
+    drones = [parse_drone(d) for d in args.drone]
+    show = load_show(args.show, args.venue)
+    # Each drone's own copy: mirror / rotate can take it out of an asymmetric geofence
+    shows = [tf.apply_show(show) for _, tf in drones]
+    fly = True
+    for i, s in enumerate(shows):
+        result = check_show(s)
+        print(f"[SWARM] Drone {i} ({drones[i][1]!r}):")
+        print(result.report())
+        fly &= result.ok or args.safety == 'report'
+    separation = check_separation(shows, [tf.phase_s for _, tf in drones])
+    print(separation.report())
+    if not separation.ok or not fly:
+        print("[SAFETY] Refusing to fly" + (" (drones too close)." if not separation.ok else f" (--safety {args.safety})."))
+        sys.exit(1)
+    with contextlib.ExitStack() as stack:
+        stack.callback(InputWatcher(abort_port=args.abort_port).start().stop)
+        cfs = open_links(stack, [uri for uri, _ in drones])
+        with ThreadPoolExecutor(max_workers=len(cfs)) as pool:
+            for i, pf in enumerate(pool.map(preflight, cfs)):
+                print(f"[SWARM] Drone {i} " + pf.report()[1:])
+        runner = SwarmRunner([cf.high_level_commander for cf in cfs], show,
+                             [tf for _, tf in drones], max_skew_s=args.max_skew_ms / 1000.0)
+        try:
+            runner.run()
+        except KeyboardInterrupt:
+            safe_sleep.trigger_emergency("Ctrl-C")
+            print(f"\n[EMERGENCY] {safe_sleep.emergency_source} — landing all drones...")
+            descent_vel = show.params.get('DESCENT_VEL', 0.125)
+            runner.stop_and_land(descent_vel)
+            show_clock.sleep(max(2.0, max(runner.current_height) / max(0.1, descent_vel)) + 0.3)
+        finally:
+            for cf in cfs:
+                try:
+                    cf.platform.send_arming_request(False)
+                except Exception:
+                    pass
+            print(runner.report())
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from cfutils import hl_go_to_compat
-from safe_sleep import safe_sleep
-import time
+from safe_sleep import run_steps
+from timeline import segment_plan
 
 def takeoff(hl, height_m=1.5, ascent_vel=0.6):
     """
@@ -8,12 +8,17 @@ def takeoff(hl, height_m=1.5, ascent_vel=0.6):
     Uses hl_go_to_compat to control the duration and
     safe_sleep to make the wait interruptible.
     """
-    
+    run_steps(takeoff_steps(hl, height_m, ascent_vel))
+
+def takeoff_steps(hl, height_m=1.5, ascent_vel=0.6):
+    """takeoff() as a step generator (see safe_sleep.run_steps())."""
     # Calculate the desired duration based on height and velocity
     # e.g., (1.3m / 0.26 m/s = 5.0 seconds)
     duration = max(1.0, height_m / max(0.1, ascent_vel))
     
     print(f"[TAKING OFF] Ascending to {height_m}m over {duration:.1f} seconds...")
+    t_start = segment_plan(duration, "takeoff")
+    yield t_start, None
     
     # Use hl_go_to_compat to perform a timed, relative "goto"
     # This moves straight up from the drone's current ground position.
@@ -23,6 +28,5 @@ def takeoff(hl, height_m=1.5, ascent_vel=0.6):
                     duration_s=duration,      # <--- This forces the 5-sec duration
                     relative=True)            # Move RELATIVE (straight up)
     
-    # Use safe_sleep to wait for the move to complete.
-    # We wait for the *exact* duration of the move.
-    safe_sleep(duration)
\ No newline at end of file
+    # Wait (interruptibly) until the move's deadline on the show clock.
+    yield t_start + duration, None
@@ -0,0 +1,203 @@
+# telemetry.py
+"""
+Multi-rate telemetry decoded straight into NumPy ring arrays.
+
+A telemetry group is a rate plus a list of (variable, type) pairs. Its
+variables are packed into as few LogConfig blocks as fit the 26-byte log
+payload (LOG_PAYLOAD). Each block decodes its packets with one precompiled
+struct into a preallocated row of its ring array, so no dict is built per
+sample. The row is then handed to the block's data_received_cb as
+`data`. Consumers index it by column (block.columns(names)) instead of
+by name: PoseForwarder, FlightRecorder and ArrivalDetector all take
+`names`, which can be variable names (dict samples) or column indices
+(telemetry rows). ArrivalDetector.on_velocity reads the motion block.
+
+    tel = Telemetry()                      # DEFAULT_GROUPS
+    tel.start(cf, pf.log, required=[tel['pose']])
+    pose = tel['pose']
+    x, y, z, yaw = pose.latest()           # newest row (a view)
+    rows, t_wall = pose.last(50)           # newest 50 rows, oldest first
+"""
+import math, time, struct
+import numpy as np
+from cflib.crazyflie.log import LogConfig, LogTocElement
+
+LOG_PAYLOAD = LogConfig.MAX_LEN   # bytes per log packet after block id + timestamp
+
+# group -> (period_ms, [(variable, type), ...])
+DEFAULT_GROUPS = {
+    'pose':   (10, [('stateEstimate.x', 'float'), ('stateEstimate.y', 'float'),
+                    ('stateEstimate.z', 'float'), ('stabilizer.yaw', 'float')]),
+    'motion': (20, [('stateEstimate.vx', 'float'), ('stateEstimate.vy', 'float'),
+                    ('stateEstimate.vz', 'float'),
+                    ('stabilizer.roll', 'FP16'), ('stabilizer.pitch', 'FP16')]),
+    'status': (500, [('pm.vbat', 'FP16'), ('pm.batteryLevel', 'uint8_t'), ('pm.state', 'int8_t'),
+                     ('radio.rssi', 'uint8_t'), ('radio.isConnected', 'uint8_t')]),
+}
+
+POSE_NAMES = ('stateEstimate.x', 'stateEstimate.y', 'stateEstimate.z', 'stabilizer.yaw')
+
+def type_size(t):
+    return LogTocElement.get_size_from_id(LogTocElement.get_id_from_cstring(t))
+
+def pack_variables(variables, max_len=LOG_PAYLOAD):
+    """
+    Split (variable, type) pairs into blocks of at most max_len payload bytes
+    (first fit, largest first; order is kept within a block).
+    """
+    bins = []   # [free bytes, [pairs]]
+    for pair in sorted(variables, key=lambda p: -type_size(p[1])):
+        size = type_size(pair[1])
+        if size > max_len:
+            raise ValueError(f"{pair[0]}: {pair[1]} doesn't fit in a log packet")
+        for b in bins:
+            if b[0] >= size:
+                b[0] -= size
+                b[1].append(pair)
+                break
+        else:
+            bins.append([max_len - size, [pair]])
+    order = {name: i for i, (name, _) in enumerate(variables)}
+    return [sorted(b[1], key=lambda p: order[p[0]]) for b in bins]
+
+class _ArrayLogConfig(LogConfig):
+    """LogConfig whose packets are decoded into a TelemetryBlock instead of a dict."""
+
+    def __init__(self, block, name, period_in_ms):
+        super().__init__(name, period_in_ms)
+        self.block = block
+
+    def unpack_log_data(self, log_data, timestamp):
+        row = self.block.write(log_data, timestamp)
+        self.data_received_cb.call(timestamp, row, self)
+
+class TelemetryBlock:
+    """One log block: ring arrays of decoded rows plus their timestamps."""
+
+    def __init__(self, name, period_ms, variables, capacity):
+        self.name = name
+        self.period_ms = period_ms
+        self.names = tuple(v for v, _ in variables)
+        self._col = {v: i for i, v in enumerate(self.names)}
+        self._struct = struct.Struct('<' + ''.join(
+            LogTocElement.get_unpack_string_from_id(LogTocElement.get_id_from_cstring(t))[1:]
+            for _, t in variables))
+        self.capacity = capacity
+        self.data = np.zeros((capacity, len(variables)), dtype=np.float64)
+        self.t_log = np.zeros(capacity, dtype=np.float64)    # firmware timestamp (ms)
+        self.t_wall = np.zeros(capacity, dtype=np.float64)   # time.time() at receipt
+        self.count = 0        # samples written; sample k lives in row k % capacity
+        self.logconf = _ArrayLogConfig(self, name, period_ms)
+        for v, t in variables:
+            self.logconf.add_variable(v, t)
+
+    @property
+    def payload_bytes(self):
+        return self._struct.size
+
+    def col(self, name):
+        return self._col[name]
+
+    def columns(self, names):
+        """Column indices of `names`, for indexing rows."""
+        return tuple(self._col[n] for n in names)
+
+    def write(self, log_data, timestamp):
+        """Decode one log payload into the next row (log thread); returns the row."""
+        k = self.count % self.capacity
+        row = self.data[k]
+        row[:] = self._struct.unpack_from(log_data)
+        self.t_log[k] = timestamp
+        self.t_wall[k] = time.time()
+        self.count += 1   # publish the row only once it is complete
+        return row
+
+    def latest(self):
+        """Newest row (a view into the ring), or None before the first sample."""
+        return self.data[(self.count - 1) % self.capacity] if self.count else None
+
+    def latest_wall(self):
+        return self.t_wall[(self.count - 1) % self.capacity] if self.count else 0.0
+
+    def last(self, n):
+        """(rows, t_wall) of the newest n samples, oldest first (copies)."""
+        n = min(n, self.count, self.capacity)
+        idx = np.arange(self.count - n, self.count) % self.capacity
+        return self.data[idx], self.t_wall[idx]
+
+    def column(self, name, n=None):
+        """Newest n (default: all kept) values of one variable, oldest first."""
+        rows, _ = self.last(self.capacity if n is None else n)
+        return rows[:, self._col[name]]
+
+class Telemetry:
+    def __init__(self, groups=None, *, history_s=10.0):
+        """groups: {group: (period_ms, [(variable, type), ...])}; rings keep history_s of samples."""
+        self.groups = {}   # group -> [TelemetryBlock]
+        for group, (period_ms, variables) in (groups or DEFAULT_GROUPS).items():
+            capacity = max(16, math.ceil(1000.0 * history_s / period_ms))
+            packed = pack_variables(variables)
+            self.groups[group] = [TelemetryBlock(group if i == 0 else f"{group}.{i}", period_ms, v, capacity)
+                                  for i, v in enumerate(packed)]
+
+    @property
+    def blocks(self):
+        return [b for blocks in self.groups.values() for b in blocks]
+
+    def __getitem__(self, group):
+        """First (usually only) block of a group."""
+        return self.groups[group][0]
+
+    def has(self, variable):
+        return any(variable in b.names for b in self.blocks)
+
+    def block_of(self, variable):
+        """The block that logs `variable`."""
+        for b in self.blocks:
+            if variable in b.names:
+                return b
+        raise KeyError(variable)
+
+    def logconfs(self):
+        return [b.logconf for b in self.blocks]
+
+    def drop(self, block):
+        """Forget a block (e.g. one that couldn't be started); the rest of its group stays."""
+        for group, blocks in list(self.groups.items()):
+            if block in blocks:
+                blocks.remove(block)
+                if not blocks:
+                    del self.groups[group]
+
+    def start(self, cf, add=None, required=()):
+        """
+        Add and start the blocks one at a time, `required` ones first.
+        add(conf) replaces cf.log.add_config + conf.start (e.g. Preflight.log).
+        A block that fails (say a variable missing from the TOC) is reported
+        and dropped; only a failing required block raises.
+        """
+        def add_config(conf):
+            cf.log.add_config(conf)
+            conf.start()
+        for b in sorted(self.blocks, key=lambda b: b not in required):
+            try:
+                (add or add_config)(b.logconf)
+            except Exception as e:
+                if b in required:
+                    raise
+                print(f"[TEL] Log block {b.name} dropped: {e}")
+                self.drop(b)
+
+    def stop(self):
+        for conf in self.logconfs():
+            try:
+                conf.stop()
+            except Exception:
+                pass
+
+    def summary(self):
+        lines = ["[TEL] Log blocks:"]
+        for b in self.blocks:
+            lines.append(f"  {b.name:8s} {1000.0 / b.period_ms:5.0f} Hz  {b.payload_bytes:2d}/{LOG_PAYLOAD} B  "
+                         f"{len(b.names)} vars  ring {b.capacity}  {b.count} samples")
+        return "\n".join(lines)
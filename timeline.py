@@ -0,0 +1,198 @@
+# timeline.py
+import csv, math
+import show_clock
+import cfutils
+from safe_sleep import safe_sleep_until
+
+# Columns of ShowTimeline.segments (times in show seconds, NaN = not yet / none)
+LABEL, PLANNED, DURATION, LATE, ANNOTATED, SENT, SEND_S, SENDS, DONE = range(9)
+TRACE_FIELDS = ('label', 'planned_s', 'duration_s', 'late_s', 'annotated_s',
+                'first_send_s', 'send_total_s', 'sends', 'done_s')
+
+class ShowTimeline:
+    """
+    Plans every segment against one show clock with absolute deadlines.
+
+    Segments are laid end to end in show time: segment k starts at the sum of
+    the planned durations before it, regardless of how long earlier segments
+    actually took. A segment that starts late ends on its planned deadline
+    anyway, absorbing the drift; one that is ready early waits for its slot.
+
+    With a music clock (music_clock.py) show time is music time: t0 is
+    re-read from the clock at every segment start, so segments follow the
+    music's measured position instead of the local clock alone.
+
+    Every segment is also traced: the music timestamp it is annotated with,
+    when its first command went out, total send time and command count, and
+    when it completed (the next segment was claimed or the show ended).
+    """
+
+    def __init__(self, music=None):
+        self.t0 = None        # clock time of show time 0.0
+        self.cursor = 0.0     # planned show time of the next segment
+        self.segments = []    # one row per segment, see LABEL..DONE
+        self._next = None     # (label, annotated_s) for the next plan()
+        self.music = music    # optional music_clock.MusicClock
+        self.corrections = [] # t0 changes taken from the music clock (s)
+
+    def start(self):
+        self.t0 = show_clock.now()
+        self.cursor = 0.0
+        self.segments = []
+        if self.music is not None:
+            self.music.start()
+            self._follow_music()
+        cfutils.add_send_listener(self.on_send)
+
+    def _follow_music(self):
+        t0 = self.music.t0()
+        if t0 is not None and t0 != self.t0:
+            self.corrections.append(t0 - self.t0)
+            self.t0 = t0
+
+    def finish(self):
+        """Complete the last segment and stop tracing sends."""
+        cfutils.remove_send_listener(self.on_send)
+        if self.segments and math.isnan(self.segments[-1][DONE]):
+            self.segments[-1][DONE] = self.show_time()
+
+    def show_time(self):
+        return show_clock.now() - self.t0
+
+    def annotate_next(self, label, annotated_s=math.nan):
+        """Name the next segment and give its music timestamp (the show file's "at")."""
+        self._next = (label, annotated_s)
+
+    def on_send(self, command, dt):
+        if not self.segments:
+            return
+        seg = self.segments[-1]
+        if math.isnan(seg[SENT]):
+            seg[SENT] = self.show_time() - dt
+        seg[SEND_S] += dt
+        seg[SENDS] += 1
+
+    def plan(self, duration, label=""):
+        """
+        Claim the next `duration` seconds of show time without waiting.
+        Returns the planned start as an absolute clock time; the segment's
+        own deadlines should be offsets from it.
+        """
+        now = show_clock.now()
+        if self.segments and math.isnan(self.segments[-1][DONE]):
+            self.segments[-1][DONE] = now - self.t0
+        if self.music is not None:
+            self._follow_music()
+        annotated = math.nan
+        if self._next is not None:
+            label, annotated = self._next
+            self._next = None
+        planned = self.cursor
+        self.cursor += max(0.0, duration)
+        start_abs = self.t0 + planned
+        late = max(0.0, now - start_abs)
+        self.segments.append([label, planned, duration, late, annotated,
+                              math.nan, 0.0, 0, math.nan])
+        return start_abs
+
+    def begin(self, duration, label=""):
+        """plan(), then wait for the planned start if the segment is early."""
+        start_abs = self.plan(duration, label)
+        if show_clock.now() < start_abs:
+            safe_sleep_until(start_abs)
+        return start_abs
+
+    def drift(self):
+        """How far the clock is past the end of the planned segments (s)."""
+        return show_clock.now() - (self.t0 + self.cursor)
+
+    def report(self):
+        if not self.segments:
+            return "[TIMELINE] No segments."
+        lates = [s[LATE] for s in self.segments]
+        worst = max(self.segments, key=lambda s: s[LATE])
+        return (f"[TIMELINE] {len(self.segments)} segments, planned {self.cursor:.2f}s | "
+                f"drift absorbed: total {sum(lates):.3f}s, mean {1e3 * sum(lates) / len(lates):.1f} ms, "
+                f"max {1e3 * worst[LATE]:.1f} ms ({worst[LABEL] or 'unnamed'} @ {worst[PLANNED]:.2f}s) | "
+                f"end drift {1e3 * self.drift():+.1f} ms"
+                + (f" | music: {len(self.corrections)} corrections, "
+                   f"net {1e3 * sum(self.corrections):+.1f} ms" if self.music is not None else ""))
+
+    def table(self):
+        """
+        Per-segment trace. 'plan-music' is the planned start minus the
+        annotated music timestamp (authoring drift, cumulative through the
+        show); 'sent-music' is the first command send minus it (what the
+        audience sees).
+        """
+        def mmss(t):
+            return "" if math.isnan(t) else f"{int(t // 60)}:{t % 60:04.1f}"
+
+        def ms(t):
+            return "" if math.isnan(t) else f"{1e3 * t:+.0f}"
+
+        def sec(t):
+            return "" if math.isnan(t) else f"{t:.2f}"
+
+        lines = ["[TIMELINE] Segment trace (show time, s):",
+                 f"  {'#':>2}  {'label':<22} {'music':>6} {'planned':>8} {'sent':>8} "
+                 f"{'send ms (n)':>12} {'done':>8} {'late ms':>8} {'plan-music':>10} {'sent-music':>10}"]
+        for i, s in enumerate(self.segments):
+            sends = f"{1e3 * s[SEND_S]:.2f} ({s[SENDS]})" if s[SENDS] else ""
+            lines.append(f"  {i:>2}  {s[LABEL][:22]:<22} {mmss(s[ANNOTATED]):>6} {s[PLANNED]:8.2f} "
+                         f"{sec(s[SENT]):>8} {sends:>12} {sec(s[DONE]):>8} {1e3 * s[LATE]:8.1f} "
+                         f"{ms(s[PLANNED] - s[ANNOTATED]):>10} {ms(s[SENT] - s[ANNOTATED]):>10}")
+        return "\n".join(lines)
+
+    def export_csv(self, path):
+        """Write the segment trace as CSV (one row per segment) for plotting."""
+        with open(path, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(('index',) + TRACE_FIELDS + ('drift_vs_music_s',))
+            for i, s in enumerate(self.segments):
+                w.writerow([i] + s + [s[SENT] - s[ANNOTATED]])
+        return path
+
+# Active show, if any. Primitives call segment_start(); outside a show each
+# segment simply starts now.
+_active = None
+_music = None   # music clock the next start_show() follows
+
+def use_music_clock(clock):
+    """Make shows started from now on follow `clock` (None = local clock only)."""
+    global _music
+    _music = clock
+
+def start_show():
+    global _active
+    _active = ShowTimeline(_music)
+    _active.start()
+    return _active
+
+def end_show():
+    """Detach the active show (e.g. before emergency landing). Returns it."""
+    global _active
+    show, _active = _active, None
+    if show is not None:
+        show.finish()
+    return show
+
+def annotate_next(label, annotated_s=math.nan):
+    """ShowTimeline.annotate_next() on the active show, if any."""
+    if _active is not None:
+        _active.annotate_next(label, annotated_s)
+
+def get_show():
+    return _active
+
+def segment_start(duration, label=""):
+    """Absolute clock time at which a segment of `duration` seconds starts."""
+    if _active is None:
+        return show_clock.now()
+    return _active.begin(duration, label)
+
+def segment_plan(duration, label=""):
+    """segment_start() without the wait, for callers that wait on their own (aio_show)."""
+    if _active is None:
+        return show_clock.now()
+    return _active.plan(duration, label)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# toc_bench.py
+"""
+Startup benchmark: cflib's JSON TocCache vs toc_cache.FastTocCache.
+
+Offline, every cached TOC in --cache is fetched through both caches (JSON,
+index cold = first run that builds the index, index warm = later runs,
+memory = same process). With --uri, the real connect-to-ready time
+(SyncCrazyflie.open_link() returning) is measured with each cache.
+
+    python3 toc_bench.py [--cache ./cache] [--uri radio://0/80/2M --runs 3]
+"""
+import os, glob, time, shutil, tempfile, argparse, statistics
+
+from cflib.crazyflie.toccache import TocCache
+from toc_cache import FastTocCache, install
+
+def _ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return 1e3 * statistics.median(times)
+
+def bench_fetch(cache_dir, repeat=20):
+    crcs = [int(os.path.basename(p)[:8], 16) for p in glob.glob(os.path.join(cache_dir, '*.json'))]
+    if not crcs:
+        print(f"[BENCH] No TOC files in {cache_dir}")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        for p in glob.glob(os.path.join(cache_dir, '*.json')):
+            shutil.copy(p, tmp)
+
+        def fetch_all(cache):
+            for crc in crcs:
+                cache.fetch(crc)
+
+        json_ms = _ms(lambda: fetch_all(TocCache(rw_cache=tmp)), repeat)
+
+        t0 = time.perf_counter()
+        fetch_all(FastTocCache(rw_cache=tmp))   # builds the indexes
+        cold_ms = 1e3 * (time.perf_counter() - t0)
+        warm_ms = _ms(lambda: fetch_all(FastTocCache(rw_cache=tmp)), repeat)
+        shared = FastTocCache(rw_cache=tmp)
+        fetch_all(shared)
+        mem_ms = _ms(lambda: fetch_all(shared), repeat)
+        json_kb = sum(os.path.getsize(p) for p in glob.glob(os.path.join(tmp, '*.json'))) / 1024
+        idx_kb = sum(os.path.getsize(p) for p in glob.glob(os.path.join(tmp, '*.toc.pickle'))) / 1024
+
+    print(f"[BENCH] {len(crcs)} cached TOCs ({json_kb:.0f} KiB JSON, {idx_kb:.0f} KiB index)")
+    print(f"  JSON TocCache        {json_ms:8.2f} ms")
+    print(f"  index, cold (build)  {cold_ms:8.2f} ms")
+    print(f"  index, warm          {warm_ms:8.2f} ms   ({json_ms / warm_ms:.1f}x)")
+    print(f"  in-memory            {mem_ms:8.2f} ms   ({json_ms / mem_ms:.1f}x)")
+
+def bench_connect(uri, cache_dir, runs=3):
+    import cflib.crtp
+    from cflib.crazyflie import Crazyflie
+    from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+    cflib.crtp.init_drivers(enable_debug_driver=False)
+
+    def connect(fast):
+        cf = Crazyflie(rw_cache=cache_dir)
+        if fast:
+            install(cf, rw_cache=cache_dir)
+        scf = SyncCrazyflie(uri, cf=cf)
+        t0 = time.perf_counter()
+        scf.open_link()
+        dt = time.perf_counter() - t0
+        scf.close_link()
+        time.sleep(0.5)
+        return dt
+
+    for fast in (False, True):
+        times = [connect(fast) for _ in range(runs)]
+        print(f"[BENCH] connect-to-ready, {'FastTocCache' if fast else 'JSON TocCache'}: "
+              f"median {1e3 * statistics.median(times):.0f} ms "
+              f"(runs: {', '.join(f'{1e3 * t:.0f}' for t in times)})")
+
+def main():
+    ap = argparse.ArgumentParser(description="TOC cache startup benchmark.")
+    ap.add_argument('--cache', default='./cache')
+    ap.add_argument('--uri', help="also time real connects to this Crazyflie")
+    ap.add_argument('--runs', type=int, default=3)
+    args = ap.parse_args()
+    bench_fetch(args.cache)
+    if args.uri:
+        bench_connect(args.uri, args.cache, args.runs)
+
+if __name__ == "__main__":
+    main()
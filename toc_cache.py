@@ -0,0 +1,132 @@
+# toc_cache.py
+"""
+Compact TOC cache index in front of cflib's JSON TocCache.
+
+cflib stores each log/param TOC as pretty-printed JSON (cache/<CRC>.json,
+~800 elements) and re-parses it on every connect. FastTocCache keeps the
+same files and CRC keys, and adds a pickled index next to each one
+(cache/<CRC>.toc.pickle) holding every element as a plain tuple.
+
+- Lazy: nothing is read until cflib asks for a CRC; a CRC that was read
+  once is served from memory afterwards (e.g. several drones, same firmware).
+- Transparent: a missing, stale or unreadable index falls back to the JSON
+  file, and the index is rebuilt from it. New TOCs are written as JSON (for
+  cfclient and friends) and as an index.
+
+    cf = Crazyflie(rw_cache='./cache')
+    install(cf, rw_cache='./cache')
+
+python3 toc_bench.py reports connect-to-ready time with and without it.
+"""
+import os, pickle, logging, threading
+
+from cflib.crazyflie.toccache import TocCache
+from cflib.crazyflie.log import LogTocElement
+from cflib.crazyflie.param import ParamTocElement
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+_CLASSES = (LogTocElement, ParamTocElement)
+
+def _pack(toc):
+    """{group: {name: element}} -> [(group, name, cls, ident, ctype, pytype, access, extended)]"""
+    rows = []
+    for group, elems in toc.items():
+        for name, e in elems.items():
+            cls = 1 if isinstance(e, ParamTocElement) else 0
+            rows.append((group, name, cls, e.ident, e.ctype, e.pytype, e.access,
+                         getattr(e, 'extended', False)))
+    return rows
+
+def _unpack(rows):
+    toc = {}
+    for group, name, cls, ident, ctype, pytype, access, extended in rows:
+        e = _CLASSES[cls]()
+        e.ident = ident
+        e.group = group
+        e.name = name
+        e.ctype = ctype
+        e.pytype = pytype
+        e.access = access
+        if cls:
+            e.extended = extended
+        toc.setdefault(group, {})[name] = e
+    return toc
+
+class FastTocCache(TocCache):
+    def __init__(self, ro_cache=None, rw_cache=None):
+        super().__init__(ro_cache=ro_cache, rw_cache=rw_cache)
+        self._dirs = [d for d in (rw_cache, ro_cache) if d]
+        self._memory = {}   # crc -> packed rows
+        self.hits = {'memory': 0, 'index': 0, 'json': 0, 'miss': 0}
+
+    def _index_path(self, directory, crc):
+        return os.path.join(directory, '%08X.toc.pickle' % crc)
+
+    def _json_path(self, crc):
+        pattern = '%08X.json' % crc
+        for name in self._cache_files:
+            if name.endswith(pattern):
+                return name
+        return None
+
+    def _load_index(self, crc):
+        json_path = self._json_path(crc)
+        for d in self._dirs:
+            path = self._index_path(d, crc)
+            try:
+                if json_path and os.path.getmtime(path) < os.path.getmtime(json_path):
+                    continue   # JSON was rewritten after the index was built
+                with open(path, 'rb') as f:
+                    version, stored_crc, rows = pickle.load(f)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.warning('Ignoring unreadable TOC index [%s]: %s', path, e)
+                continue
+            if version == INDEX_VERSION and stored_crc == crc:
+                return rows
+        return None
+
+    def _write_index(self, crc, rows):
+        if not self._rw_cache:
+            return
+        path = self._index_path(self._rw_cache, crc)
+        try:
+            tmp = f'{path}.{threading.get_ident()}.tmp'   # parallel connects (swarm.py)
+            with open(tmp, 'wb') as f:
+                pickle.dump((INDEX_VERSION, crc, rows), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning('Could not save TOC index [%s]: %s', path, e)
+
+    def fetch(self, crc):
+        rows = self._memory.get(crc)
+        if rows is not None:
+            self.hits['memory'] += 1
+            return _unpack(rows)   # fresh elements: each Crazyflie owns its TOC
+        rows = self._load_index(crc)
+        if rows is not None:
+            self.hits['index'] += 1
+        else:
+            toc = super().fetch(crc)
+            if not toc:
+                self.hits['miss'] += 1
+                return toc
+            self.hits['json'] += 1
+            rows = _pack(toc)
+            self._write_index(crc, rows)
+        self._memory[crc] = rows
+        return _unpack(rows)
+
+    def insert(self, crc, toc):
+        super().insert(crc, toc)
+        rows = _pack(toc)
+        self._memory[crc] = rows
+        self._write_index(crc, rows)
+
+def install(cf, ro_cache=None, rw_cache='./cache'):
+    """Swap the Crazyflie's JSON TocCache for a FastTocCache (before open_link)."""
+    cf._toc_cache = FastTocCache(ro_cache=ro_cache, rw_cache=rw_cache)
+    return cf._toc_cache
@@ -0,0 +1,448 @@
+# trajectory.py
+"""
+Compile orbit primitives into piecewise-polynomial trajectories and fly them
+from the Crazyflie's trajectory memory with a single start command.
+
+Each piece is a 7th-degree polynomial per axis (x, y, z, yaw), the
+Poly4D layout the firmware's high-level commander executes. Pieces are built
+by Hermite interpolation of position, velocity, acceleration and jerk at both
+ends, so consecutive pieces join smoothly.
+
+compile_spline() blends any list of timed waypoints (e.g. a compiled show
+segment) into one trajectory: a clamped cubic spline through the knots
+gives velocity and acceleration that are continuous across them, and the
+7th-degree pieces reproduce those at every knot.
+"""
+import math, time
+import numpy as np
+
+import cfutils
+import show_clock
+
+try:
+    from cflib.crazyflie.mem import MemoryElement, Poly, Poly4D
+    TYPE_TRAJ = MemoryElement.TYPE_TRAJ
+except ImportError:   # offline use with mock_cf
+    Poly = Poly4D = None
+    TYPE_TRAJ = 0x11
+
+PIECE_BYTES = 132          # 4 axes * 8 float coeffs + float duration
+TRAJ_MEM_BYTES = 4096      # Crazyflie 2.x trajectory memory
+MAX_TRAJECTORIES = 10      # trajectory definitions the firmware keeps (ids 0-9)
+MEM_WRITE_CHUNK = 24       # payload bytes per memory-write packet (cflib's MAX_DATA_LENGTH)
+
+class PolyCoeffs:
+    """8 polynomial coefficients (c0..c7) in seconds; same shape as cflib's Poly."""
+    __slots__ = ('values',)
+
+    def __init__(self, values):
+        self.values = values
+
+    def eval(self, t):
+        v = 0.0
+        for c in reversed(self.values):
+            v = v * t + c
+        return v
+
+    def derivs(self, t):
+        """(p, v, a, j) at t."""
+        out = []
+        c = list(self.values)
+        for _ in range(4):
+            out.append(PolyCoeffs(c).eval(t))
+            c = [i * ci for i, ci in enumerate(c)][1:]
+        return tuple(out)
+
+class Piece:
+    """One Poly4D-compatible trajectory piece."""
+    __slots__ = ('duration', 'x', 'y', 'z', 'yaw')
+
+    def __init__(self, duration, x, y, z, yaw):
+        self.duration = duration
+        self.x, self.y, self.z, self.yaw = x, y, z, yaw
+
+    def to_cflib(self):
+        if Poly4D is None:
+            return self
+        return Poly4D(self.duration, Poly(self.x.values), Poly(self.y.values),
+                      Poly(self.z.values), Poly(self.yaw.values))
+
+class Trajectory:
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    @property
+    def duration(self):
+        return sum(p.duration for p in self.pieces)
+
+    def evaluate(self, t):
+        """(x, y, z, yaw_rad) at time t; clamps to the ends."""
+        for p in self.pieces:
+            if t <= p.duration:
+                break
+            t -= p.duration
+        t = min(max(t, 0.0), p.duration)
+        return (p.x.eval(t), p.y.eval(t), p.z.eval(t), p.yaw.eval(t))
+
+    def state(self, t):
+        """Per-axis (p, v, a, j) for x, y, z, yaw at time t; at rest past the end."""
+        if t >= self.duration:
+            return tuple(_rest(v) for v in self.evaluate(self.duration))
+        for p in self.pieces:
+            if t <= p.duration:
+                break
+            t -= p.duration
+        t = max(t, 0.0)
+        return tuple(c.derivs(t) for c in (p.x, p.y, p.z, p.yaw))
+
+    def n_bytes(self):
+        return len(self.pieces) * PIECE_BYTES
+
+def write_packets(n_bytes):
+    """Memory-write packets an upload of n_bytes takes."""
+    return -(-n_bytes // MEM_WRITE_CHUNK)
+
+# ---------- Hermite fitting ----------
+def _solve4(m, b):
+    """Gaussian elimination with partial pivoting for a 4x4 system."""
+    m = [row[:] + [b[i]] for i, row in enumerate(m)]
+    for col in range(4):
+        piv = max(range(col, 4), key=lambda r: abs(m[r][col]))
+        m[col], m[piv] = m[piv], m[col]
+        for r in range(col + 1, 4):
+            f = m[r][col] / m[col][col]
+            for c in range(col, 5):
+                m[r][c] -= f * m[col][c]
+    x = [0.0] * 4
+    for r in range(3, -1, -1):
+        x[r] = (m[r][4] - sum(m[r][c] * x[c] for c in range(r + 1, 4))) / m[r][r]
+    return x
+
+# Rows: d^k/dtau^k of tau^4..tau^7 at tau = 1, for k = 0..3
+_END_ROWS = [[1.0, 1.0, 1.0, 1.0],
+             [4.0, 5.0, 6.0, 7.0],
+             [12.0, 20.0, 30.0, 42.0],
+             [24.0, 60.0, 120.0, 210.0]]
+
+def hermite7(duration, s0, s1):
+    """
+    Coefficients of the 7th-degree polynomial on [0, duration] matching
+    s0 = (p, v, a, j) at t=0 and s1 at t=duration.
+    """
+    T = duration
+    # Work in normalized time tau = t/T: derivatives scale by T^k
+    n0 = [s0[k] * T ** k for k in range(4)]
+    n1 = [s1[k] * T ** k for k in range(4)]
+    c = [n0[0], n0[1], n0[2] / 2.0, n0[3] / 6.0]
+    # Subtract the known low-order terms' contribution at tau = 1
+    low = [c[0] + c[1] + c[2] + c[3],
+           c[1] + 2 * c[2] + 3 * c[3],
+           2 * c[2] + 6 * c[3],
+           6 * c[3]]
+    c += _solve4(_END_ROWS, [n1[k] - low[k] for k in range(4)])
+    return PolyCoeffs([ci / T ** i for i, ci in enumerate(c)])
+
+def _rest(p):
+    return (p, 0.0, 0.0, 0.0)
+
+def _piece(duration, start, end):
+    """start/end: per-axis (p, v, a, j) tuples for x, y, z, yaw."""
+    return Piece(duration, *(hermite7(duration, s0, s1) for s0, s1 in zip(start, end)))
+
+def _wrap_delta(a):
+    return (a + math.pi) % (2.0 * math.pi) - math.pi
+
+# ---------- spline blending ----------
+MAX_SPLINE_PIECES = 14     # pieces per half of SplineBlender's double buffer
+MIN_KNOT_GAP = 1e-3        # s; closer knots are merged
+SAME_POINT_M = 1e-3        # leading rows this close to the start are already reached
+
+def _clamped_cubic(h, y, v0, vn):
+    """
+    Knot second derivatives of the clamped cubic spline through y (n, axes)
+    with interval lengths h (n-1,) and end slopes v0, vn (axes,).
+    """
+    n = len(y)
+    A = np.zeros((n, n))
+    r = np.zeros_like(y)
+    d = np.diff(y, axis=0) / h[:, None]
+    A[0, 0], A[0, 1] = 2 * h[0], h[0]
+    r[0] = 6 * (d[0] - v0)
+    A[-1, -2], A[-1, -1] = h[-1], 2 * h[-1]
+    r[-1] = 6 * (vn - d[-1])
+    i = np.arange(1, n - 1)
+    A[i, i - 1], A[i, i], A[i, i + 1] = h[:-1], 2 * (h[:-1] + h[1:]), h[1:]
+    r[1:-1] = 6 * (d[1:] - d[:-1])
+    return np.linalg.solve(A, r)
+
+def compile_spline(times, points, start=None, end_velocity=None):
+    """
+    One trajectory through `points` (n, 4: x, y, z, yaw_rad) at `times`
+    (n, increasing, times[0] = 0). Velocity and acceleration are
+    continuous across the knots. `start` is the per-axis (p, v, a, j) the
+    trajectory starts from (default: at rest at points[0]); it ends with
+    `end_velocity` (per axis, default at rest).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    y = np.asarray(points, dtype=np.float64)
+    h = np.diff(times)
+    v0 = np.array([s[1] for s in start]) if start is not None else np.zeros(4)
+    vn = np.asarray(end_velocity, dtype=np.float64) if end_velocity is not None else np.zeros(4)
+    M = _clamped_cubic(h, y, v0, vn)
+    d = np.diff(y, axis=0) / h[:, None]
+    vel = np.vstack((d - h[:, None] * (2 * M[:-1] + M[1:]) / 6.0, vn))
+    jerk_iv = np.diff(M, axis=0) / h[:, None]
+    # Knot jerk: mean of the neighbouring intervals' (constant) cubic jerk; zero at the ends
+    jerk = np.vstack((np.zeros(4), (jerk_iv[:-1] + jerk_iv[1:]) / 2.0, np.zeros(4)))
+    states = [tuple((y[k, a], vel[k, a], M[k, a], jerk[k, a]) for a in range(4))
+              for k in range(len(times))]
+    if start is not None:
+        states[0] = tuple(tuple(s) for s in start)
+    return Trajectory([_piece(h[k], states[k], states[k + 1]) for k in range(len(h))])
+
+def compile_waypoint_spline(rows, move_s, start, next_knot=None, max_pieces=MAX_SPLINE_PIECES):
+    """
+    Blend a segment's go_to rows (t, x, y, z, yaw_deg; yaw NaN = keep) into
+    one trajectory starting at t = 0 from `start` (per-axis (p, v, a, j)).
+    Each row is a knot at its arrival time t + move_s (move_s may be per
+    row, see waypoints.row_durations()); rows are thinned
+    evenly so the knots fit in max_pieces. next_knot = (t, x, y, z, yaw_deg)
+    appends the next primitive's start, so the trajectory flows into it
+    instead of stopping at this segment's last waypoint (its t is the
+    arrival time there, on the same clock as the rows).
+    """
+    rows = np.asarray(rows, dtype=np.float64)
+    move_s = np.broadcast_to(np.asarray(move_s, dtype=np.float64), len(rows))
+    start_pt = [s[0] for s in start]
+    # A leading "go to the start point" row the drone is already at (it flowed
+    # in from the previous spline) would make it turn back; drop it
+    while len(rows) > 1 and np.linalg.norm(rows[0, 1:4] - start_pt[:3]) < SAME_POINT_M:
+        rows, move_s = rows[1:], move_s[1:]
+    n_max = max_pieces - (next_knot is not None)
+    if len(rows) > n_max:
+        keep = np.unique(np.round(np.linspace(0, len(rows) - 1, n_max)).astype(int))
+        rows, move_s = rows[keep], move_s[keep]
+    wp = np.column_stack((rows[:, 0] + move_s, rows[:, 1:]))
+    if next_knot is not None:
+        wp = np.vstack((wp, next_knot))
+    t = wp[:, 0]
+    yaw0 = start[3][0]
+    yaw_deg = wp[:, 4].copy()
+    for k in range(len(yaw_deg)):   # NaN = keep the previous yaw
+        if yaw_deg[k] != yaw_deg[k]:
+            yaw_deg[k] = yaw_deg[k - 1] if k else math.degrees(yaw0)
+    # Unwrap relative to the start yaw so the drone turns the short way
+    yaw = np.unwrap(np.concatenate(([yaw0], np.radians(yaw_deg))))[1:]
+    pts = np.column_stack((wp[:, 1:4], yaw))
+    ok = np.concatenate(([t[0] > MIN_KNOT_GAP], np.diff(t) > MIN_KNOT_GAP))
+    t, pts = t[ok], pts[ok]
+    return compile_spline(np.concatenate(([0.0], t)), np.vstack((start_pt, pts)), start)
+
+# ---------- primitive compilers ----------
+def compile_circle(*, cx=0.0, cy=0.0, z=1.5, radius=1.2, total_time=20.0,
+                   face_center=True, world_yaw_offset_deg=0.0, start_angle_deg=0.0,
+                   pieces=8):
+    """
+    CCW orbit from start_angle_deg back to itself in total_time, starting and
+    ending at rest (the first and last pieces ramp speed up/down).
+    """
+    w = 2.0 * math.pi / total_time
+    th0 = math.radians(start_angle_deg)
+    yaw_off = math.radians(world_yaw_offset_deg)
+    dt = total_time / pieces
+
+    def state(k):
+        th = th0 + w * dt * k
+        moving = 0 < k < pieces
+        c, s = math.cos(th), math.sin(th)
+        r = radius
+        x = (cx + r * c, -r * w * s, -r * w * w * c, r * w ** 3 * s)
+        y = (cy + r * s, r * w * c, -r * w * w * s, -r * w ** 3 * c)
+        if not moving:
+            x, y = _rest(x[0]), _rest(y[0])
+        if face_center:
+            yaw = (th + math.pi + yaw_off, w if moving else 0.0, 0.0, 0.0)
+        else:
+            yaw = _rest(0.0)
+        return (x, y, _rest(z), yaw)
+
+    return Trajectory([_piece(dt, state(k), state(k + 1)) for k in range(pieces)])
+
+def compile_diagonal_orbit(*, cx=0.0, cy=0.0, z_low=1.2, z_high=2.0, radius=1.2,
+                           passes=10, total_time=24.0, face_center=True,
+                           world_yaw_offset_deg=0.0, first_pass=1):
+    """
+    Passes first_pass..passes-1 of diagonal_orbit() as rest-to-rest straight
+    pieces (the same path a go_to between the pass endpoints takes). Pass 0
+    starts from wherever the drone is, so it stays a go_to.
+    """
+    dt = total_time / float(passes)
+    step = 2.0 * math.pi / float(passes)
+
+    def endpoint(i):
+        ang = (i + 1) * step
+        px, py = cx + radius * math.cos(ang), cy + radius * math.sin(ang)
+        pz = z_high if i % 2 == 0 else z_low
+        yaw = (math.atan2(cy - py, cx - px) + math.radians(world_yaw_offset_deg)
+               if face_center else 0.0)
+        return px, py, pz, yaw
+
+    out = []
+    prev = endpoint(first_pass - 1)
+    yaw = prev[3]
+    for i in range(first_pass, passes):
+        end = endpoint(i)
+        yaw_end = yaw + _wrap_delta(end[3] - yaw)
+        out.append(_piece(dt, tuple(_rest(v) for v in prev[:3] + (yaw,)),
+                          tuple(_rest(v) for v in end[:3] + (yaw_end,))))
+        prev, yaw = end, yaw_end
+    return Trajectory(out)
+
+# ---------- upload / run ----------
+class TrajectoryRunner:
+    """
+    Uploads compiled trajectories into trajectory memory and starts them.
+
+    Trajectories are kept resident by key, so repeating the same orbit costs
+    only the start command. Orbit keys leave out the duration: a resident
+    shape is replayed at another speed with start(id, duration). Ids come from the firmware's MAX_TRAJECTORIES
+    definitions; memory is filled in order and reused from the start when
+    full. A new upload drops exactly the trajectories whose bytes it
+    overwrites (and frees their ids), and never touches the one started
+    last, which may still be flying. reserve() sets aside fixed (id, offset)
+    slots, e.g. SplineBlender's double buffer, that prepare() never uses.
+    """
+
+    def __init__(self, cf):
+        self.cf = cf
+        self.hl = cf.high_level_commander
+        self._mem = None
+        self._resident = {}     # key -> (trajectory_id, offset, n_pieces), oldest first
+        self._free_ids = list(range(MAX_TRAJECTORIES))
+        self._reserved = 0      # bytes [0, _reserved) belong to reserve() slots
+        self._next_offset = 0
+        self._running = None    # id of the trajectory started last
+        self._defined = {}      # trajectory_id -> Trajectory it holds (for setpoint listeners)
+        self.uploads = 0
+        self.uploaded_bytes = 0
+        self.upload_packets = 0   # memory-write packets (define_trajectory not included)
+
+    def _traj_mem(self):
+        if self._mem is None:
+            mems = self.cf.mem.get_mems(TYPE_TRAJ)
+            if not mems:
+                raise RuntimeError("No trajectory memory on this Crazyflie")
+            self._mem = mems[0]
+        return self._mem
+
+    def reserve(self, n_bytes):
+        """A fixed (trajectory_id, offset) slot of n_bytes outside prepare()'s memory."""
+        if self._resident or not self._free_ids:
+            raise RuntimeError("Reserve trajectory slots before preparing any trajectory")
+        if self._reserved + n_bytes > TRAJ_MEM_BYTES:
+            raise ValueError(f"Can't reserve {n_bytes} more bytes of trajectory memory")
+        slot = (self._free_ids.pop(0), self._reserved)
+        self._reserved += n_bytes
+        self._next_offset = self._reserved
+        return slot
+
+    def upload(self, trajectory_id, offset, traj):
+        """Write `traj` at `offset` and define it as `trajectory_id`."""
+        mem = self._traj_mem()
+        mem.trajectory = [p.to_cflib() for p in traj.pieces]
+        if hasattr(mem, 'write_data_sync'):
+            ok = mem.write_data_sync(start_addr=offset)
+            if ok is False:
+                raise RuntimeError("Trajectory upload failed")
+        else:
+            _write_data_blocking(mem, offset)
+        n_bytes = traj.n_bytes()
+        self.uploads += 1
+        self.uploaded_bytes += n_bytes
+        self.upload_packets += write_packets(n_bytes)
+        cfutils.note_upload(n_bytes, write_packets(n_bytes))
+        t0 = time.perf_counter()
+        self.hl.define_trajectory(trajectory_id, offset, len(traj.pieces))
+        cfutils.note_send('define_trajectory', time.perf_counter() - t0)
+        self._defined[trajectory_id] = traj
+
+    def resident(self, key):
+        return key in self._resident
+
+    def fits(self, n_bytes):
+        """True if prepare() can add n_bytes without dropping a resident trajectory."""
+        return bool(self._free_ids) and self._next_offset + n_bytes <= TRAJ_MEM_BYTES
+
+    def _running_region(self):
+        for trajectory_id, offset, n in self._resident.values():
+            if trajectory_id == self._running:
+                return offset, offset + n * PIECE_BYTES
+        return None
+
+    def _place(self, size):
+        """Offset for `size` bytes that leaves the running trajectory intact."""
+        run = self._running_region()
+        candidates = [self._next_offset] + ([run[1]] if run else []) + [self._reserved]
+        for offset in candidates:
+            end = offset + size
+            if end <= TRAJ_MEM_BYTES and (run is None or end <= run[0] or offset >= run[1]):
+                return offset
+        raise RuntimeError(f"No room for a {size}-byte trajectory beside the running one")
+
+    def _drop(self, key):
+        trajectory_id = self._resident.pop(key)[0]
+        self._free_ids.append(trajectory_id)
+
+    def prepare(self, key, traj):
+        """
+        Make `traj` resident (uploading if needed); returns its trajectory id.
+        traj may also be a function returning the Trajectory, called only
+        when it isn't resident yet.
+        """
+        if key in self._resident:
+            return self._resident[key][0]
+        if callable(traj):
+            traj = traj()
+        size = traj.n_bytes()
+        if size > TRAJ_MEM_BYTES - self._reserved:
+            raise ValueError(f"Trajectory needs {size} bytes; memory holds {TRAJ_MEM_BYTES - self._reserved}")
+        offset = self._place(size)
+        for k, (_, o, n) in list(self._resident.items()):
+            if o < offset + size and offset < o + n * PIECE_BYTES:
+                self._drop(k)   # overwritten
+        if not self._free_ids:
+            # Out of definitions: give up the oldest one that isn't flying
+            self._drop(next(k for k, v in self._resident.items() if v[0] != self._running))
+        trajectory_id = self._free_ids.pop(0)
+        self.upload(trajectory_id, offset, traj)
+        self._resident[key] = (trajectory_id, offset, len(traj.pieces))
+        self._next_offset = offset + size
+        return trajectory_id
+
+    def start(self, trajectory_id, duration=None):
+        """
+        Start a defined trajectory. With `duration` (s) it is replayed at
+        the time scale that stretches it to that length, so one upload
+        serves the same shape at any speed.
+        """
+        self._running = trajectory_id
+        traj = self._defined.get(trajectory_id)
+        time_scale = duration / traj.duration if duration is not None and traj is not None else 1.0
+        t_show = show_clock.now()
+        t0 = time.perf_counter()
+        self.hl.start_trajectory(trajectory_id, time_scale, False)
+        cfutils.note_send('start_trajectory', time.perf_counter() - t0)
+        cfutils.note_trajectory(self.hl, traj, t_show, time_scale)
+
+def _write_data_blocking(mem, offset):
+    """Older cflib: write_data(success_cb, fail_cb, start_addr) without a sync variant."""
+    import threading
+    done = threading.Event()
+    result = []
+    def ok(*_):
+        result.append(True); done.set()
+    def fail(*_):
+        result.append(False); done.set()
+    mem.write_data(ok, fail, start_addr=offset)
+    if not done.wait(5.0) or not result[0]:
+        raise RuntimeError("Trajectory upload failed")
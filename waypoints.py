@@ -0,0 +1,125 @@
+# waypoints.py
+"""
+Batched waypoint generation for orbit-style primitives.
+
+Each generator returns a C-contiguous (n, 5) float array with columns
+(t, x, y, z, yaw_deg): t is the send time of the waypoint's go_to relative to
+the primitive's start, yaw_deg is NaN when the yaw should be left alone.
+Everything is computed before the first command goes out; fly_waypoints()
+then only indexes into the rows.
+
+Orbit density can be chosen from a chord-error tolerance instead of a fixed
+count: a chord spanning angle a on radius r misses the arc by r(1 - cos(a/2)),
+so the coarsest spacing within `tol` is a = 2 acos(1 - tol / r), capped so
+no go_to slot gets shorter than MIN_STEP_S at the orbit's angular speed.
+"""
+import math
+import numpy as np
+from cfutils import hl_go_to_compat
+from safe_sleep import run_steps
+
+T, X, Y, Z, YAW = range(5)
+
+MIN_STEP_S = 0.1   # shortest go_to slot for auto density (command rate / tracking)
+
+def chord_segments(radius, angle_rad, tol):
+    """Fewest equal chords over `angle_rad` of arc whose error stays within tol (m)."""
+    if tol >= radius:
+        return 1
+    return max(1, math.ceil(abs(angle_rad) / (2.0 * math.acos(1.0 - tol / radius)) - 1e-9))
+
+def auto_circle_segments(radius, total_time, tol, min_step_s=MIN_STEP_S):
+    """Chord count for a full orbit of `radius` in total_time within tol."""
+    n = chord_segments(radius, 2.0 * math.pi, tol)
+    return max(3, min(n, int(total_time / min_step_s)))
+
+def auto_pass_subdivisions(radius, passes, total_time, tol, min_step_s=MIN_STEP_S):
+    """Arc waypoints per diagonal_orbit pass (1 = the plain straight pass) within tol."""
+    k = chord_segments(radius, 2.0 * math.pi / passes, tol)
+    return max(1, min(k, int(total_time / passes / min_step_s)))
+
+def row_durations(wp, slot_s, move_s):
+    """
+    go_to duration of each row: move_s, but never past the next row's send
+    time (or past the last row's slot), so rows may be unevenly spaced.
+    slot_s 0 (send and return) leaves the last move at move_s.
+    """
+    gaps = np.append(np.diff(wp[:, T]), slot_s if slot_s > 0 else np.inf)
+    return np.minimum(move_s, gaps)
+
+def _pack(t, x, y, z, yaw):
+    return np.ascontiguousarray(np.column_stack((t, x, y, z, yaw)), dtype=np.float64)
+
+def face_center_yaw_deg_batch(px, py, cx, cy, world_yaw_offset_deg=0.0):
+    """Vectorized cfutils.face_center_yaw_deg."""
+    return np.degrees(np.arctan2(cy - py, cx - px)) + world_yaw_offset_deg
+
+def circle_waypoints(*, cx=0.0, cy=0.0, z=1.5, radius=1.2, segments=72, dt=0.3,
+                     face_center=True, world_yaw_offset_deg=0.0, start_angle_deg=0.0,
+                     approach_s=None):
+    """
+    segments + 1 waypoints going once around CCW from start_angle_deg: the
+    start point at t = 0, then one per dt from approach_s (default dt).
+    """
+    k = np.arange(segments + 1, dtype=np.float64)
+    approach_s = dt if approach_s is None else approach_s
+    theta = np.radians(start_angle_deg) + 2.0 * np.pi * (k / float(segments))
+    px = cx + radius * np.cos(theta)
+    py = cy + radius * np.sin(theta)
+    yaw = (face_center_yaw_deg_batch(px, py, cx, cy, world_yaw_offset_deg)
+           if face_center else np.full_like(k, np.nan))
+    t = np.where(k > 0, approach_s + (k - 1) * dt, 0.0)
+    return _pack(t, px, py, np.full_like(k, z), yaw)
+
+def diagonal_orbit_waypoints(*, cx=0.0, cy=0.0, z_low=1.2, z_high=2.0, radius=1.2,
+                             passes=10, dt=2.4, face_center=True, world_yaw_offset_deg=0.0,
+                             subdiv=1):
+    """
+    One waypoint per pass: the (i+1)th point on the circle, alternating
+    z_high/z_low. With subdiv > 1, passes after the first follow the arc in
+    subdiv waypoints (height ramping linearly), sent every dt / subdiv;
+    pass 0 starts from wherever the drone is, so it stays one waypoint.
+    """
+    i = np.concatenate(([0.0], np.repeat(np.arange(1, passes, dtype=np.float64), subdiv)))
+    j = np.concatenate(([1.0], np.tile(np.arange(1, subdiv + 1, dtype=np.float64), passes - 1)))
+    frac = j / subdiv if subdiv > 1 else np.ones_like(i)
+    frac[0] = 1.0
+    angle = (i + frac) * (2.0 * np.pi / float(passes))
+    px = cx + radius * np.cos(angle)
+    py = cy + radius * np.sin(angle)
+    z_end = np.where(i % 2 == 0, z_high, z_low)
+    z_from = np.where(i % 2 == 0, z_low, z_high)
+    pz = np.where(i == 0, z_end, z_from + (z_end - z_from) * frac).astype(np.float64)
+    yaw = (face_center_yaw_deg_batch(px, py, cx, cy, world_yaw_offset_deg)
+           if face_center else np.full_like(i, np.nan))
+    t = np.where(i == 0, 0.0, i * dt + (j - 1) * dt / subdiv)
+    return _pack(t, px, py, pz, yaw)
+
+def waypoint_steps(hl, wp, t_start, slot_s, move_s=None, arrival=None, label=""):
+    """
+    fly_waypoints() as a step generator (see safe_sleep.run_steps()): waits
+    for t_start, then sends each row and yields the wait after it.
+    """
+    move_s = slot_s if move_s is None else move_s
+    yield t_start, None
+    t_next = np.append(wp[1:, T], wp[-1, T] + slot_s) if len(wp) else wp[:, T]
+    for (t, x, y, z, yaw), t_end, dur in zip(wp.tolist(), t_next.tolist(),
+                                             row_durations(wp, slot_s, move_s).tolist()):
+        hl_go_to_compat(hl, x, y, z, yaw_deg=None if yaw != yaw else yaw,
+                        duration_s=dur, relative=False)
+        if arrival is not None:
+            arrival.expect(x, y, z)
+            yield t_start + t_end, arrival.arrived
+            arrival.finish(t_start + t + dur, label)
+        else:
+            yield t_start + t_end, None
+
+def fly_waypoints(hl, wp, t_start, slot_s, move_s=None, arrival=None, label=""):
+    """
+    Send each waypoint row as an absolute go_to at t_start + t and wait until
+    the next row is due (the last one waits out slot_s) on the show clock.
+    move_s is the go_to duration (default slot_s; see row_durations()).
+    With an arrival.ArrivalDetector each wait also ends once the drone is at
+    the waypoint (the next row is still sent at its own time).
+    """
+    run_steps(waypoint_steps(hl, wp, t_start, slot_s, move_s, arrival, label))